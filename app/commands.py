@@ -0,0 +1,197 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# -----------------------------
+# Statistics counters
+# -----------------------------
+stats_cli = AppGroup('stats', help='Maintain the materialized dashboard counters.')
+
+@stats_cli.command('recompute')
+def recompute_stats():
+    """Rebuild stat_counters from the projects, tasks and sprints tables."""
+    from app.utils.stat_counters import recompute_counters
+    count = recompute_counters()
+    click.echo(f"Recomputed {count} counters.")
+
+# -----------------------------
+# Activity log partitions
+# -----------------------------
+activity_cli = AppGroup('activity', help='Maintain the monthly activity_logs partitions.')
+
+@activity_cli.command('ensure-partitions')
+@click.option('--months-ahead', type=int, default=None,
+              help='Months to create ahead of the current one (default: ACTIVITY_LOG_PARTITIONS_AHEAD).')
+def ensure_activity_partitions(months_ahead):
+    """Create the upcoming monthly partitions (Postgres only)."""
+    from app.utils.activity_partitions import ensure_partitions
+    if months_ahead is None:
+        months_ahead = current_app.config.get('ACTIVITY_LOG_PARTITIONS_AHEAD', 2)
+    created = ensure_partitions(months_ahead)
+    click.echo(f"Created {len(created)} partitions." + (f" ({', '.join(created)})" if created else ''))
+
+@activity_cli.command('retention')
+@click.option('--months', type=int, default=None,
+              help='Keep this many months of logs (default: ACTIVITY_LOG_RETENTION_MONTHS).')
+@click.option('--archive', is_flag=True, help='Detach expired partitions instead of dropping them.')
+def activity_retention(months, archive):
+    """Drop or archive activity logs older than the retention window."""
+    from app.utils.activity_partitions import apply_retention
+    if months is None:
+        months = current_app.config.get('ACTIVITY_LOG_RETENTION_MONTHS', 12)
+    try:
+        removed = apply_retention(months, archive=archive)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Retention ({months} months): " + (', '.join(removed) if removed else 'nothing to remove'))
+
+# -----------------------------
+# Notifications
+# -----------------------------
+notifications_cli = AppGroup('notifications', help='Notification maintenance jobs.')
+
+@notifications_cli.command('digest')
+@click.option('--older-than', 'older_than', type=int, default=None,
+              help='Only include notifications at least this many minutes old (default: NOTIFICATION_DIGEST_DELAY_MINUTES).')
+def notification_digest(older_than):
+    """Email each user one digest of their unread, not yet digested notifications."""
+    from app.utils.notifications import send_digests
+    from app.utils.email_outbox import enqueue_email
+    from app.utils.job_runs import run_job
+
+    def queue_digest(user, notifications):
+        enqueue_email(
+            'notification_digest', user.email, user_name=user.name,
+            notifications=[{'message': n.message, 'link': n.link, 'count': n.count} for n in notifications]
+        )
+
+    def job():
+        users, count = send_digests(queue_digest, older_than)
+        return {'users_emailed': users, 'notifications': count}
+
+    stats = run_job('notifications.digest', job)
+    click.echo(f"Sent {stats['users_emailed']} digests covering {stats['notifications']} notifications.")
+
+@notifications_cli.command('purge')
+@click.option('--read-days', type=int, default=None,
+              help='Delete read notifications older than this (default: NOTIFICATION_RETENTION_READ_DAYS).')
+@click.option('--unread-days', type=int, default=None,
+              help='Delete unread notifications older than this (default: NOTIFICATION_RETENTION_UNREAD_DAYS).')
+def notification_purge(read_days, unread_days):
+    """Delete old notifications in small batches and record the run."""
+    from app.utils.notifications import purge_notifications
+    from app.utils.job_runs import run_job
+    stats = run_job('notifications.purge', lambda: purge_notifications(read_days, unread_days))
+    click.echo(f"Deleted {stats['read_deleted']} read and {stats['unread_deleted']} unread notifications.")
+
+# -----------------------------
+# Email outbox
+# -----------------------------
+email_cli = AppGroup('email', help='Send queued emails from the email_outbox table.')
+
+@email_cli.command('send-pending')
+def email_send_pending():
+    """Send one batch of due emails and exit."""
+    from app.utils.email_outbox import process_outbox
+    stats = process_outbox()
+    click.echo(f"Sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']}.")
+
+@email_cli.command('worker')
+def email_worker():
+    """Keep draining the outbox (run as a separate process)."""
+    from app.utils.email_outbox import run_worker
+    run_worker()
+
+@email_cli.command('purge')
+@click.option('--sent-days', type=int, default=None,
+              help='Delete sent emails older than this (default: EMAIL_OUTBOX_RETENTION_SENT_DAYS).')
+@click.option('--failed-days', type=int, default=None,
+              help='Delete failed emails older than this (default: EMAIL_OUTBOX_RETENTION_FAILED_DAYS).')
+def email_purge(sent_days, failed_days):
+    """Delete old outbox rows in small batches and record the run."""
+    from app.utils.email_outbox import purge_outbox
+    from app.utils.job_runs import run_job
+    stats = run_job('email.purge', lambda: purge_outbox(sent_days, failed_days))
+    click.echo(f"Deleted {stats['sent_deleted']} sent and {stats['failed_deleted']} failed emails, "
+               f"cleared {stats['payloads_cleared']} secret payloads.")
+
+# -----------------------------
+# Authentication
+# -----------------------------
+auth_cli = AppGroup('auth', help='Authentication maintenance jobs.')
+
+@auth_cli.command('sweep-2fa-codes')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows deleted per transaction.')
+def sweep_2fa_codes(batch_size):
+    """Delete expired login 2FA codes and record the run."""
+    from app.utils.two_factor import two_factor_codes
+    from app.utils.job_runs import run_job
+    stats = run_job('auth.sweep_2fa_codes', lambda: {'deleted': two_factor_codes.sweep(batch_size)})
+    click.echo(f"Deleted {stats['deleted']} expired 2FA codes.")
+
+@auth_cli.command('benchmark-logins')
+@click.option('--threads', type=int, default=None, help='Concurrent logins (default: GUNICORN_THREADS or 16).')
+@click.option('--seconds', type=float, default=5.0, show_default=True, help='How long to run.')
+@click.option('--method', default=None, help='Hash method to test (default: PASSWORD_HASH_METHOD).')
+@click.option('--executor', type=click.Choice(['inline', 'thread', 'process']), default=None,
+              help='Where hashing runs (default: PASSWORD_HASH_EXECUTOR).')
+@click.option('--workers', type=int, default=None, help='Hashing pool size (default: PASSWORD_HASH_WORKERS).')
+def benchmark_logins(threads, seconds, method, executor, workers):
+    """Measure password checks per second in this process, i.e. per gunicorn worker."""
+    import os
+    import threading
+    import time
+    from app.utils.passwords import PasswordHasher
+
+    config = current_app.config
+    hasher = PasswordHasher()
+    hasher.configure(
+        method=method or config.get('PASSWORD_HASH_METHOD'),
+        salt_length=config.get('PASSWORD_SALT_LENGTH'),
+        executor=executor or config.get('PASSWORD_HASH_EXECUTOR'),
+        workers=workers or config.get('PASSWORD_HASH_WORKERS'),
+        max_pending=config.get('PASSWORD_HASH_MAX_PENDING'),
+        timeout=config.get('PASSWORD_HASH_TIMEOUT')
+    )
+    threads = threads or int(os.environ.get('GUNICORN_THREADS', 16))
+    password_hash = hasher.hash('benchmark-password')
+    hasher.verify(password_hash, 'benchmark-password')  # start the pool outside the timing
+
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def login_loop():
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            hasher.verify(password_hash, 'benchmark-password')
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=login_loop) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    click.echo(f"method={hasher.resolved_method} executor={hasher.executor} "
+               f"pool={hasher.workers if hasher.executor != 'inline' else '-'} threads={threads}")
+    click.echo(f"{len(latencies)} logins in {elapsed:.1f}s: {len(latencies) / elapsed:.1f} logins/sec per worker")
+    click.echo(f"latency p50={percentile(0.5):.0f}ms p95={percentile(0.95):.0f}ms max={percentile(1):.0f}ms")
+
+def register_commands(app):
+    """Attach the project's admin CLI groups to the Flask app"""
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(activity_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(email_cli)
+    app.cli.add_command(auth_cli)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load variables from .env file
@@ -30,6 +31,134 @@ class Config:
         "pool_recycle": 3600,
     }
 
+    # Dashboard aggregates cache (seconds)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    # Personal (/dashboard/me) cache, kept short since it holds per-user state
+    DASHBOARD_ME_CACHE_TTL = int(os.environ.get('DASHBOARD_ME_CACHE_TTL', 15))
+    # Entries kept per worker (one per filter combination and per /dashboard/me user);
+    # the least recently used is evicted beyond this
+    DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 1024))
+
+    # Authenticated user snapshots kept per worker by token_required (seconds / entries).
+    # Changes are seen at once by the worker that made them, by the others within the TTL.
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 2048))
+
+    # Password hashing: any Werkzeug method string ("scrypt", "scrypt:16384:8:1",
+    # "pbkdf2:sha256:600000"). Hashes made with other parameters are upgraded on login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    # "inline" (request thread), "thread" or "process": bounded pool per gunicorn worker
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'inline')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Rate limits. Counters must be shared by all workers and nodes: point
+    # RATELIMIT_STORAGE_URI (or REDIS_URL) at Redis in production. memory:// keeps
+    # them per process, which is fine locally and in tests. Signed-in requests are
+    # counted per user, anonymous ones per IP; logins per submitted email and per IP.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', os.environ.get('REDIS_URL', 'memory://'))
+    RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY', 'fixed-window')
+    RATELIMIT_KEY_PREFIX = 'project-tracker'
+    RATELIMIT_HEADERS_ENABLED = True
+    # Keep serving (with per-process counters) if the shared storage is down
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_SWALLOW_ERRORS = True
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '100 per minute')
+    # Shared per-user budget; each request spends its endpoint's @cost weight (default 1)
+    RATELIMIT_BUDGET = os.environ.get('RATELIMIT_BUDGET', '600 per minute')
+    RATELIMIT_AUTH = os.environ.get('RATELIMIT_AUTH', '30 per minute')
+    # Login and 2FA verification: per account and client IP, and per IP across
+    # all accounts (a NAT ceiling, so keep it well above LOGIN)
+    RATELIMIT_LOGIN = os.environ.get('RATELIMIT_LOGIN', '10 per minute;50 per hour')
+    RATELIMIT_LOGIN_IP = os.environ.get('RATELIMIT_LOGIN_IP', '100 per minute')
+
+    # Login 2FA codes: "database" (two_factor_codes table) or "redis" (TWO_FACTOR_REDIS_URL).
+    # Either is shared by all workers; expired rows are swept by `flask auth sweep-2fa-codes`.
+    TWO_FACTOR_STORE = os.environ.get('TWO_FACTOR_STORE', 'database')
+    TWO_FACTOR_REDIS_URL = os.environ.get('TWO_FACTOR_REDIS_URL', os.environ.get('REDIS_URL'))
+    TWO_FACTOR_CODE_TTL = int(os.environ.get('TWO_FACTOR_CODE_TTL', 600))
+    TWO_FACTOR_MAX_ATTEMPTS = int(os.environ.get('TWO_FACTOR_MAX_ATTEMPTS', 5))
+
+    # Single-flight coalescing of expensive reads. The lock directory must be shared
+    # by the gunicorn workers of a host and is kept private (0700) since it holds
+    # results; set it to an empty string to coalesce per worker only. Callers wait at
+    # most TIMEOUT seconds for another computation before running their own.
+    SINGLE_FLIGHT_LOCK_DIR = os.environ.get(
+        'SINGLE_FLIGHT_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'project-tracker-single-flight')
+    )
+    SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 30))
+
+    # Activity log writer: "transaction" joins the route's commit,
+    # "buffered" queues entries for periodic bulk inserts
+    ACTIVITY_LOG_MODE = os.environ.get('ACTIVITY_LOG_MODE', 'transaction')
+    ACTIVITY_LOG_FLUSH_SIZE = int(os.environ.get('ACTIVITY_LOG_FLUSH_SIZE', 100))
+    ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0))
+    # Longest wait between flush attempts while the database is failing, and the
+    # most entries kept waiting per worker (the oldest are dropped beyond it)
+    ACTIVITY_LOG_RETRY_BACKOFF_MAX = float(os.environ.get('ACTIVITY_LOG_RETRY_BACKOFF_MAX', 60))
+    ACTIVITY_LOG_MAX_QUEUE = int(os.environ.get('ACTIVITY_LOG_MAX_QUEUE', 10000))
+    # Monthly activity_logs partitions: how many to create ahead, and how many
+    # months to keep before `flask activity retention` drops (or detaches) them
+    ACTIVITY_LOG_PARTITIONS_AHEAD = int(os.environ.get('ACTIVITY_LOG_PARTITIONS_AHEAD', 2))
+    ACTIVITY_LOG_RETENTION_MONTHS = int(os.environ.get('ACTIVITY_LOG_RETENTION_MONTHS', 12))
+
+    # /notifications/stream (SSE). Connections end after MAX_SECONDS and the browser
+    # reconnects with Last-Event-ID; POLL_INTERVAL only applies without Postgres LISTEN.
+    NOTIFICATION_STREAM_HEARTBEAT = float(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', 15))
+    NOTIFICATION_STREAM_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2))
+    NOTIFICATION_STREAM_MAX_SECONDS = float(os.environ.get('NOTIFICATION_STREAM_MAX_SECONDS', 300))
+    NOTIFICATION_STREAM_RETRY_MS = int(os.environ.get('NOTIFICATION_STREAM_RETRY_MS', 3000))
+    NOTIFICATION_STREAM_BATCH_SIZE = 50
+    # Each open stream holds a worker thread (GUNICORN_THREADS); past this many per
+    # worker new streams get 503 + Retry-After and the client polls instead
+    NOTIFICATION_STREAM_MAX_PER_WORKER = int(os.environ.get('NOTIFICATION_STREAM_MAX_PER_WORKER', 8))
+    NOTIFICATION_STREAM_BUSY_RETRY_AFTER = int(os.environ.get('NOTIFICATION_STREAM_BUSY_RETRY_AFTER', 30))
+
+    # Same-type notifications for one user and entity within this many seconds are
+    # merged into one row (0 disables); digests include unread rows older than DELAY
+    NOTIFICATION_COALESCE_WINDOW = int(os.environ.get('NOTIFICATION_COALESCE_WINDOW', 600))
+    NOTIFICATION_DIGEST_DELAY_MINUTES = int(os.environ.get('NOTIFICATION_DIGEST_DELAY_MINUTES', 60))
+    # `flask notifications purge`: age limits (days) for read and unread rows
+    NOTIFICATION_RETENTION_READ_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_READ_DAYS', 30))
+    NOTIFICATION_RETENTION_UNREAD_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_UNREAD_DAYS', 180))
+    NOTIFICATION_PURGE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_PURGE_BATCH_SIZE', 1000))
+
+    # Outgoing email goes through the email_outbox table and `flask email worker`.
+    # EMAIL_TRANSPORT: sendgrid, smtp (SMTP_* settings) or file (EMAIL_FILE_DIR)
+    EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'sendgrid')
+    EMAIL_FILE_DIR = os.environ.get('EMAIL_FILE_DIR', os.path.join(tempfile.gettempdir(), 'project-tracker-mail'))
+    SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+    SMTP_PORT = int(os.environ.get('SMTP_PORT', 1025))
+    SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+    SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'false').lower() == 'true'
+    SENDGRID_SENDER_EMAIL = os.environ.get('SENDGRID_SENDER_EMAIL', 'no-reply@projectx.com')
+    # Recipients per SendGrid request for batched emails (provider limit: 1000)
+    SENDGRID_MAX_PERSONALIZATIONS = int(os.environ.get('SENDGRID_MAX_PERSONALIZATIONS', 1000))
+    # Compiled email templates are cached here so every process loads bytecode
+    MAIL_TEMPLATE_CACHE_DIR = os.environ.get(
+        'MAIL_TEMPLATE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'project-tracker-mail-templates')
+    )
+    # Outbound provider calls: timeouts (seconds) and circuit breakers that fail
+    # fast after FAILURE_THRESHOLD consecutive errors, retrying after RESET_TIMEOUT
+    SENDGRID_TIMEOUT = float(os.environ.get('SENDGRID_TIMEOUT', 10))
+    CLOUDINARY_CONNECT_TIMEOUT = float(os.environ.get('CLOUDINARY_CONNECT_TIMEOUT', 5))
+    CLOUDINARY_READ_TIMEOUT = float(os.environ.get('CLOUDINARY_READ_TIMEOUT', 60))
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5))
+    CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT', 30))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 200))
+    EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', 2))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+    EMAIL_OUTBOX_BACKOFF_BASE = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_BASE', 30))
+    EMAIL_OUTBOX_BACKOFF_MAX = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX', 3600))
+    EMAIL_OUTBOX_LOCK_TIMEOUT = int(os.environ.get('EMAIL_OUTBOX_LOCK_TIMEOUT', 300))
+    # `flask email purge` (nightly cron) deletes sent rows after SENT_DAYS and failed ones after FAILED_DAYS
+    EMAIL_OUTBOX_RETENTION_SENT_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_SENT_DAYS', 7))
+    EMAIL_OUTBOX_RETENTION_FAILED_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_FAILED_DAYS', 30))
+    EMAIL_OUTBOX_PURGE_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_PURGE_BATCH_SIZE', 1000))
+
     # Cloudinary
     CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import PrimaryKeyConstraint
+from app.utils.passwords import password_hasher
 from datetime import datetime, timezone
 
 db = SQLAlchemy()
@@ -9,6 +11,9 @@ db = SQLAlchemy()
 # -----------------------------
 class ProjectMember(db.Model):
     __tablename__ = 'project_members'
+    __table_args__ = (
+        db.Index('ix_project_members_user_id_status', 'user_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
@@ -25,10 +30,31 @@ class ProjectMember(db.Model):
 # -----------------------------
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
-    id = db.Column(db.Integer, primary_key=True)
+    __table_args__ = (
+        db.Index('ix_activity_logs_entity', 'entity_type', 'entity_id', 'created_at'),
+        db.Index('ix_activity_logs_created_at', 'created_at'),
+    )
+    # On Postgres the table is partitioned by created_at, so the key is (id, created_at)
+    # and ids come from activity_logs_id_seq. SQLite keeps a plain rowid id (see below).
+    id = db.Column(db.Integer, db.Sequence('activity_logs_id_seq'), primary_key=True,
+                   server_default=db.FetchedValue())
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     action = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    entity_type = db.Column(db.String(50), nullable=True)  # project, cohort, ...
+    entity_id = db.Column(db.Integer, nullable=True)
+    verb = db.Column(db.String(50), nullable=True)  # created, updated, status_changed, ...
+    meta = db.Column('metadata', db.JSON, nullable=True)  # 'metadata' is reserved on declarative models
+    # Partition key on Postgres (monthly RANGE partitions), so it must always be set
+    created_at = db.Column(db.DateTime(timezone=True), primary_key=True, nullable=False,
+                           default=lambda: datetime.now(timezone.utc))
+
+@compiles(PrimaryKeyConstraint, 'sqlite')
+def _sqlite_primary_key(constraint, compiler, **kw):
+    # SQLite can't number rows of a composite key and has no partitions: keep the
+    # activity log's id an INTEGER PRIMARY KEY (rowid) there
+    if constraint.table.name == ActivityLog.__tablename__:
+        return 'PRIMARY KEY (id)'
+    return compiler.visit_primary_key_constraint(constraint, **kw)
 
 # -----------------------------
 # Classes / Specializations
@@ -70,16 +96,27 @@ class User(db.Model):
     notifications = db.relationship('Notification', back_populates='user', lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """After a successful check, re-hash with the current parameters if they changed"""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
 
 # -----------------------------
 # Projects
 # -----------------------------
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_cohort_id_status', 'cohort_id', 'status'),
+        db.Index('ix_projects_class_id_status', 'class_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -104,6 +141,11 @@ class Project(db.Model):
 # -----------------------------
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_assignee_id_status', 'assignee_id', 'status'),
+        db.Index('ix_tasks_assignee_id_due_date', 'assignee_id', 'due_date'),
+        db.Index('ix_tasks_project_id_status', 'project_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -127,6 +169,9 @@ class Task(db.Model):
 # -----------------------------
 class Sprint(db.Model):
     __tablename__ = 'sprints'
+    __table_args__ = (
+        db.Index('ix_sprints_project_id_status', 'project_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'))
@@ -204,12 +249,107 @@ class Cohort(db.Model):
 # -----------------------------
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at', 'id'),
+        # Partial index: only unread rows, so unread counts stay cheap as history grows
+        db.Index('ix_notifications_user_id_unread', 'user_id',
+                 postgresql_where=db.text('NOT is_read'), sqlite_where=db.text('NOT is_read')),
+        db.Index('ix_notifications_group', 'user_id', 'type', 'entity_type', 'entity_id'),
+        db.Index('ix_notifications_created_at', 'created_at'),  # retention purge
+        # At most one unread row per user is still coalescing events for a type/entity
+        db.Index('uq_notifications_coalesce_key', 'user_id', 'coalesce_key', unique=True,
+                 postgresql_where=db.text('coalesce_key IS NOT NULL AND NOT is_read'),
+                 sqlite_where=db.text('coalesce_key IS NOT NULL AND NOT is_read')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     type = db.Column(db.String(50), nullable=False)
     message = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
     link = db.Column(db.String(255), nullable=True)
+    # What the notification is about; same-type events on one entity are coalesced
+    entity_type = db.Column(db.String(50), nullable=True)
+    entity_id = db.Column(db.Integer, nullable=True)
+    count = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # events merged into this row
+    coalesce_key = db.Column(db.String(150), nullable=True)  # "type:entity_type:entity_id" while still merging events
+    digested_at = db.Column(db.DateTime(timezone=True), nullable=True)  # included in an email digest
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     user = db.relationship('User', back_populates='notifications')
+
+# -----------------------------
+# Statistics Counters (materialized dashboard totals)
+# -----------------------------
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    entity = db.Column(db.String(20), primary_key=True)     # project, task, sprint
+    dimension = db.Column(db.String(20), primary_key=True)  # total, status, cohort, class
+    key = db.Column(db.String(150), primary_key=True, default='')
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# -----------------------------
+# Scheduled job runs (one row per run, read by /metrics)
+# -----------------------------
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started_at', 'job', 'started_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False)  # e.g. notifications.purge
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, succeeded, failed
+    stats = db.Column(db.JSON, nullable=True)  # per-run counts reported by the job
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+# -----------------------------
+# Transactional email outbox (drained by `flask email worker`)
+# -----------------------------
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # invitation, 2fa_code, verification, notification_digest
+    to_email = db.Column(db.String(150), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)  # template arguments
+    batch_key = db.Column(db.String(100), nullable=True)  # rows with the same key are sent in one request
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    locked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+# -----------------------------
+# Pending login 2FA codes (TWO_FACTOR_STORE=database)
+# -----------------------------
+class TwoFactorCode(db.Model):
+    __tablename__ = 'two_factor_codes'
+    __table_args__ = (
+        db.Index('ix_two_factor_codes_expires_at', 'expires_at'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    code_hash = db.Column(db.String(64), nullable=False)  # HMAC of the code, never the code itself
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+# -----------------------------
+# Daily task throughput rollup (one row per project per day)
+# -----------------------------
+class TaskDailyStat(db.Model):
+    __tablename__ = 'task_daily_stats'
+    __table_args__ = (
+        db.Index('ix_task_daily_stats_cohort_id_day', 'cohort_id', 'day'),
+        db.Index('ix_task_daily_stats_class_id_day', 'class_id', 'day'),
+    )
+    project_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    cohort_id = db.Column(db.Integer, nullable=True)
+    class_id = db.Column(db.Integer, nullable=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
@@ -1,7 +1,14 @@
-from flask import Blueprint, jsonify, request
-from app.models import ActivityLog
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from sqlalchemy.orm import joinedload
+from app.models import db, ActivityLog, Project, ProjectMember
 from app.utils.auth import token_required, role_required
-from app.utils.pagination import paginate
+from app.utils.pagination import paginate, keyset_paginate
+from app.utils.error_handlers import send_validation_error, send_not_found_error
+from app.utils.rate_limits import cost
 import logging
 
 activity_routes = Blueprint('activity_routes', __name__)
@@ -12,10 +19,15 @@ activity_routes = Blueprint('activity_routes', __name__)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Rows fetched per round trip by the export's server-side cursor
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ('id', 'user_id', 'action', 'entity_type', 'entity_id', 'verb', 'metadata', 'created_at')
+
 # -----------------------------
 # List activity logs (Admin only)
 # -----------------------------
 @activity_routes.route('/activities/activities', methods=['GET'])
+@cost(5)
 @token_required
 @role_required(['Manager'])
 def list_activities(current_user):
@@ -40,4 +52,119 @@ def list_activities(current_user):
 
     except Exception as e:
         logger.error(f"Failed to fetch activities: {str(e)}")
-        return jsonify({'message': 'Failed to fetch activities', 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': 'Failed to fetch activities', 'error': str(e)}), 500
+
+# -----------------------------
+# Project activity timeline (keyset pagination)
+# -----------------------------
+@activity_routes.route('/projects/<int:project_id>/activity', methods=['GET'])
+@cost(5)
+@token_required
+def project_activity(current_user, project_id):
+    project = db.session.get(Project, project_id)
+    if not project:
+        return send_not_found_error('Project')
+
+    # Owner, managers and accepted members only
+    if project.owner_id != current_user.id and current_user.role != 'Manager':
+        member = ProjectMember.query.filter_by(project_id=project_id, user_id=current_user.id, status='accepted').first()
+        if not member:
+            return jsonify({'message': 'Not authorized'}), 403
+
+    query = ActivityLog.query.options(joinedload(ActivityLog.user)).filter(
+        ActivityLog.entity_type == 'project',
+        ActivityLog.entity_id == project_id
+    )
+    try:
+        page = keyset_paginate(query, ActivityLog.created_at, ActivityLog.id, request)
+    except ValueError as e:
+        return send_validation_error(str(e))
+
+    return jsonify({
+        'items': [
+            {
+                'id': a.id,
+                'user_id': a.user_id,
+                'user_name': a.user.name if a.user else None,
+                'verb': a.verb,
+                'action': a.action,
+                'metadata': a.meta,
+                'created_at': a.created_at.isoformat()
+            }
+            for a in page['items']
+        ],
+        'next_cursor': page['next_cursor']
+    }), 200
+
+# -----------------------------
+# Export activity logs (Admin only, streamed)
+# -----------------------------
+def _export_rows(stmt):
+    """Yield one dict per log, reading EXPORT_BATCH_SIZE rows at a time"""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result:
+        item = dict(zip(EXPORT_COLUMNS, row))
+        item['created_at'] = item['created_at'].isoformat() if item['created_at'] else None
+        yield item
+
+def _ndjson(rows):
+    for item in rows:
+        yield json.dumps(item) + '\n'
+
+def _csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for item in rows:
+        if item['metadata'] is not None:
+            item['metadata'] = json.dumps(item['metadata'])
+        writer.writerow([item[name] for name in EXPORT_COLUMNS])
+        # Hand each line over as soon as it is written, so nothing accumulates
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@activity_routes.route('/activities/export', methods=['GET'])
+@cost(50)
+@token_required
+@role_required(['Manager'])
+def export_activities(current_user):
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return send_validation_error('format must be ndjson or csv')
+
+    stmt = db.select(
+        ActivityLog.id, ActivityLog.user_id, ActivityLog.action, ActivityLog.entity_type,
+        ActivityLog.entity_id, ActivityLog.verb, ActivityLog.meta, ActivityLog.created_at
+    ).order_by(ActivityLog.created_at, ActivityLog.id)
+
+    user_id = request.args.get('user_id')
+    if user_id:
+        try:
+            stmt = stmt.where(ActivityLog.user_id == int(user_id))
+        except ValueError:
+            return send_validation_error('user_id must be an integer')
+    try:
+        start = request.args.get('from')
+        end = request.args.get('to')
+        if start:
+            stmt = stmt.where(ActivityLog.created_at >= datetime.combine(date.fromisoformat(start[:10]), time.min, tzinfo=timezone.utc))
+        if end:
+            end_day = date.fromisoformat(end[:10]) + timedelta(days=1)
+            stmt = stmt.where(ActivityLog.created_at < datetime.combine(end_day, time.min, tzinfo=timezone.utc))
+    except ValueError:
+        return send_validation_error('from and to must be dates in YYYY-MM-DD format')
+
+    logger.info(f"User {current_user.id} exporting activity logs as {export_format}")
+    rows = _export_rows(stmt)
+    if export_format == 'csv':
+        body, mimetype = _csv(rows), 'text/csv'
+    else:
+        body, mimetype = _ndjson(rows), 'application/x-ndjson'
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=activity-logs-{stamp}.{export_format}'}
+    )
@@ -5,8 +5,10 @@ from app.models import db, Attachment, Project, Task, User
 from app.utils.auth import token_required
 from sqlalchemy.exc import SQLAlchemyError
 import cloudinary
-import cloudinary.uploader
 from werkzeug.utils import secure_filename
+from app.utils.cloudinary_utils import upload_file
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.error_handlers import send_error_response
 
 attachment_routes = Blueprint('attachment_routes', __name__)
 logger = logging.getLogger(__name__)
@@ -66,7 +68,7 @@ def add_project_attachment(current_user, project_id):
         
     try:
         # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
+        upload_result = upload_file(
             file,
             resource_type="auto",
             folder=f"project_tracker/projects/{project_id}"
@@ -91,6 +93,10 @@ def add_project_attachment(current_user, project_id):
             }
         }), 201
         
+    except CircuitOpenError as e:
+        logger.warning(f"Rejected attachment upload for project {project_id}: {str(e)}")
+        return send_error_response('File storage is temporarily unavailable', 503, 'SERVICE_UNAVAILABLE',
+                                   retry_after=max(1, int(e.retry_after)))
     except Exception as e:
         db.session.rollback()
         logger.error(f"Failed to upload attachment for project {project_id}: {str(e)}")
@@ -137,7 +143,7 @@ def add_task_attachment(current_user, task_id):
         
     try:
         # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
+        upload_result = upload_file(
             file,
             resource_type="auto",
             folder=f"project_tracker/tasks/{task_id}"
@@ -162,6 +168,10 @@ def add_task_attachment(current_user, task_id):
             }
         }), 201
         
+    except CircuitOpenError as e:
+        logger.warning(f"Rejected attachment upload for task {task_id}: {str(e)}")
+        return send_error_response('File storage is temporarily unavailable', 503, 'SERVICE_UNAVAILABLE',
+                                   retry_after=max(1, int(e.retry_after)))
     except Exception as e:
         db.session.rollback()
         logger.error(f"Failed to upload attachment for task {task_id}: {str(e)}")
@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify, make_response
 from app.models import db, User
 from app.utils.auth import generate_jwt
-from app.utils.email_utils import send_2fa_code_email
+from app.utils.email_outbox import enqueue_email
 from app.utils.error_handlers import send_error_response, send_validation_error
-import random
-import string
-from datetime import datetime, timedelta
+from app.utils import two_factor
+from app.utils.two_factor import two_factor_codes
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.rate_limits import limiter, limit_blueprint, config_limit, login_key, verify_2fa_key
+from flask_limiter.util import get_remote_address
+import secrets
 import logging
 import os
 import os
 from flask import current_app
 
 auth_routes = Blueprint('auth_routes', __name__)
+limit_blueprint(auth_routes, 'RATELIMIT_AUTH')
 
 # -----------------------------
 # Configure logger
@@ -19,12 +23,9 @@ auth_routes = Blueprint('auth_routes', __name__)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Temporary storage for 2FA codes (in production, use Redis or database)
-two_fa_codes = {}
-
 def generate_2fa_code():
     """Generate a random 6-digit 2FA code"""
-    return ''.join(random.choices(string.digits, k=6))
+    return f"{secrets.randbelow(10 ** 6):06d}"
 
 # -----------------------------
 # Register new user
@@ -66,7 +67,11 @@ def register():
 # -----------------------------
 # Login endpoint
 # -----------------------------
+# Instead of the blueprint's per-IP RATELIMIT_AUTH: attempts per account and IP,
+# plus a looser per-IP ceiling so users behind one NAT don't throttle each other
 @auth_routes.route('/auth/login', methods=['POST'])
+@limiter.limit(config_limit('RATELIMIT_LOGIN'), key_func=login_key)
+@limiter.limit(config_limit('RATELIMIT_LOGIN_IP'), key_func=get_remote_address)
 def login():
     # FIX: ensure data is always a dict
     data = request.get_json(silent=True) or {}
@@ -78,24 +83,37 @@ def login():
         return send_validation_error('Email and password are required')
 
     user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
-        return send_error_response('Invalid credentials', 401, 'INVALID_CREDENTIALS')
+    try:
+        if not user or not user.check_password(password):
+            return send_error_response('Invalid credentials', 401, 'INVALID_CREDENTIALS')
+
+        # Upgrade hashes made with older PASSWORD_HASH_METHOD parameters
+        if user.rehash_password_if_needed(password):
+            try:
+                db.session.commit()
+                logger.info(f"Rehashed password for {user.email}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to store rehashed password for {user.email}: {str(e)}")
+    except PasswordHasherBusy:
+        db.session.rollback()
+        logger.warning(f"Password hashing pool busy, rejecting login for {email}")
+        return send_error_response('Too many sign-ins in progress. Please try again.', 503, 'AUTH_BUSY', 1)
 
     # 2FA flow
     if user.two_factor_enabled:
         code = generate_2fa_code()
-        expiry = datetime.now() + timedelta(minutes=10)
-
-        two_fa_codes[user.id] = { 'code': code, 'expiry': expiry }
 
         try:
-            send_2fa_code_email(user.email, code, user.name)
-            logger.info(f"2FA code sent to {user.email}")
+            # With the database store the code commits together with its email
+            two_factor_codes.issue(user.id, code)
+            enqueue_email('2fa_code', user.email, code=code, user_name=user.name)
+            db.session.commit()
+            logger.info(f"2FA code queued for {user.email}")
         except Exception as e:
-            logger.error(f"Failed to send 2FA code to {user.email}: {str(e)}")
-            logger.warning(f"=== DEV MODE: 2FA CODE FOR {user.email}: {code} ===")
+            db.session.rollback()
+            logger.error(f"Failed to issue 2FA code for {user.email}: {str(e)}")
             # Continue login instead of returning error
-            pass
 
         return jsonify({
             'message': '2FA code sent to your email',
@@ -140,6 +158,8 @@ def login():
 # Verify 2FA code
 # -----------------------------
 @auth_routes.route('/auth/verify-2fa', methods=['POST'])
+@limiter.limit(config_limit('RATELIMIT_LOGIN'), key_func=verify_2fa_key)
+@limiter.limit(config_limit('RATELIMIT_LOGIN_IP'), key_func=get_remote_address)
 def verify_2fa():
     data = request.get_json(silent=True) or {}
 
@@ -158,21 +178,21 @@ def verify_2fa():
     if not user or not user.two_factor_enabled:
         return send_error_response('2FA not enabled for this user', 400, '2FA_NOT_ENABLED')
 
-    if user_id not in two_fa_codes:
-        logger.warning(f"No 2FA code found for user_id: {user_id}. Available keys: {list(two_fa_codes.keys())}")
-        return send_error_response('No 2FA code found. Please request a new code.', 400, '2FA_CODE_NOT_FOUND')
-
-    stored_data = two_fa_codes[user_id]
+    try:
+        result = two_factor_codes.verify(user_id, str(code).strip())
+    except Exception as e:
+        logger.error(f"2FA code lookup failed for user {user_id}: {str(e)}")
+        return jsonify({'message': '2FA verification failed'}), 500
 
-    if datetime.now() > stored_data['expiry']:
-        del two_fa_codes[user_id]
+    if result == two_factor.NOT_FOUND:
+        return send_error_response('No 2FA code found. Please request a new code.', 400, '2FA_CODE_NOT_FOUND')
+    if result == two_factor.EXPIRED:
         return send_error_response('2FA code expired. Please login again.', 400, '2FA_CODE_EXPIRED')
-
-    if code != stored_data['code']:
+    if result == two_factor.TOO_MANY_ATTEMPTS:
+        return send_error_response('Too many invalid 2FA codes. Please login again.', 429, '2FA_TOO_MANY_ATTEMPTS')
+    if result != two_factor.VERIFIED:
         return send_error_response('Invalid 2FA code', 401, 'INVALID_2FA_CODE')
 
-    del two_fa_codes[user_id]
-
     try:
         token = generate_jwt(user.id, user.role)
     except Exception as e:
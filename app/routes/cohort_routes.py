@@ -32,8 +32,9 @@ def add_cohort(current_user):
 
     try:
         db.session.add(cohort)
+        db.session.flush()  # Get cohort.id
+        log_activity(current_user.id, f"Created cohort: {cohort.name}", 'cohort', cohort.id, 'created')
         db.session.commit()
-        log_activity(current_user.id, f"Created cohort: {cohort.name}")
         logger.info(f"Admin {current_user.email} created cohort {cohort.name}")
         return jsonify({'message': 'Cohort created', 'id': cohort.id}), 201
     except Exception as e:
@@ -85,8 +86,8 @@ def edit_cohort(current_user, cohort_id):
     cohort.end_date = data.get('end_date', cohort.end_date)
 
     try:
+        log_activity(current_user.id, f"Edited cohort: {cohort.name}", 'cohort', cohort.id, 'updated')
         db.session.commit()
-        log_activity(current_user.id, f"Edited cohort: {cohort.name}")
         logger.info(f"Admin {current_user.email} edited cohort {cohort.name}")
         return jsonify({'message': 'Cohort updated'}), 200
     except Exception as e:
@@ -105,8 +106,8 @@ def remove_cohort(current_user, cohort_id):
 
     try:
         db.session.delete(cohort)
+        log_activity(current_user.id, f"Deleted cohort: {cohort.name}", 'cohort', cohort.id, 'deleted')
         db.session.commit()
-        log_activity(current_user.id, f"Deleted cohort: {cohort.name}")
         logger.info(f"Admin {current_user.email} deleted cohort {cohort.name}")
         return jsonify({'message': 'Cohort deleted'}), 200
     except Exception as e:
@@ -133,8 +134,8 @@ def join_cohort(current_user, cohort_id):
     # Assign the student to the cohort
     current_user.cohort_id = cohort.id
     try:
+        log_activity(current_user.id, f"Joined cohort: {cohort.name}", 'cohort', cohort.id, 'joined')
         db.session.commit()
-        log_activity(current_user.id, f"Joined cohort: {cohort.name}")
         logger.info(f"Student {current_user.email} joined cohort {cohort.name}")
         return jsonify({
             "message": f"{current_user.name} has joined {cohort.name}",
@@ -1,75 +1,461 @@
-from flask import Blueprint, jsonify
-from sqlalchemy import func
-from app.models import db, Project, Task, Sprint
+from datetime import date, datetime, time, timedelta, timezone
+from flask import Blueprint, jsonify, current_app, request
+from sqlalchemy import func, case
+from app.models import db, Project, ProjectMember, Task, Sprint, Cohort, StatCounter, TaskDailyStat
 from app.utils.auth import token_required
+from app.utils.cache import TTLCache, invalidate_on_commit
+from app.utils.single_flight import single_flight
+from app.utils.stat_counters import read_counters, read_total
+from app.utils import task_rollups  # noqa: F401  (registers the rollup flush hook)
+from app.utils.error_handlers import send_validation_error
+from app.utils.rate_limits import cost
+from app.routes.notification_routes import unread_notification_count
 
 dashboard_routes = Blueprint('dashboard_routes', __name__)
 
+# -----------------------------
+# Aggregate cache (dropped on any Project/Task/Sprint/Cohort commit made
+# through the ORM; see invalidate_on_commit for what it cannot see)
+# -----------------------------
+dashboard_cache = TTLCache(max_entries=1024)
+invalidate_on_commit(dashboard_cache, Project, Task, Sprint, Cohort)
+
+@dashboard_routes.record_once
+def _configure_cache(state):
+    dashboard_cache.max_entries = state.app.config.get('DASHBOARD_CACHE_SIZE', dashboard_cache.max_entries)
+    dashboard_cache.clear()
+
+# Statuses a project can be moved to (see change_project_status)
+PROJECT_STATUSES = ['In Progress', 'Under Review', 'Completed']
+# Task status that counts as done for progress / open-task figures
+TASK_DONE_STATUS = 'Completed'
+
+def count_where(condition):
+    """
+    Conditional COUNT usable inside a single aggregate scan.
+    Uses COUNT(*) FILTER (WHERE ...) on Postgres, SUM(CASE ...) elsewhere (SQLite).
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.count().filter(condition)
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def cached_aggregate(key, compute, ttl=None):
+    """
+    Serve an aggregate payload from the dashboard cache and report its age.
+    On a miss, concurrent requests for the same key share one computation.
+    """
+    payload, age = dashboard_cache.get_or_set(
+        key,
+        lambda: single_flight.do(f'dashboard:{key}', compute),
+        ttl=ttl or current_app.config['DASHBOARD_CACHE_TTL']
+    )
+    return {**payload, 'cacheAge': round(age, 1)}
+
+def counters_available():
+    """
+    True once stat_counters has been populated (by writes or `flask stats recompute`).
+    Until then the widgets fall back to live aggregate queries.
+    """
+    return db.session.query(StatCounter.entity).limit(1).first() is not None
+
+def use_counters(filters, from_counters=None):
+    """
+    Whether a widget reads stat_counters: only unfiltered, and once they exist.
+    Callers building several widgets decide once and pass `from_counters`.
+    """
+    if from_counters is not None:
+        return from_counters
+    return not filters and counters_available()
+
+def group_project_statuses(counts):
+    """
+    {status: count} in PROJECT_STATUSES order, with any other status (legacy
+    values, NULL) merged into 'Other', so counters and scans report the same names.
+    """
+    grouped = {status: counts.get(status, 0) for status in PROJECT_STATUSES}
+    grouped['Other'] = sum(count for status, count in counts.items() if status not in PROJECT_STATUSES)
+    return {status: count for status, count in grouped.items() if count}
+
+def to_widget(counts):
+    """{name: value} -> [{'name': ..., 'value': ...}] as expected by the charts"""
+    return [{'name': name, 'value': value} for name, value in counts.items()]
+
+# -----------------------------
+# Filters (?cohort_id=&class_id=&from=&to=)
+# -----------------------------
+def parse_dashboard_filters():
+    """
+    Read the optional cohort_id, class_id, from and to query parameters.
+    Returns (filters, error_response); filters only holds the parameters given.
+    """
+    filters = {}
+    for name in ('cohort_id', 'class_id'):
+        raw = request.args.get(name)
+        if raw:
+            try:
+                filters[name] = int(raw)
+            except ValueError:
+                return None, send_validation_error(f'{name} must be an integer')
+    for name in ('from', 'to'):
+        raw = request.args.get(name)
+        if raw:
+            try:
+                filters[name] = date.fromisoformat(raw[:10])
+            except ValueError:
+                return None, send_validation_error(f'{name} must be a date in YYYY-MM-DD format')
+    if 'from' in filters and 'to' in filters and filters['from'] > filters['to']:
+        return None, send_validation_error('from must not be after to')
+    return filters, None
+
+def scoped_key(name, filters):
+    """Cache key for an aggregate, unique per filter set"""
+    if not filters:
+        return name
+    return name + '?' + '&'.join(f'{k}={v}' for k, v in sorted(filters.items()))
+
+def filter_created(query, column, filters):
+    """Restrict a created_at column to the [from, to] day range (inclusive, UTC)"""
+    if 'from' in filters:
+        query = query.filter(column >= datetime.combine(filters['from'], time.min, tzinfo=timezone.utc))
+    if 'to' in filters:
+        query = query.filter(column < datetime.combine(filters['to'] + timedelta(days=1), time.min, tzinfo=timezone.utc))
+    return query
+
+def filter_projects(query, filters):
+    if 'cohort_id' in filters:
+        query = query.filter(Project.cohort_id == filters['cohort_id'])
+    if 'class_id' in filters:
+        query = query.filter(Project.class_id == filters['class_id'])
+    return filter_created(query, Project.created_at, filters)
+
+def filter_project_children(query, model, filters):
+    """Filter tasks/sprints by their project's cohort/class and their own created_at"""
+    if 'cohort_id' in filters or 'class_id' in filters:
+        query = query.join(Project, Project.id == model.project_id)
+        if 'cohort_id' in filters:
+            query = query.filter(Project.cohort_id == filters['cohort_id'])
+        if 'class_id' in filters:
+            query = query.filter(Project.class_id == filters['class_id'])
+    return filter_created(query, model.created_at, filters)
+
+# -----------------------------
+# Widget builders
+# -----------------------------
+def summary_totals(filters=None, from_counters=None):
+    if use_counters(filters, from_counters):
+        return {
+            'totalProjects': read_total('project'),
+            'totalTasks': read_total('task'),
+            'activeSprints': read_counters('sprint', 'status').get('Active', 0)
+        }
+    filters = filters or {}
+    return {
+        'totalProjects': filter_projects(db.session.query(func.count(Project.id)), filters).scalar(),
+        'totalTasks': filter_project_children(db.session.query(func.count(Task.id)), Task, filters).scalar(),
+        'activeSprints': filter_project_children(
+            db.session.query(func.count(Sprint.id)).filter(Sprint.status == 'Active'), Sprint, filters
+        ).scalar()
+    }
+
+def project_status_counts(filters=None, from_counters=None):
+    if use_counters(filters, from_counters):
+        return group_project_statuses(read_counters('project', 'status'))
+    query = db.session.query(Project.status, func.count(Project.id))
+    return group_project_statuses(dict(filter_projects(query, filters or {}).group_by(Project.status).all()))
+
+def project_team_counts(filters=None, from_counters=None):
+    if use_counters(filters, from_counters):
+        by_cohort = read_counters('project', 'cohort')
+        if not by_cohort:
+            return {}
+        names = dict(db.session.query(Cohort.id, Cohort.name).filter(Cohort.id.in_([int(k) for k in by_cohort])).all())
+        counts = {}
+        for cohort_id, count in by_cohort.items():
+            name = names.get(int(cohort_id))
+            if name is not None:
+                counts[name] = counts.get(name, 0) + count
+        return counts
+    query = db.session.query(Cohort.name, func.count(Project.id)).join(Project, Cohort.id == Project.cohort_id)
+    return dict(filter_projects(query, filters or {}).group_by(Cohort.name).all())
+
+def task_status_counts(filters=None, from_counters=None):
+    if use_counters(filters, from_counters):
+        return read_counters('task', 'status')
+    query = db.session.query(Task.status, func.count(Task.id))
+    return dict(filter_project_children(query, Task, filters or {}).group_by(Task.status).all())
+
+def overview_from_scans(filters=None):
+    """
+    Live fallback for the overview: projects are scanned once (per-cohort rows with
+    one conditional count per status), tasks once (grouped by status) and sprints once.
+    """
+    filters = filters or {}
+    project_rows = filter_projects(db.session.query(
+        Cohort.name,
+        func.count(Project.id),
+        *[count_where(Project.status == status) for status in PROJECT_STATUSES]
+    ).select_from(Project).outerjoin(Cohort, Cohort.id == Project.cohort_id), filters).group_by(Cohort.id, Cohort.name).all()
+
+    total_projects = 0
+    status_totals = dict.fromkeys(PROJECT_STATUSES, 0)
+    projects_by_team = []
+    for row in project_rows:
+        team, count, status_counts = row[0], row[1], row[2:]
+        total_projects += count
+        for status, status_count in zip(PROJECT_STATUSES, status_counts):
+            status_totals[status] += int(status_count or 0)
+        if team is not None:
+            projects_by_team.append({'name': team, 'value': count})
+
+    status_totals['Other'] = total_projects - sum(status_totals.values())
+    projects_by_status = to_widget(group_project_statuses(status_totals))
+
+    task_rows = filter_project_children(
+        db.session.query(Task.status, func.count(Task.id)), Task, filters
+    ).group_by(Task.status).all()
+    active_sprints = filter_project_children(
+        db.session.query(count_where(Sprint.status == 'Active')).select_from(Sprint), Sprint, filters
+    ).scalar()
+
+    return {
+        'summary': {
+            'totalProjects': total_projects,
+            'totalTasks': sum(count for _, count in task_rows),
+            'activeSprints': int(active_sprints or 0)
+        },
+        'projectsByStatus': projects_by_status,
+        'projectsByTeam': projects_by_team,
+        'taskProductivity': [{'name': status, 'value': count} for status, count in task_rows]
+    }
+
+def overview_from_counters():
+    """Every overview widget from stat_counters; the caller has checked they exist"""
+    return {
+        'summary': summary_totals(from_counters=True),
+        'projectsByStatus': to_widget(project_status_counts(from_counters=True)),
+        'projectsByTeam': to_widget(project_team_counts(from_counters=True)),
+        'taskProductivity': to_widget(task_status_counts(from_counters=True))
+    }
+
+# -----------------------------
+# Endpoints
+# -----------------------------
 @dashboard_routes.route('/dashboard/manager-summary', methods=['GET'])
+@cost(10)
 @token_required
 def manager_summary(current_user):
     if current_user.role != 'Manager':
         return jsonify({'message': 'Not authorized'}), 403
 
-    total_projects = Project.query.count()
-    total_tasks = Task.query.count()
-    active_sprints = Sprint.query.filter_by(status='Active').count()
-    
-    # Calculate some basic totals
-    return jsonify({
-        'totalProjects': total_projects,
-        'totalTasks': total_tasks,
-        'activeSprints': active_sprints
-    }), 200
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    return jsonify(cached_aggregate(scoped_key('manager-summary', filters), lambda: summary_totals(filters))), 200
 
 @dashboard_routes.route('/dashboard/projects-by-status', methods=['GET'])
+@cost(10)
 @token_required
 def projects_by_status(current_user):
     if current_user.role != 'Manager':
         return jsonify({'message': 'Not authorized'}), 403
-        
-    results = db.session.query(Project.status, func.count(Project.id)).group_by(Project.status).all()
-    
-    data = []
-    for status, count in results:
-        data.append({
-            'name': status,
-            'value': count
-        })
-        
-    return jsonify({'data': data}), 200
+
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    return jsonify(cached_aggregate(
+        scoped_key('projects-by-status', filters), lambda: {'data': to_widget(project_status_counts(filters))}
+    )), 200
 
 @dashboard_routes.route('/dashboard/projects-by-team', methods=['GET'])
+@cost(10)
 @token_required
 def projects_by_team(current_user):
     if current_user.role != 'Manager':
         return jsonify({'message': 'Not authorized'}), 403
-        
-    from app.models import Cohort
-    results = db.session.query(Cohort.name, func.count(Project.id)).join(Project, Cohort.id == Project.cohort_id).group_by(Cohort.name).all()
-    
-    data = []
-    for team, count in results:
-        data.append({
-            'name': team,
-            'value': count
-        })
-        
-    return jsonify({'data': data}), 200
+
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    return jsonify(cached_aggregate(
+        scoped_key('projects-by-team', filters), lambda: {'data': to_widget(project_team_counts(filters))}
+    )), 200
 
 @dashboard_routes.route('/dashboard/task-productivity', methods=['GET'])
+@cost(10)
 @token_required
 def task_productivity(current_user):
     if current_user.role != 'Manager':
         return jsonify({'message': 'Not authorized'}), 403
-        
-    results = db.session.query(Task.status, func.count(Task.id)).group_by(Task.status).all()
-    
-    data = []
-    for status, count in results:
-        data.append({
-            'name': status,
-            'value': count
-        })
-        
-    return jsonify({'data': data}), 200
+
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    return jsonify(cached_aggregate(
+        scoped_key('task-productivity', filters), lambda: {'data': to_widget(task_status_counts(filters))}
+    )), 200
+
+@dashboard_routes.route('/dashboard/overview', methods=['GET'])
+@cost(20)
+@token_required
+def dashboard_overview(current_user):
+    """
+    All manager dashboard widgets in one call, read from stat_counters
+    (or from a handful of aggregate scans when filtered or before the counters exist).
+    """
+    if current_user.role != 'Manager':
+        return jsonify({'message': 'Not authorized'}), 403
+
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    def compute():
+        if use_counters(filters):
+            return overview_from_counters()
+        return overview_from_scans(filters)
+
+    payload = cached_aggregate(scoped_key('overview', filters), compute)
+    # Unread count is per user, so it is never cached with the shared widgets
+    payload['unreadNotifications'] = unread_notification_count(current_user.id)
+    return jsonify(payload), 200
+
+def personal_dashboard(user_id, filters=None):
+    """
+    Home dashboard for one user. Every query is keyed by user_id and served by the
+    (assignee_id, status), (assignee_id, due_date) and (user_id, status) indexes.
+    """
+    filters = filters or {}
+    now = datetime.now(timezone.utc)
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_week = start_of_day + timedelta(days=7 - start_of_day.weekday())
+
+    open_tasks = filter_project_children(db.session.query(Task.status, func.count(Task.id)).filter(
+        Task.assignee_id == user_id,
+        Task.status != TASK_DONE_STATUS
+    ), Task, filters).group_by(Task.status).all()
+
+    due_this_week = filter_project_children(db.session.query(
+        Task.id, Task.title, Task.status, Task.priority, Task.due_date, Task.project_id
+    ).filter(
+        Task.assignee_id == user_id,
+        Task.status != TASK_DONE_STATUS,
+        Task.due_date >= start_of_day,
+        Task.due_date < end_of_week
+    ), Task, filters).order_by(Task.due_date).limit(50).all()
+
+    projects = filter_projects(db.session.query(
+        Project.id, Project.name, Project.status,
+        func.count(Task.id),
+        count_where(Task.status == TASK_DONE_STATUS)
+    ).join(ProjectMember, ProjectMember.project_id == Project.id).outerjoin(Task, Task.project_id == Project.id).filter(
+        ProjectMember.user_id == user_id,
+        ProjectMember.status == 'accepted'
+    ), filters).group_by(Project.id, Project.name, Project.status).order_by(Project.name).all()
+
+    invitations = db.session.query(
+        ProjectMember.id, ProjectMember.project_id, ProjectMember.role, Project.name
+    ).join(Project, Project.id == ProjectMember.project_id).filter(
+        ProjectMember.user_id == user_id,
+        ProjectMember.status == 'pending'
+    ).all()
+
+    return {
+        'openTasksByStatus': [{'name': status, 'value': count} for status, count in open_tasks],
+        'dueThisWeek': [{
+            'id': t.id,
+            'title': t.title,
+            'status': t.status,
+            'priority': t.priority,
+            'due_date': t.due_date.isoformat() if t.due_date else None,
+            'project_id': t.project_id
+        } for t in due_this_week],
+        'projects': [{
+            'id': project_id,
+            'name': name,
+            'status': status,
+            'totalTasks': total,
+            'completedTasks': int(done or 0),
+            'progress': round(100 * int(done or 0) / total) if total else 0
+        } for project_id, name, status, total, done in projects],
+        'pendingInvitations': [{
+            'id': invitation_id,
+            'project_id': project_id,
+            'project_name': project_name,
+            'role': role
+        } for invitation_id, project_id, role, project_name in invitations],
+        'unreadNotifications': unread_notification_count(user_id)
+    }
+
+@dashboard_routes.route('/dashboard/me', methods=['GET'])
+@cost(5)
+@token_required
+def my_dashboard(current_user):
+    """Personal home dashboard, available to every authenticated user"""
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+
+    user_id = current_user.id
+    return jsonify(cached_aggregate(
+        scoped_key(f'me:{user_id}', filters),
+        lambda: personal_dashboard(user_id, filters),
+        ttl=current_app.config['DASHBOARD_ME_CACHE_TTL']
+    )), 200
+
+# Longest window the throughput chart can request
+MAX_THROUGHPUT_WEEKS = 52
+
+@dashboard_routes.route('/dashboard/throughput', methods=['GET'])
+@cost(10)
+@token_required
+def task_throughput(current_user):
+    """
+    Tasks created and completed per day over the last `weeks` weeks (or the
+    from/to range), optionally for one project, cohort or class. Reads the
+    task_daily_stats rollup, so the cost depends on the number of days, not on
+    the number of tasks.
+    """
+    if current_user.role != 'Manager':
+        return jsonify({'message': 'Not authorized'}), 403
+
+    filters, error = parse_dashboard_filters()
+    if error:
+        return error
+    weeks = request.args.get('weeks', 12, type=int)
+    project_id = request.args.get('project_id', type=int)
+    if not weeks or weeks < 1 or weeks > MAX_THROUGHPUT_WEEKS:
+        return send_validation_error(f'weeks must be between 1 and {MAX_THROUGHPUT_WEEKS}')
+
+    end = filters.get('to') or datetime.now(timezone.utc).date()
+    start = filters.get('from') or end - timedelta(days=weeks * 7 - 1)
+    if (end - start).days >= MAX_THROUGHPUT_WEEKS * 7:
+        return send_validation_error(f'The date range cannot exceed {MAX_THROUGHPUT_WEEKS} weeks')
+
+    def compute():
+
+        query = db.session.query(
+            TaskDailyStat.day,
+            func.sum(TaskDailyStat.created),
+            func.sum(TaskDailyStat.completed)
+        ).filter(TaskDailyStat.day >= start, TaskDailyStat.day <= end)
+        if project_id:
+            query = query.filter(TaskDailyStat.project_id == project_id)
+        if 'cohort_id' in filters:
+            query = query.filter(TaskDailyStat.cohort_id == filters['cohort_id'])
+        if 'class_id' in filters:
+            query = query.filter(TaskDailyStat.class_id == filters['class_id'])
+        by_day = {day: (int(created or 0), int(completed or 0)) for day, created, completed in query.group_by(TaskDailyStat.day)}
+
+        data = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            created, completed = by_day.get(day, (0, 0))
+            data.append({'date': day.isoformat(), 'created': created, 'completed': completed})
+        return {'weeks': weeks, 'from': start.isoformat(), 'to': end.isoformat(), 'data': data}
+
+    key = scoped_key(f'throughput:{start}:{end}:{project_id}', filters)
+    return jsonify(cached_aggregate(key, compute)), 200
@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import SQLAlchemyError
-from app.models import db, Project, ProjectMember, User, Notification
+from app.models import db, Project, ProjectMember, User
 from app.utils.auth import token_required
 from app.utils.activity_log import log_activity
-from app.utils.email_utils import send_invitation_email
+from app.utils.notifications import notify
+from app.utils.email_outbox import enqueue_email, new_batch_key
 from datetime import datetime, timezone
 
 member_routes = Blueprint('member_routes', __name__)
@@ -45,40 +46,29 @@ def invite_member(current_user, project_id):
         db.session.add(new_member)
         
         # Create notification for the invited user
-        notification = Notification(
-            user_id=target_user.id,
-            type='project_invite',
-            message=f'You have been invited to join the project "{project.name}" as a {role}.',
-            link=f'/projects/{project.id}/invitations' # Link to where they can accept/decline
+        notify(
+            target_user.id, 'project_invite',
+            f'You have been invited to join the project "{project.name}" as a {role}.',
+            link=f'/projects/{project.id}/invitations',  # Link to where they can accept/decline
+            entity_type='project', entity_id=project.id
         )
-        db.session.add(notification)
         
+        log_activity(
+            current_user.id, f"Invited {target_user.email} as {role} to project {project.name}",
+            'project', project.id, 'member_invited', {'user_id': target_user.id, 'role': role}
+        )
+        # Sent by the outbox worker, only if this transaction commits
+        enqueue_email(
+            'invitation', target_user.email,
+            batch_key=new_batch_key('invitation', 'project', project.id, current_user.id),
+            recipient={'recipient_name': target_user.name},
+            project_name=project.name, inviter_name=current_user.name, project_id=project.id
+        )
         db.session.commit()
-        log_activity(current_user.id, f"Invited {target_user.email} as {role} to project {project.name}")
-
-        # Attempt to send email notification
-        email_sent = False
-        email_error = None
-        try:
-            send_invitation_email(target_user.email, project.name, current_user.name, project.id, target_user.id)
-            email_sent = True
-        except ValueError as ve:
-            # Invalid API key or configuration error
-            email_error = str(ve)
-        except Exception as e:
-            # SendGrid API error or other issues
-            email_error = f"Email service error: {str(e)}"
-
-        response_message = f'Invitation created as {role}'
-        if email_sent:
-            response_message += ' and email notification sent'
-        else:
-            response_message += f' but email notification failed: {email_error}'
 
         return jsonify({
-            'message': response_message,
-            'email_sent': email_sent,
-            'email_error': email_error,
+            'message': f'Invitation created as {role}; email notification queued',
+            'email_queued': True,
             'id': new_member.id
         }), 201
     except SQLAlchemyError as e:
@@ -110,16 +100,17 @@ def remove_member(current_user, project_id):
         db.session.delete(member)
         
         # Create notification for the removed user
-        notification = Notification(
-            user_id=user_id,
-            type='project_removed',
-            message=f'You have been removed from the project "{project.name}".',
-            link='/dashboard'
+        notify(
+            user_id, 'project_removed',
+            f'You have been removed from the project "{project.name}".',
+            link='/dashboard', entity_type='project', entity_id=project.id
         )
-        db.session.add(notification)
         
+        log_activity(
+            current_user.id, f"Removed user {user_id} from project {project.name}",
+            'project', project.id, 'member_removed', {'user_id': user_id}
+        )
         db.session.commit()
-        log_activity(current_user.id, f"Removed user {user_id} from project {project.name}")
         return jsonify({'message': 'Member removed successfully'}), 200
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -179,8 +170,11 @@ def respond_invitation(current_user, project_id):
             invitation.status = 'accepted'
             invitation.joined_at = datetime.now(timezone.utc)
 
+        log_activity(
+            current_user.id, f"{action.title()}ed invitation for project {project_id}",
+            'project', project_id, 'invitation_accepted' if action == 'accept' else 'invitation_declined'
+        )
         db.session.commit()
-        log_activity(current_user.id, f"{action.title()}ed invitation for project {project_id}")
         return jsonify({'message': f'Invitation {action}ed', 'role': invitation.role if action == 'accept' else None, 'status': invitation.status if action == 'accept' else 'removed'}), 200
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -230,8 +224,8 @@ def respond_invitation_email(project_id, user_id, action):
         if action == 'reject':
             # Remove the member if they reject
             db.session.delete(invitation)
+            log_activity(user_id, f"Rejected invitation for project {project.name}", 'project', project.id, 'invitation_declined')
             db.session.commit()
-            log_activity(user_id, f"Rejected invitation for project {project.name}")
 
             return render_template_string("""
                 <!DOCTYPE html>
@@ -250,16 +244,14 @@ def respond_invitation_email(project_id, user_id, action):
             invitation.joined_at = datetime.now(timezone.utc)
             
             # Notify project owner
-            notification = Notification(
-                user_id=project.owner_id,
-                type='invite_accepted',
-                message=f'{user.name} accepted the invitation to project "{project.name}".',
-                link=f'/projects/{project.id}'
+            notify(
+                project.owner_id, 'invite_accepted',
+                f'{user.name} accepted the invitation to project "{project.name}".',
+                link=f'/projects/{project.id}', entity_type='project', entity_id=project.id
             )
-            db.session.add(notification)
             
+            log_activity(user_id, f"Accepted invitation for project {project.name}", 'project', project.id, 'invitation_accepted')
             db.session.commit()
-            log_activity(user_id, f"Accepted invitation for project {project.name}")
 
             return render_template_string("""
                 <!DOCTYPE html>
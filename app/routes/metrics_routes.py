@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from app.utils.auth import token_required, role_required
+from app.utils.job_runs import latest_runs
+from app.utils.circuit_breaker import breaker_metrics
+import logging
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Operational metrics (Admin only)
+# -----------------------------
+@metrics_routes.route('/metrics', methods=['GET'])
+@token_required
+@role_required(['Manager'])
+def get_metrics(current_user):
+    return jsonify({
+        'jobs': latest_runs(),
+        # Breaker state is per process: this reflects the worker serving the request
+        'circuit_breakers': breaker_metrics()
+    }), 200
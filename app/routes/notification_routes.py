@@ -1,24 +1,59 @@
-from flask import Blueprint, jsonify
+import json
+import time
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+from sqlalchemy import func
 from app.models import db, Notification
 from app.utils.auth import token_required
+from app.utils.pagination import keyset_paginate
+from app.utils.error_handlers import send_error_response, send_validation_error
+from app.utils.notification_broker import notification_broker
 
 notification_routes = Blueprint('notification_routes', __name__)
 
+# Most ids accepted by one POST /notifications/read
+MAX_READ_IDS = 500
+
+def unread_filter(user_id):
+    # Matches the predicate of the partial index ix_notifications_user_id_unread
+    return (Notification.user_id == user_id, ~Notification.is_read)
+
+def unread_notification_count(user_id):
+    return db.session.query(func.count(Notification.id)).filter(*unread_filter(user_id)).scalar()
+
+def serialize_notification(n):
+    return {
+        'id': n.id,
+        'type': n.type,
+        'message': n.message,
+        'is_read': n.is_read,
+        'link': n.link,
+        'entity_type': n.entity_type,
+        'entity_id': n.entity_id,
+        'count': n.count,
+        'created_at': n.created_at.isoformat() if n.created_at else None
+    }
+
 @notification_routes.route('/notifications', methods=['GET'])
 @token_required
 def get_notifications(current_user):
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).limit(20).all()
+    """Newest first; pass ?cursor=<next_cursor> (and optionally ?limit=) for older pages"""
+    try:
+        page = keyset_paginate(
+            Notification.query.filter_by(user_id=current_user.id),
+            Notification.created_at, Notification.id, request
+        )
+    except ValueError as e:
+        return send_validation_error(str(e))
     return jsonify({
-        'notifications': [{
-            'id': n.id,
-            'type': n.type,
-            'message': n.message,
-            'is_read': n.is_read,
-            'link': n.link,
-            'created_at': n.created_at.isoformat() if n.created_at else None
-        } for n in notifications]
+        'notifications': [serialize_notification(n) for n in page['items']],
+        'next_cursor': page['next_cursor']
     }), 200
 
+@notification_routes.route('/notifications/unread-count', methods=['GET'])
+@token_required
+def unread_count(current_user):
+    return jsonify({'unread': unread_notification_count(current_user.id)}), 200
+
 @notification_routes.route('/notifications/<int:notification_id>/read', methods=['PATCH'])
 @token_required
 def mark_read(current_user, notification_id):
@@ -33,3 +68,122 @@ def mark_read(current_user, notification_id):
     db.session.commit()
     
     return jsonify({'message': 'Marked as read'}), 200
+
+@notification_routes.route('/notifications/read-all', methods=['POST'])
+@token_required
+def mark_all_read(current_user):
+    updated = db.session.execute(
+        db.update(Notification).where(*unread_filter(current_user.id)).values(is_read=True)
+    ).rowcount
+    db.session.commit()
+    return jsonify({'message': 'Marked as read', 'updated': updated}), 200
+
+@notification_routes.route('/notifications/read', methods=['POST'])
+@token_required
+def mark_many_read(current_user):
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return send_validation_error('ids must be a non-empty list')
+    if len(ids) > MAX_READ_IDS:
+        return send_validation_error(f'At most {MAX_READ_IDS} ids per request')
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return send_validation_error('ids must be integers')
+
+    # Ids belonging to other users are silently ignored
+    updated = db.session.execute(
+        db.update(Notification)
+        .where(*unread_filter(current_user.id), Notification.id.in_(set(ids)))
+        .values(is_read=True)
+    ).rowcount
+    db.session.commit()
+    return jsonify({'message': 'Marked as read', 'updated': updated}), 200
+
+# -----------------------------
+# Live notifications (Server-Sent Events)
+# -----------------------------
+def _sse_event(notification):
+    return f"id: {notification.id}\nevent: notification\ndata: {json.dumps(serialize_notification(notification))}\n\n"
+
+@notification_routes.route('/notifications/stream', methods=['GET'])
+@token_required
+def stream_notifications(current_user):
+    """
+    Push new notifications as they are committed.
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) to receive what
+    they missed; without it the stream starts from "now".
+    When this worker already serves NOTIFICATION_STREAM_MAX_PER_WORKER streams
+    it answers 503 with Retry-After, and the client polls until then.
+    """
+    user_id = current_user.id
+    config = current_app.config
+    heartbeat = config.get('NOTIFICATION_STREAM_HEARTBEAT', 15)
+    poll_interval = config.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2)
+    max_duration = config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)
+    batch_size = config.get('NOTIFICATION_STREAM_BATCH_SIZE', 50)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_id = int(last_event_id)
+        except ValueError:
+            return jsonify({'message': 'Last-Event-ID must be an integer'}), 400
+    else:
+        last_id = db.session.query(func.coalesce(func.max(Notification.id), 0)).filter(
+            Notification.user_id == user_id
+        ).scalar()
+
+    # With LISTEN/NOTIFY every commit wakes us; otherwise poll for other workers' writes
+    listening = notification_broker.start_listener(db.engine)
+    wait_for = heartbeat if listening else min(heartbeat, poll_interval)
+    wakeup = notification_broker.subscribe(user_id, limit=config.get('NOTIFICATION_STREAM_MAX_PER_WORKER'))
+    if wakeup is None:
+        retry_after = config.get('NOTIFICATION_STREAM_BUSY_RETRY_AFTER', 30)
+        response = send_error_response(
+            'Too many live streams on this server, poll /notifications instead', 503, 'STREAM_LIMIT', retry_after
+        )
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    # Nothing below needs the request's connection, give it back to the pool
+    db.session.remove()
+
+    def events():
+        nonlocal last_id
+        deadline = time.monotonic() + max_duration
+        last_sent = time.monotonic()
+        check = True
+        try:
+            yield f"retry: {config.get('NOTIFICATION_STREAM_RETRY_MS', 3000)}\n\n"
+            while True:
+                if check:
+                    while True:
+                        pending = Notification.query.filter(
+                            Notification.user_id == user_id,
+                            Notification.id > last_id
+                        ).order_by(Notification.id).limit(batch_size).all()
+                        db.session.remove()
+                        for notification in pending:
+                            last_id = notification.id
+                            yield _sse_event(notification)
+                        if pending:
+                            last_sent = time.monotonic()
+                        if len(pending) < batch_size:
+                            break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                woken = wakeup.wait(min(wait_for, remaining))
+                wakeup.clear()
+                check = woken or not listening
+                if not woken and time.monotonic() - last_sent >= heartbeat:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            notification_broker.unsubscribe(user_id, wakeup)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,10 +1,14 @@
 import logging
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import SQLAlchemyError
-from app.models import db, Project, ProjectMember, User, Class, Notification
+from app.models import db, Project, ProjectMember, User, Class
 from app.utils.auth import token_required
 from app.utils.pagination import paginate
 from app.utils.activity_log import log_activity
+from app.utils.notifications import notify
+from app.utils.email_outbox import enqueue_email, new_batch_key
+from app.utils.single_flight import single_flight
+from app.utils.rate_limits import cost
 from functools import wraps
 
 project_routes = Blueprint('project_routes', __name__)
@@ -75,8 +79,8 @@ def add_project(current_user):
         )
         db.session.add(owner_member)
         
+        log_activity(current_user.id, f"Created project: {project.name}", 'project', project.id, 'created')
         db.session.commit()
-        log_activity(current_user.id, f"Created project: {project.name}")
         logger.info(f"Project {project.id} created by user {current_user.id}")
         return jsonify({'message': 'Project created', 'id': project.id}), 201
     except SQLAlchemyError as e:
@@ -88,8 +92,15 @@ def add_project(current_user):
 # List projects (pagination + filtering)
 # -----------------------------
 @project_routes.route('/projects', methods=['GET'])
+@cost(5)
 @token_required
 def list_projects(current_user):
+    # Identical concurrent requests share one computation. Keyed per user so nobody
+    # gets a page computed before their own latest write was committed.
+    flight_key = f"projects:list:{current_user.id}:{request.args.get('page', 1)}:{request.args.get('per_page', 10)}"
+    return jsonify(single_flight.do(flight_key, build_project_page)), 200
+
+def build_project_page():
     query = db.session.query(Project)
 
     # Students can see all projects (no filtering by status)
@@ -139,12 +150,12 @@ def list_projects(current_user):
             'cohort': cohort_info
         })
 
-    return jsonify({
+    return {
         'items': items,
         'page': projects_paginated['page'],
         'total_pages': projects_paginated['total_pages'],
         'total_items': projects_paginated['total_items']
-    }), 200
+    }
 
 # -----------------------------
 # Get single project
@@ -249,8 +260,8 @@ def edit_project(current_user, project_id):
     members_invited = []
     members_errors = []
     if 'members' in data and isinstance(data['members'], list):
-        from app.utils.email_utils import send_invitation_email
-
+        # One batch per request, so the batch's inviter and project name are this request's
+        batch_key = new_batch_key('invitation', 'project', project.id, current_user.id)
         for member_email in data['members']:
             if not member_email or not isinstance(member_email, str):
                 continue
@@ -277,18 +288,23 @@ def edit_project(current_user, project_id):
                 db.session.add(invitation)
                 members_invited.append(member_email)
 
-                # Try to send email notification
-                try:
-                    send_invitation_email(user.email, project.name, current_user.name, project.id, user.id)
-                except Exception as email_error:
-                    logger.warning(f"Failed to send invitation email to {user.email}: {str(email_error)}")
+                # Queued with this transaction; the outbox worker sends this
+                # request's invitations together as SendGrid personalizations
+                enqueue_email(
+                    'invitation', user.email, batch_key=batch_key,
+                    recipient={'recipient_name': user.name},
+                    project_name=project.name, inviter_name=current_user.name, project_id=project.id
+                )
 
             except Exception as e:
                 members_errors.append(f"Failed to invite {member_email}: {str(e)}")
 
     try:
+        log_activity(
+            current_user.id, f"Updated project: {project.name}", 'project', project.id, 'updated',
+            {'members_invited': members_invited} if members_invited else None
+        )
         db.session.commit()
-        log_activity(current_user.id, f"Updated project: {project.name}")
         logger.info(f"Project {project.id} updated by user {current_user.id}")
 
         response_data = {'message': 'Project updated'}
@@ -316,8 +332,8 @@ def remove_project(current_user, project_id):
 
     try:
         db.session.delete(project)
+        log_activity(current_user.id, f"Deleted project: {project.name}", 'project', project.id, 'deleted')
         db.session.commit()
-        log_activity(current_user.id, f"Deleted project: {project.name}")
         logger.info(f"Project {project.id} deleted by user {current_user.id}")
         return jsonify({'message': 'Project deleted'})
     except SQLAlchemyError as e:
@@ -343,21 +359,23 @@ def change_project_status(current_user, project_id):
         logger.warning(f"User {current_user.id} provided invalid status '{status}' for project {project.id}")
         return jsonify({'message': f"Invalid status. Allowed: {', '.join(allowed_statuses)}"}), 400
 
+    previous_status = project.status
     project.status = status
     try:
         # Notify members about status change
         for member in project.members:
             if member.user_id != current_user.id:
-                notification = Notification(
-                    user_id=member.user_id,
-                    type='project_status_change',
-                    message=f'Project "{project.name}" status changed to {status}.',
-                    link=f'/projects/{project.id}'
+                notify(
+                    member.user_id, 'project_status_change',
+                    f'Project "{project.name}" status changed to {status}.',
+                    link=f'/projects/{project.id}', entity_type='project', entity_id=project.id
                 )
-                db.session.add(notification)
                 
+        log_activity(
+            current_user.id, f"Changed status of project {project.name} to {status}",
+            'project', project.id, 'status_changed', {'from': previous_status, 'to': status}
+        )
         db.session.commit()
-        log_activity(current_user.id, f"Changed status of project {project.name} to {status}")
         logger.info(f"Project {project.id} status changed to {status} by user {current_user.id}")
         return jsonify({'message': 'Project status updated'})
     except SQLAlchemyError as e:
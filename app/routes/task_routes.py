@@ -2,6 +2,7 @@ import logging
 from flask import Blueprint, request, jsonify, abort
 from datetime import datetime
 from app.models import db, Task, Project, User
+from app.utils.rate_limits import cost
 
 task_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
@@ -15,6 +16,7 @@ logger.setLevel(logging.INFO)
 # Get all tasks
 # -----------------------------
 @task_bp.route('/', methods=['GET'])
+@cost(25)
 def get_tasks():
     tasks = db.session.query(Task).all()
     return jsonify([
@@ -147,6 +149,7 @@ def delete_task(task_id):
 # Get all tasks for a specific project
 # -----------------------------
 @task_bp.route('/project/<int:project_id>', methods=['GET'])
+@cost(5)
 def get_tasks_by_project(project_id):
     tasks = db.session.query(Task).filter_by(project_id=project_id).all()
     return jsonify({
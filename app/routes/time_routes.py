@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
 from functools import wraps
 from app.models import db, TimeLog, Task
+from app.utils import auth
+from app.utils.error_handlers import send_validation_error
 from datetime import datetime, timezone
 import jwt
+import math
 import os
 
 time_routes = Blueprint('time_routes', __name__)
 
+# Upper bound on rows accepted by a single bulk/timesheet submission
+MAX_BULK_ENTRIES = 500
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -74,3 +80,83 @@ def delete_time_log(current_user, log_id):
     db.session.delete(log)
     db.session.commit()
     return jsonify({'message': 'Time log deleted successfully'})
+
+@time_routes.route('/time/bulk', methods=['POST'])
+@auth.token_required
+def log_time_bulk(current_user):
+    """
+    Log many time entries (e.g. a weekly timesheet) in one request.
+    Every row is validated independently; valid rows are inserted in a single
+    transaction and invalid ones are reported back with their index.
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('entries')
+
+    if not isinstance(entries, list) or not entries:
+        return send_validation_error('entries must be a non-empty list')
+    if len(entries) > MAX_BULK_ENTRIES:
+        return send_validation_error(f'A maximum of {MAX_BULK_ENTRIES} entries can be submitted at once')
+
+    errors = []
+    parsed = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({'index': index, 'message': 'Entry must be an object'})
+            continue
+        try:
+            task_id = int(entry['task_id'])
+        except (KeyError, TypeError, ValueError):
+            errors.append({'index': index, 'message': 'task_id is required'})
+            continue
+        try:
+            hours_spent = float(entry['hours_spent'])
+        except (KeyError, TypeError, ValueError):
+            errors.append({'index': index, 'message': 'hours_spent is required'})
+            continue
+        # NaN passes both comparisons, so check it is a real number first
+        if not math.isfinite(hours_spent) or hours_spent <= 0 or hours_spent > 24:
+            errors.append({'index': index, 'message': 'hours_spent must be between 0 and 24'})
+            continue
+        try:
+            date_logged = datetime.strptime(
+                entry.get('date_logged') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d'
+            ).date()
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'date_logged must be in YYYY-MM-DD format'})
+            continue
+
+        parsed.append((index, {
+            'task_id': task_id,
+            'user_id': current_user.id,
+            'hours_spent': hours_spent,
+            'date_logged': date_logged,
+            'description': entry.get('description', '')
+        }))
+
+    # Validate every referenced task with a single query
+    task_ids = {row['task_id'] for _, row in parsed}
+    existing_ids = set()
+    if task_ids:
+        existing_ids = set(db.session.execute(
+            db.select(Task.id).where(Task.id.in_(task_ids))
+        ).scalars())
+
+    rows = []
+    for index, row in parsed:
+        if row['task_id'] not in existing_ids:
+            errors.append({'index': index, 'message': f"Task {row['task_id']} not found"})
+            continue
+        rows.append(row)
+
+    if rows:
+        # A list of parameter sets is sent as one executemany() in one transaction
+        db.session.execute(db.insert(TimeLog), rows)
+        db.session.commit()
+
+    errors.sort(key=lambda e: e['index'])
+    return jsonify({
+        'message': f'{len(rows)} time entries logged',
+        'created': len(rows),
+        'total_hours': sum(row['hours_spent'] for row in rows),
+        'errors': errors
+    }), 201 if rows else 400
@@ -1,9 +1,173 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from sqlalchemy.exc import DataError, IntegrityError
 from app.models import db, ActivityLog
 
-def log_activity(user_id, action):
+logger = logging.getLogger(__name__)
+
+
+class ActivityWriter:
+    """
+    Writes activity log entries in one of two modes (ACTIVITY_LOG_MODE):
+
+    - "transaction" (default): the entry is added to the caller's session and is
+      committed, or rolled back, together with the change it describes.
+    - "buffered": entries are queued in memory and bulk inserted by a background
+      flusher every ACTIVITY_LOG_FLUSH_INTERVAL seconds or once
+      ACTIVITY_LOG_FLUSH_SIZE entries are waiting. Pending entries are flushed
+      when the worker exits. A batch the database rejects (integrity or data
+      errors) is inserted row by row and only the rejected rows are logged and
+      dropped. Any other failure, such as the database being unreachable,
+      keeps the entries queued and backs off, up to
+      ACTIVITY_LOG_RETRY_BACKOFF_MAX seconds between attempts; at most
+      ACTIVITY_LOG_MAX_QUEUE entries wait.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.mode = 'transaction'
+        self.flush_size = 100
+        self.flush_interval = 2.0
+        self.retry_backoff_max = 60.0
+        self.max_queue = 10000
+        self._failures = 0
+        self._retry_at = 0.0
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get('ACTIVITY_LOG_MODE', 'transaction')
+        self.flush_size = app.config.get('ACTIVITY_LOG_FLUSH_SIZE', 100)
+        self.flush_interval = app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)
+        self.retry_backoff_max = app.config.get('ACTIVITY_LOG_RETRY_BACKOFF_MAX', 60.0)
+        self.max_queue = app.config.get('ACTIVITY_LOG_MAX_QUEUE', 10000)
+        app.extensions['activity_writer'] = self
+
+    def write(self, user_id, action, entity_type=None, entity_id=None, verb=None, metadata=None):
+        entry = {
+            'user_id': user_id,
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'verb': verb,
+            'meta': metadata
+        }
+        if self.mode != 'buffered':
+            db.session.add(ActivityLog(**entry))
+            return
+
+        entry['created_at'] = datetime.now(timezone.utc)
+        if len(self._queue) >= self.max_queue:
+            logger.error(f"Activity log queue is full, dropping entry: {action}")
+            return
+        self._queue.append(entry)
+        self._ensure_flusher()
+        if len(self._queue) >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self, force=False):
+        """
+        Bulk insert every queued entry. Safe to call from any thread.
+        While backing off after a failure this does nothing unless `force`.
+        Returns how many entries were written.
+        """
+        with self._flush_lock:
+            if not force and time.monotonic() < self._retry_at:
+                return 0
+            rows = []
+            while self._queue:
+                rows.append(self._queue.popleft())
+            if not rows:
+                return 0
+            with self.app.app_context():
+                try:
+                    db.session.execute(db.insert(ActivityLog), rows)
+                    db.session.commit()
+                except (IntegrityError, DataError) as e:
+                    db.session.rollback()
+                    logger.error(f"Database rejected a batch of {len(rows)} activity log entries, "
+                                 f"inserting them one by one: {str(e)}")
+                    return self._insert_one_by_one(rows)
+                except Exception as e:
+                    db.session.rollback()
+                    self._back_off(rows, e)
+                    return 0
+            self._failures = 0
+            return len(rows)
+
+    def _back_off(self, rows, error):
+        """Keep `rows` for a later attempt, waiting longer after each consecutive failure"""
+        self._failures += 1
+        delay = min(self.flush_interval * 2 ** self._failures, self.retry_backoff_max)
+        self._retry_at = time.monotonic() + delay
+        logger.error(f"Failed to flush {len(rows)} activity log entries (attempt {self._failures}), "
+                     f"retrying in {delay:.0f}s: {str(error)}")
+        self._requeue(rows)
+
+    def _requeue(self, rows):
+        # Back in front of newer entries, dropping the oldest if the queue would overflow
+        overflow = len(rows) + len(self._queue) - self.max_queue
+        if overflow > 0:
+            logger.error(f"Activity log queue is full, dropping {overflow} oldest entries")
+            rows = rows[overflow:]
+        self._queue.extendleft(reversed(rows))
+
+    def _insert_one_by_one(self, rows):
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                db.session.execute(db.insert(ActivityLog), [row])
+                db.session.commit()
+                written += 1
+            except (IntegrityError, DataError) as e:
+                db.session.rollback()
+                logger.error(f"Dropping activity log entry {row!r}: {str(e)}")
+            except Exception as e:
+                # Not this row's fault: keep it and the rest
+                db.session.rollback()
+                self._back_off(rows[index:], e)
+                return written
+        self._failures = 0
+        return written
+
+    def _ensure_flusher(self):
+        # Started lazily (and again after a fork) so each gunicorn worker owns its flusher
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-log-flusher', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.flush, force=True)
+                self._atexit_registered = True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+activity_writer = ActivityWriter()
+
+def log_activity(user_id, action, entity_type=None, entity_id=None, verb=None, metadata=None):
     """
-    Logs any action performed by a user
+    Logs any action performed by a user.
+    `action` is the human readable line; entity_type/entity_id/verb/metadata make the
+    entry queryable per entity (e.g. a project's timeline).
+    Call it before the route's own commit so the entry is part of that transaction.
     """
-    log = ActivityLog(user_id=user_id, action=action)
-    db.session.add(log)
-    db.session.commit()
\ No newline at end of file
+    activity_writer.write(user_id, action, entity_type, entity_id, verb, metadata)
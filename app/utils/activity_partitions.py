@@ -0,0 +1,162 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from app.models import db, ActivityLog
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'activity_logs'
+PARTITION_NAME = re.compile(r'^activity_logs_(\d{4})_(\d{2})$')
+ARCHIVE_PREFIX = 'activity_logs_archive_'
+# Rows deleted per statement when retention runs on a plain table
+DELETE_BATCH_SIZE = 5000
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+def is_partitioned():
+    """True when activity_logs is a partitioned Postgres table"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {'name': PARENT_TABLE}).first() is not None
+
+def list_partitions():
+    """Return {month: table_name} for the monthly partitions currently attached"""
+    rows = db.session.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :name AND pg_table_is_visible(parent.oid)"
+    ), {'name': PARENT_TABLE}).scalars()
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def ensure_partitions(months_ahead=2, today=None):
+    """
+    Create the monthly partitions from the current month up to `months_ahead`
+    months ahead. Returns the names of the partitions that were created.
+    A no-op (empty list) when activity_logs is not partitioned.
+
+    If the job did not run for a while, rows for a missing month are already
+    in the DEFAULT partition and Postgres refuses to create the partition; those
+    rows are moved into the new partition (see create_partition).
+    """
+    if not is_partitioned():
+        return []
+    current = month_start(today or datetime.now(timezone.utc).date())
+    existing = list_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        created.append(create_partition(month))
+    if created:
+        logger.info(f"Created activity log partitions: {', '.join(created)}")
+    return created
+
+def create_partition(month):
+    """
+    Create the partition for `month` in its own transaction. When the DEFAULT
+    partition holds rows of that month it is detached, the rows are moved into
+    the new partition, and it is attached again.
+    """
+    name = partition_name(month)
+    bounds = {'start': month.isoformat(), 'end': add_months(month, 1).isoformat()}
+    default = f"{PARENT_TABLE}_default"
+    in_range = "created_at >= :start AND created_at < :end"
+    has_default = db.session.execute(text("SELECT to_regclass(:name)"), {'name': default}).scalar() is not None
+    stray = has_default and db.session.execute(
+        text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), bounds
+    ).first() is not None
+
+    try:
+        if stray:
+            db.session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {default}"))
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+        if stray:
+            moved = db.session.execute(text(
+                f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+                f"INSERT INTO {PARENT_TABLE} SELECT * FROM moved"
+            ), bounds).rowcount
+            db.session.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {default} DEFAULT"))
+            logger.info(f"Moved {moved} activity logs from {default} into {name}")
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return name
+
+def apply_retention(months, archive=False, today=None):
+    """
+    Remove activity logs older than `months` whole months.
+
+    On a partitioned table the expired monthly partitions are dropped, or with
+    `archive` detached and renamed to activity_logs_archive_YYYY_MM so they can
+    be dumped and dropped later. On a plain table (SQLite) the rows are deleted
+    in batches; `archive` is not supported there.
+    Returns a short description of what was removed.
+    """
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -months)
+
+    if not is_partitioned():
+        if archive:
+            raise ValueError("Archiving requires a partitioned activity_logs table (Postgres)")
+        cutoff_at = datetime(cutoff.year, cutoff.month, 1, tzinfo=timezone.utc)
+        deleted = 0
+        while True:
+            ids = db.session.query(ActivityLog.id).filter(
+                ActivityLog.created_at < cutoff_at
+            ).limit(DELETE_BATCH_SIZE).subquery()
+            result = db.session.execute(db.delete(ActivityLog).where(ActivityLog.id.in_(db.select(ids.c.id))))
+            db.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < DELETE_BATCH_SIZE:
+                break
+        logger.info(f"Deleted {deleted} activity logs older than {cutoff.isoformat()}")
+        return [f"{deleted} rows"]
+
+    removed = []
+    for month, name in sorted(list_partitions().items()):
+        if month >= cutoff:
+            continue
+        if archive:
+            archived = f"{ARCHIVE_PREFIX}{month:%Y_%m}"
+            db.session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            db.session.execute(text(f"ALTER TABLE {name} RENAME TO {archived}"))
+            removed.append(archived)
+        else:
+            db.session.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+        # One partition per transaction keeps the ACCESS EXCLUSIVE locks short
+        db.session.commit()
+
+    # Rows that landed in the DEFAULT partition (no monthly partition existed yet)
+    stray = db.session.execute(text(
+        f"DELETE FROM {PARENT_TABLE}_default WHERE created_at < :cutoff"
+    ), {'cutoff': cutoff}).rowcount
+    db.session.commit()
+    if stray:
+        removed.append(f"{stray} rows from {PARENT_TABLE}_default")
+    if removed:
+        logger.info(f"Activity log retention ({'archived' if archive else 'dropped'}): {', '.join(removed)}")
+    return removed
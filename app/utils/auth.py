@@ -3,10 +3,9 @@ import os
 import logging
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import request, current_app, jsonify
-from app.models import User
+from flask import request, current_app, jsonify, g
 from app.utils.error_handlers import send_unauthorized_error
-from app import db
+from app.utils.principals import principal_cache
 
 # -----------------------------
 # Configure logger
@@ -35,13 +34,38 @@ def generate_jwt(user_id, role, expires_hours=1):
     token = jwt.encode(payload, secret_key, algorithm="HS256")
     return token
 
+# -----------------------------
+# User id from the JWT cookie (no database access)
+# -----------------------------
+def jwt_user_id():
+    """
+    Returns the user id of a valid JWT cookie, or None.
+    Used before the route runs (e.g. to key rate limits); token_required still
+    does the full check. Decoded once per request.
+    """
+    token = request.cookies.get('jwt')
+    if not token:
+        return None
+    cached = g.get('jwt_user')
+    if cached and cached[0] == token:
+        return cached[1]
+    user_id = None
+    try:
+        secret_key = current_app.config.get("SECRET_KEY") or os.environ.get("SECRET_KEY")
+        user_id = jwt.decode(token, secret_key, algorithms=["HS256"]).get("user_id")
+    except jwt.InvalidTokenError:
+        pass
+    g.jwt_user = (token, user_id)
+    return user_id
+
 # -----------------------------
 # Token verification decorator
 # -----------------------------
 def token_required(f):
     """
     Decorator to protect routes requiring JWT authentication.
-    Adds 'current_user' as the first argument to the route.
+    Adds 'current_user' as the first argument to the route: a Principal served
+    from the per-worker principal cache, which loads the ORM User on demand.
     Reads JWT from httpOnly cookie instead of Authorization header.
     """
     @wraps(f)
@@ -61,8 +85,7 @@ def token_required(f):
         try:
             secret_key = current_app.config.get("SECRET_KEY") or os.environ.get("SECRET_KEY")
             data = jwt.decode(token, secret_key, algorithms=["HS256"])
-            # Use SQLAlchemy 2.x Session.get() instead of legacy Query.get()
-            current_user = db.session.get(User, data["user_id"])
+            current_user = principal_cache.load(data["user_id"])
             if not current_user:
                 raise Exception("User not found")
         except jwt.ExpiredSignatureError:
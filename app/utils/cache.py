@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry.
+    Entries remember when they were computed so callers can report their age.
+    With max_entries set it also evicts the least recently used entry when full.
+    """
+
+    def __init__(self, default_ttl=60, max_entries=None):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, age_in_seconds) or None if missing/expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            value, stored_at, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            if self.max_entries:
+                self._entries.move_to_end(key)
+        return value, now - stored_at
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, now, now + ttl)
+            if self.max_entries:
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_set(self, key, compute, ttl=None):
+        """
+        Return (value, age) for key, calling compute() on a miss.
+        A freshly computed value has an age of 0.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        self.set(key, value, ttl)
+        return value, 0.0
+
+    def invalidate(self, prefix=None):
+        """Drop every entry, or only those whose key starts with prefix"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if str(k).startswith(prefix)]:
+                    del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+
+def invalidate_on_commit(cache, *models):
+    """
+    Clear `cache` whenever a transaction that inserted, updated or deleted an
+    instance of one of `models` is committed. Rolled back work is ignored.
+
+    Only changes flushed from ORM instances are seen: bulk db.update() /
+    db.delete() statements, raw SQL and other processes bypass the hooks, so
+    code writing that way must clear the cache itself (entries otherwise live
+    until their TTL).
+    """
+    flag = f"invalidate_cache_{id(cache)}"
+
+    @event.listens_for(Session, 'after_flush')
+    def _mark_dirty(session, flush_context):
+        if session.info.get(flag):
+            return
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, models):
+                session.info[flag] = True
+                return
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate(session):
+        if session.info.pop(flag, False):
+            cache.clear()
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard(session):
+        session.info.pop(flag, None)
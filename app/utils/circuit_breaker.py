@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker around calls to one external provider.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    fail fast with CircuitOpenError for `reset_timeout` seconds. It then goes
+    half-open and lets one trial call through: success closes it, failure
+    opens it again. `is_failure(exc)` decides which errors count (client errors
+    such as a rejected upload should not trip it).
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda exc: True)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.stats = {'calls': 0, 'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, reset_timeout=None):
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+
+    def _admit(self):
+        with self._lock:
+            self.stats['calls'] += 1
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+                logger.info(f"Circuit '{self.name}' half-open, allowing a trial call")
+            if self.state == HALF_OPEN:
+                if self.trial_in_flight:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self.trial_in_flight = True
+
+    def _on_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            if self.state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self.state = CLOSED
+
+    def _on_failure(self):
+        with self._lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['opened'] += 1
+                    logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        self._admit()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+        self._on_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self.state
+            if state == OPEN and time.monotonic() >= self.opened_at + self.reset_timeout:
+                state = HALF_OPEN
+            return dict(self.stats, state=state, consecutive_failures=self.consecutive_failures)
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+def get_breaker(name, **options):
+    """Return the process-wide breaker for a provider, creating it on first use"""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **options)
+        return breaker
+
+def breaker_metrics():
+    """{name: state and counters} for every breaker in this process"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+def configure_breakers(app):
+    """Apply CIRCUIT_BREAKER_* settings to every registered breaker"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.configure(
+            app.config.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD'),
+            app.config.get('CIRCUIT_BREAKER_RESET_TIMEOUT')
+        )
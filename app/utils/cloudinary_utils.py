@@ -1,6 +1,15 @@
 import cloudinary
+import cloudinary.exceptions
 import cloudinary.uploader
 from flask import current_app, has_app_context
+from urllib3 import Timeout
+from app.utils.circuit_breaker import get_breaker
+
+def _is_outage(exc):
+    # Rejections of the request itself (bad file, auth, not found) are not outages
+    return not isinstance(exc, cloudinary.exceptions.Error) or isinstance(exc, cloudinary.exceptions.GeneralError)
+
+cloudinary_breaker = get_breaker('cloudinary', is_failure=_is_outage)
 
 def configure_cloudinary(app=None):
     """
@@ -39,4 +48,17 @@ def upload_image(file, folder="project_covers"):
     except Exception as e:
         # Log the error (replace print with your logger if needed)
         print(f"[Cloudinary] Upload failed: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def upload_file(file, **options):
+    """
+    cloudinary.uploader.upload with the configured connect/read timeouts, behind
+    the 'cloudinary' circuit breaker. Raises CircuitOpenError while Cloudinary is
+    considered down, and the upload's own errors otherwise.
+    """
+    config = current_app.config
+    timeout = Timeout(
+        connect=config.get('CLOUDINARY_CONNECT_TIMEOUT', 5),
+        read=config.get('CLOUDINARY_READ_TIMEOUT', 60)
+    )
+    return cloudinary_breaker.call(cloudinary.uploader.upload, file, timeout=timeout, **options)
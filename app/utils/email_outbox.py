@@ -0,0 +1,259 @@
+import json
+import logging
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from html import escape
+from flask import current_app
+from sqlalchemy import or_, and_
+from app.models import db, EmailOutbox
+from app.utils.mail_service import mail_service, TEMPLATES
+from app.utils.email_transports import get_transport
+from app.utils.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Payloads holding secrets (login codes) are wiped once the message is sent or given up on
+SECRET_PAYLOAD_KINDS = ('2fa_code',)
+# Kinds that are useless after a while, mapped to the config key holding their
+# lifetime in seconds; they are given up on instead of retried past it
+SEND_DEADLINES = {'2fa_code': 'TWO_FACTOR_CODE_TTL'}
+
+
+def enqueue_email(kind, to_email, batch_key=None, recipient=None, **payload):
+    """
+    Queue an email in the caller's session; it is only sent if the caller's
+    transaction commits. `payload` holds the template's context and must be
+    JSON serializable.
+
+    Messages sharing a `batch_key` (see new_batch_key) are sent together and
+    only the values in `recipient` (such as recipient_name) differ per
+    recipient; messages whose other payload differs are never merged.
+    """
+    if kind not in TEMPLATES:
+        raise ValueError(f"Unknown email kind '{kind}'")
+    if recipient:
+        payload['recipient'] = recipient
+    message = EmailOutbox(kind=kind, to_email=to_email, batch_key=batch_key, payload=payload)
+    db.session.add(message)
+    return message
+
+def new_batch_key(*parts):
+    """
+    A batch key for the emails queued by one request, e.g.
+    new_batch_key('invitation', 'project', project.id, current_user.id).
+    The random suffix keeps other requests' messages out of the batch.
+    """
+    return ':'.join([str(part) for part in parts] + [uuid.uuid4().hex])
+
+def _shared_payload_key(payload):
+    return json.dumps({k: v for k, v in payload.items() if k != 'recipient'}, sort_keys=True, default=str)
+
+def backoff_delay(attempts):
+    """Seconds before retry number `attempts`: exponential with +-20% jitter, capped"""
+    config = current_app.config
+    delay = min(config.get('EMAIL_OUTBOX_BACKOFF_BASE', 30) * 2 ** (attempts - 1),
+                config.get('EMAIL_OUTBOX_BACKOFF_MAX', 3600))
+    return delay * random.uniform(0.8, 1.2)
+
+def send_deadline(message):
+    """When a claimed message stops being worth sending, or None if it never does"""
+    key = SEND_DEADLINES.get(message['kind'])
+    if not key or not message.get('created_at'):
+        return None
+    created_at = message['created_at']
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at + timedelta(seconds=current_app.config.get(key, 600))
+
+def claim_batch(batch_size):
+    """
+    Lock up to batch_size due messages for this worker and mark them 'sending'.
+    SKIP LOCKED lets several workers drain the outbox without blocking each other;
+    'sending' rows whose worker died are reclaimed after EMAIL_OUTBOX_LOCK_TIMEOUT.
+    """
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=current_app.config.get('EMAIL_OUTBOX_LOCK_TIMEOUT', 300))
+    rows = EmailOutbox.query.filter(or_(
+        and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale)
+    )).order_by(EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    claimed = [{'id': r.id, 'kind': r.kind, 'to_email': r.to_email, 'payload': r.payload or {},
+                'batch_key': r.batch_key, 'attempts': r.attempts, 'created_at': r.created_at} for r in rows]
+    for row in rows:
+        row.status = 'sending'
+        row.locked_at = now
+    db.session.commit()
+    return claimed
+
+def process_outbox(transport=None, batch_size=None):
+    """
+    Send one batch of due messages. Messages queued with the same batch_key are
+    rendered once and handed to the transport together (SendGrid sends them as
+    personalizations of a single request). Failures are retried with exponential
+    backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then marked 'failed'.
+    Messages past their send_deadline are marked 'failed' without being sent.
+    Returns {'sent', 'retried', 'failed'} counts.
+    """
+    config = current_app.config
+    transport = transport or get_transport(config)
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    singles, batches = [], defaultdict(list)
+    now = datetime.now(timezone.utc)
+    for message in claim_batch(batch_size or config.get('EMAIL_OUTBOX_BATCH_SIZE', 200)):
+        deadline = send_deadline(message)
+        if deadline and deadline <= now:
+            values = {'attempts': message['attempts'], 'locked_at': None, 'last_error': 'Expired before it could be sent'}
+            _give_up(message, values, stats)
+            db.session.execute(db.update(EmailOutbox).where(EmailOutbox.id == message['id']).values(**values))
+            continue
+        if message['batch_key']:
+            # The template is rendered once per group from its shared payload
+            batches[(message['kind'], message['batch_key'], _shared_payload_key(message['payload']))].append(message)
+        else:
+            singles.append(message)
+    db.session.commit()
+    for group in batches.values():
+        if len(group) == 1:
+            singles.extend(group)
+            continue
+        _send_group(transport, group, stats)
+
+    for message in singles:
+        error = None
+        try:
+            payload = dict(message['payload'])
+            payload.update(payload.pop('recipient', None) or {})
+            subject, html = mail_service.render(message['kind'], **payload)
+            transport.send(message['to_email'], subject, html)
+        except Exception as e:
+            error = e
+        _record(message, error, stats)
+        db.session.commit()
+
+    return stats
+
+def _send_group(transport, group, stats):
+    """Render once with per-recipient placeholders and send as one batch"""
+    by_email = defaultdict(list)
+    try:
+        shared = dict(group[0]['payload'])
+        fields = sorted({key for m in group for key in (m['payload'].get('recipient') or {})})
+        shared.pop('recipient', None)
+        shared.update({field: f'-{field}-' for field in fields})
+        subject, html = mail_service.render(group[0]['kind'], **shared)
+
+        recipients = []
+        for message in group:
+            values = message['payload'].get('recipient') or {}
+            recipients.append((message['to_email'], {
+                f'-{field}-': escape(str(values.get(field) or '')) for field in fields
+            }))
+            by_email[message['to_email']].append(message)
+        results = transport.send_batch(recipients, subject, html)
+    except Exception as e:
+        results = [([m['to_email'] for m in group], e)]
+        by_email = defaultdict(list)
+        for message in group:
+            by_email[message['to_email']].append(message)
+
+    for emails, error in results:
+        for email in emails:
+            for message in by_email.pop(email, []):
+                _record(message, error, stats)
+    db.session.commit()
+
+def _record(message, error, stats):
+    """Mark a message sent, or schedule its retry / give up"""
+    attempts = message['attempts'] + 1
+    values = {'attempts': attempts, 'locked_at': None}
+    now = datetime.now(timezone.utc)
+    deadline = send_deadline(message)
+    if isinstance(error, CircuitOpenError):
+        # Never attempted: wait for the breaker without using up a retry
+        values.update(attempts=message['attempts'], last_error=str(error))
+        retry_at = now + timedelta(seconds=error.retry_after)
+        if deadline and retry_at >= deadline:
+            _give_up(message, values, stats)
+        else:
+            values.update(status='pending', next_attempt_at=retry_at)
+            stats['retried'] += 1
+    elif error is None:
+        values.update(status='sent', sent_at=now, last_error=None)
+        if message['kind'] in SECRET_PAYLOAD_KINDS:
+            values['payload'] = db.null()
+        stats['sent'] += 1
+    else:
+        values['last_error'] = str(error)[:1000]
+        retry_at = now + timedelta(seconds=backoff_delay(attempts))
+        if attempts >= current_app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 8) or (deadline and retry_at >= deadline):
+            _give_up(message, values, stats)
+        else:
+            values['status'] = 'pending'
+            values['next_attempt_at'] = retry_at
+            stats['retried'] += 1
+            logger.warning(f"Email {message['id']} to {message['to_email']} failed (attempt {attempts}), will retry: {str(error)}")
+    db.session.execute(db.update(EmailOutbox).where(EmailOutbox.id == message['id']).values(**values))
+
+def _give_up(message, values, stats):
+    """Mark `values` 'failed' for good, wiping any secret payload"""
+    values['status'] = 'failed'
+    if message['kind'] in SECRET_PAYLOAD_KINDS:
+        values['payload'] = db.null()
+    stats['failed'] += 1
+    logger.error(f"Giving up on email {message['id']} to {message['to_email']} after {values['attempts']} attempts: {values['last_error']}")
+
+def purge_outbox(sent_days=None, failed_days=None, batch_size=None):
+    """
+    Delete sent messages older than `sent_days` and failed ones older than
+    `failed_days`, `batch_size` rows per transaction, and wipe any secret
+    payload still left on a finished message. Returns
+    {'sent_deleted': n, 'failed_deleted': m, 'payloads_cleared': k}.
+    """
+    config = current_app.config
+    sent_days = config.get('EMAIL_OUTBOX_RETENTION_SENT_DAYS', 7) if sent_days is None else sent_days
+    failed_days = config.get('EMAIL_OUTBOX_RETENTION_FAILED_DAYS', 30) if failed_days is None else failed_days
+    batch_size = batch_size or config.get('EMAIL_OUTBOX_PURGE_BATCH_SIZE', 1000)
+    now = datetime.now(timezone.utc)
+
+    def purge(*conditions):
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.session.query(EmailOutbox.id).filter(*conditions).limit(batch_size)]
+            if not ids:
+                return deleted
+            db.session.execute(db.delete(EmailOutbox).where(EmailOutbox.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+
+    stats = {
+        'sent_deleted': purge(EmailOutbox.status == 'sent', EmailOutbox.sent_at < now - timedelta(days=sent_days)),
+        'failed_deleted': purge(EmailOutbox.status == 'failed', EmailOutbox.created_at < now - timedelta(days=failed_days))
+    }
+    stats['payloads_cleared'] = db.session.execute(
+        db.update(EmailOutbox).where(
+            EmailOutbox.kind.in_(SECRET_PAYLOAD_KINDS),
+            EmailOutbox.status.in_(('sent', 'failed')),
+            EmailOutbox.payload.isnot(None)
+        ).values(payload=db.null()).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return stats
+
+def run_worker(poll_interval=None, stop=None):
+    """Drain the outbox forever (or until stop() is true), sleeping when it is empty"""
+    poll_interval = poll_interval or current_app.config.get('EMAIL_OUTBOX_POLL_INTERVAL', 2)
+    transport = get_transport(current_app.config)
+    logger.info(f"Email outbox worker started ({type(transport).__name__})")
+    while not (stop and stop()):
+        try:
+            stats = process_outbox(transport)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Email outbox pass failed: {str(e)}")
+            stats = None
+        if not stats or not any(stats.values()):
+            time.sleep(poll_interval)
@@ -0,0 +1,111 @@
+import abc
+import json
+import logging
+import os
+import smtplib
+import time
+import uuid
+from email.message import EmailMessage
+from app.utils.mail_service import mail_service
+
+logger = logging.getLogger(__name__)
+
+
+def apply_substitutions(text, substitutions):
+    for placeholder, value in (substitutions or {}).items():
+        text = text.replace(placeholder, value)
+    return text
+
+
+class Transport(abc.ABC):
+    """Base transport: send() one message; send_batch() falls back to one send per recipient"""
+
+    @abc.abstractmethod
+    def send(self, to_email, subject, html):
+        """Send one message; returns a short provider reference for logging"""
+
+    def send_batch(self, recipients, subject, html):
+        """
+        `recipients` is a list of (to_email, substitutions). Returns a list of
+        (emails, error_or_None), one entry per request made.
+        """
+        results = []
+        for to_email, substitutions in recipients:
+            try:
+                self.send(to_email, apply_substitutions(subject, substitutions), apply_substitutions(html, substitutions))
+                results.append(([to_email], None))
+            except Exception as e:
+                results.append(([to_email], e))
+        return results
+
+
+class SendGridTransport(Transport):
+    """Production transport: the process-wide SendGrid client of mail_service"""
+
+    def send(self, to_email, subject, html):
+        response = mail_service.send_html(to_email, subject, html)
+        return f"sendgrid:{response.status_code}"
+
+    def send_batch(self, recipients, subject, html):
+        # One request per SENDGRID_MAX_PERSONALIZATIONS recipients
+        return mail_service.send_batch(recipients, subject, html)
+
+
+class FileTransport(Transport):
+    """Writes each message as a JSON file; for development and tests"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, to_email, subject, html):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.time():.6f}-{uuid.uuid4().hex[:8]}.json"
+        with open(os.path.join(self.directory, name), 'w') as fh:
+            json.dump({'to': to_email, 'subject': subject, 'html': html}, fh)
+        return f"file:{name}"
+
+
+class SMTPTransport(Transport):
+    """Plain SMTP, e.g. a local MailHog/Mailpit instance"""
+
+    def __init__(self, host, port=25, username=None, password=None, use_tls=False, sender=None, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender = sender or 'no-reply@projectx.com'
+        self.timeout = timeout
+
+    def send(self, to_email, subject, html):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = to_email
+        message['Subject'] = subject
+        message.set_content(html, subtype='html')
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+        return f"smtp:{self.host}"
+
+
+def get_transport(config):
+    """Build the transport selected by EMAIL_TRANSPORT (sendgrid, file or smtp)"""
+    name = config.get('EMAIL_TRANSPORT', 'sendgrid')
+    if name == 'file':
+        return FileTransport(config.get('EMAIL_FILE_DIR'))
+    if name == 'smtp':
+        return SMTPTransport(
+            config.get('SMTP_HOST', 'localhost'),
+            config.get('SMTP_PORT', 25),
+            config.get('SMTP_USERNAME'),
+            config.get('SMTP_PASSWORD'),
+            config.get('SMTP_USE_TLS', False),
+            config.get('SENDGRID_SENDER_EMAIL')
+        )
+    if name == 'sendgrid':
+        return SendGridTransport()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT '{name}'")
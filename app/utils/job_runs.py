@@ -0,0 +1,51 @@
+import logging
+import time
+from datetime import datetime, timezone
+from sqlalchemy import func
+from app.models import db, JobRun
+
+logger = logging.getLogger(__name__)
+
+
+def run_job(name, job):
+    """
+    Run `job()` and record it in job_runs. The job returns a dict of counts,
+    which is stored as the run's stats. Errors are recorded and re-raised.
+    """
+    run = JobRun(job=name, status='running')
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.id
+    started = time.monotonic()
+    try:
+        stats = job() or {}
+    except Exception as e:
+        db.session.rollback()
+        _finish(run_id, 'failed', {'duration_seconds': round(time.monotonic() - started, 3)}, str(e))
+        logger.error(f"Job {name} failed: {str(e)}")
+        raise
+    stats = dict(stats, duration_seconds=round(time.monotonic() - started, 3))
+    _finish(run_id, 'succeeded', stats)
+    logger.info(f"Job {name} finished: {stats}")
+    return stats
+
+def _finish(run_id, status, stats, error=None):
+    db.session.execute(db.update(JobRun).where(JobRun.id == run_id).values(
+        status=status, stats=stats, error=error, finished_at=datetime.now(timezone.utc)
+    ))
+    db.session.commit()
+
+def latest_runs():
+    """Most recent run of every job, keyed by job name"""
+    latest = db.session.query(JobRun.job, func.max(JobRun.id).label('id')).group_by(JobRun.job).subquery()
+    runs = JobRun.query.join(latest, JobRun.id == latest.c.id).all()
+    return {
+        run.job: {
+            'status': run.status,
+            'stats': run.stats,
+            'error': run.error,
+            'started_at': run.started_at.isoformat() if run.started_at else None,
+            'finished_at': run.finished_at.isoformat() if run.finished_at else None
+        }
+        for run in runs
+    }
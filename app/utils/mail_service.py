@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import sendgrid
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from python_http_client.exceptions import HTTPError
+from sendgrid.helpers.mail import Mail, Email, To, Content
+from app.utils.circuit_breaker import get_breaker
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'email')
+# Email kinds; each has a templates/email/<kind>.html with `subject` and `body` blocks
+TEMPLATES = ('verification', 'invitation', '2fa_code', 'notification_digest')
+
+def _is_outage(exc):
+    # 4xx responses (bad request, auth) are our problem, not SendGrid being down
+    if isinstance(exc, HTTPError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    return not isinstance(exc, ValueError)
+
+sendgrid_breaker = get_breaker('sendgrid', is_failure=_is_outage)
+
+
+class MailService:
+    """
+    One per process: owns the Jinja environment for email templates and a single
+    SendGrid client, so sending no longer re-reads settings, re-validates the
+    key, builds a client or re-parses HTML on every call.
+
+    Templates are compiled once in init_app(); the bytecode cache lets the other
+    gunicorn workers and the outbox worker load them without recompiling.
+    """
+
+    def __init__(self):
+        self.env = None
+        self.sender_email = 'no-reply@projectx.com'
+        self.frontend_url = 'http://127.0.0.1:5173'
+        self.max_personalizations = 1000  # SendGrid's per-request limit
+        self.timeout = 10
+        self._api_key = None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._templates = {}
+
+    def init_app(self, app):
+        config = app.config
+        self.sender_email = config.get('SENDGRID_SENDER_EMAIL') or self.sender_email
+        self.frontend_url = os.environ.get('FRONTEND_URL', self.frontend_url)
+        self.max_personalizations = config.get('SENDGRID_MAX_PERSONALIZATIONS', self.max_personalizations)
+        self.timeout = config.get('SENDGRID_TIMEOUT', self.timeout)
+        self._api_key = os.environ.get('SENDGRID_API_KEY')
+        self._client = None
+
+        cache_dir = config.get('MAIL_TEMPLATE_CACHE_DIR')
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            bytecode_cache=bytecode_cache,
+            autoescape=select_autoescape(['html']),
+            auto_reload=False
+        )
+        self._templates = {kind: self.env.get_template(f'{kind}.html') for kind in TEMPLATES}
+        app.extensions['mail_service'] = self
+
+    @property
+    def client(self):
+        """The process-wide SendGrid client, validated and built on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    api_key = self._api_key or os.environ.get('SENDGRID_API_KEY')
+                    if not api_key:
+                        logger.error("SENDGRID_API_KEY not found in environment variables")
+                        raise ValueError("SendGrid API key not configured")
+                    if len(api_key) < 50 or not api_key.startswith('SG.'):
+                        logger.error(f"Invalid SendGrid API key format (length: {len(api_key)})")
+                        raise ValueError("SendGrid API key appears to be invalid. Valid keys start with 'SG.' and are 69+ characters long")
+                    client = sendgrid.SendGridAPIClient(api_key=api_key)
+                    # urllib applies this to the connect and to every blocking read
+                    client.client.timeout = self.timeout
+                    self._client = client
+        return self._client
+
+    def render(self, kind, **context):
+        """
+        Return (subject, html) for an email kind. Only the body is HTML-escaped;
+        subject blocks turn autoescape off since a subject is plain text.
+        """
+        template = self._templates.get(kind)
+        if template is None:
+            raise ValueError(f"Unknown email kind '{kind}'")
+        context.setdefault('frontend_url', self.frontend_url)
+        ctx = template.new_context(context)
+        subject = ''.join(template.blocks['subject'](ctx)).strip()
+        html = ''.join(template.blocks['body'](ctx)).strip()
+        return subject, html
+
+    def send_html(self, to_email, subject, html):
+        """Send an already rendered email through SendGrid"""
+        mail = Mail(Email(self.sender_email), To(to_email), subject, Content("text/html", html))
+        return sendgrid_breaker.call(self.client.send, mail)
+
+    def send(self, to_email, kind, **context):
+        return self.send_html(to_email, *self.render(kind, **context))
+
+    def send_batch(self, recipients, subject, html):
+        """
+        Send one rendered email to many recipients using SendGrid personalizations:
+        one API request per `max_personalizations` recipients instead of one per
+        recipient. `recipients` is a list of (to_email, substitutions) where
+        substitutions maps placeholders in subject/html (e.g. "-recipient_name-")
+        to that recipient's values. Returns a list of (chunk_emails, error_or_None).
+        """
+        results = []
+        for start in range(0, len(recipients), self.max_personalizations):
+            chunk = recipients[start:start + self.max_personalizations]
+            mail = Mail(
+                Email(self.sender_email),
+                [To(email, substitutions=substitutions or None) for email, substitutions in chunk],
+                subject, html_content=html, is_multiple=True
+            )
+            emails = [email for email, _ in chunk]
+            try:
+                sendgrid_breaker.call(self.client.send, mail)
+                results.append((emails, None))
+            except Exception as e:
+                logger.error(f"Failed to send batch of {len(chunk)} emails '{subject}': {str(e)}")
+                results.append((emails, e))
+        return results
+
+    def send_many(self, messages):
+        """
+        Send several emails over the shared client.
+        `messages` is an iterable of (to_email, kind, context) tuples; one failure
+        does not stop the rest. Returns a list of (to_email, error_or_None).
+        """
+        results = []
+        for to_email, kind, context in messages:
+            try:
+                self.send(to_email, kind, **context)
+                results.append((to_email, None))
+            except Exception as e:
+                logger.error(f"Failed to send {kind} email to {to_email}: {str(e)}")
+                results.append((to_email, e))
+        return results
+
+
+mail_service = MailService()
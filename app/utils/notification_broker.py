@@ -0,0 +1,138 @@
+import logging
+import select
+import threading
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel carrying the user id of every committed notification
+PG_CHANNEL = 'notifications'
+
+
+class NotificationBroker:
+    """
+    Wakes the /notifications/stream connections of a user when a notification
+    for them is committed.
+
+    Commits made in this process wake subscribers directly. On Postgres the
+    after_flush hook also issues pg_notify (delivered only if the transaction
+    commits), and one LISTEN thread per worker relays those to the local
+    subscribers, so a notification created by any worker reaches every stream.
+    Without LISTEN (SQLite) streams fall back to polling.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, user_id, limit=None):
+        """
+        Register a stream of the user. With `limit`, returns None instead when
+        this worker already holds that many streams.
+        """
+        wakeup = threading.Event()
+        with self._lock:
+            if limit is not None and sum(len(waiting) for waiting in self._subscribers.values()) >= limit:
+                return None
+            self._subscribers.setdefault(user_id, set()).add(wakeup)
+        return wakeup
+
+    def unsubscribe(self, user_id, wakeup):
+        with self._lock:
+            waiting = self._subscribers.get(user_id)
+            if waiting:
+                waiting.discard(wakeup)
+                if not waiting:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids):
+        with self._lock:
+            wakeups = [w for user_id in user_ids for w in self._subscribers.get(user_id, ())]
+        for wakeup in wakeups:
+            wakeup.set()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(waiting) for waiting in self._subscribers.values())
+
+    def start_listener(self, engine):
+        """
+        Start the LISTEN thread for this worker if the database supports it.
+        Returns True when cross-process wake-ups are available.
+        """
+        if engine.dialect.name != 'postgresql':
+            return False
+        if self._listener is not None and self._listener.is_alive():
+            return True
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, args=(engine,), name='notification-listener', daemon=True
+                )
+                self._listener.start()
+        return True
+
+    def _listen(self, engine):
+        while True:
+            try:
+                connection = engine.raw_connection()
+                try:
+                    dbapi_connection = connection.dbapi_connection
+                    dbapi_connection.autocommit = True
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute(f"LISTEN {PG_CHANNEL}")
+                    while True:
+                        if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        user_ids = set()
+                        while dbapi_connection.notifies:
+                            notify = dbapi_connection.notifies.pop(0)
+                            try:
+                                user_ids.add(int(notify.payload))
+                            except ValueError:
+                                continue
+                        self.publish(user_ids)
+                finally:
+                    connection.invalidate()
+            except Exception as e:
+                logger.error(f"Notification listener failed, reconnecting: {str(e)}")
+                threading.Event().wait(5)
+
+
+notification_broker = NotificationBroker()
+
+def mark_notified(session, user_ids):
+    """
+    Wake these users' streams once the session commits. Notifications added to
+    the session are picked up automatically; call this for ones written with
+    a plain SQL statement.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+    session.info.setdefault('notified_users', set()).update(user_ids)
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        # NOTIFY is transactional: listeners only hear about it if we commit
+        for user_id in user_ids:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {'channel': PG_CHANNEL, 'payload': str(user_id)})
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notified_users(session, flush_context):
+    mark_notified(session, {obj.user_id for obj in session.new if isinstance(obj, Notification)})
+
+@event.listens_for(Session, 'after_commit')
+def _publish_notified_users(session):
+    user_ids = session.info.pop('notified_users', None)
+    if user_ids:
+        notification_broker.publish(user_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_notified_users(session):
+    session.info.pop('notified_users', None)
@@ -0,0 +1,173 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Notification, User
+from app.utils.notification_broker import mark_notified
+
+logger = logging.getLogger(__name__)
+
+# Notification types merged per (user, entity) within NOTIFICATION_COALESCE_WINDOW
+COALESCED_TYPES = {'project_status_change', 'project_invite', 'invite_accepted'}
+# Predicate of uq_notifications_coalesce_key, which the upsert must name verbatim
+COALESCE_INDEX_WHERE = db.text('coalesce_key IS NOT NULL AND NOT is_read')
+# Users handled per digest query
+DIGEST_USER_BATCH = 200
+
+
+def notify(user_id, type, message, link=None, entity_type=None, entity_id=None):
+    """
+    Add a notification in the current transaction (the caller commits).
+
+    Coalesced types are merged with the user's unread notification of the same
+    type and entity while it is younger than the coalescing window: that row
+    takes the new message, count + 1, a new created_at and a new id, so the SSE
+    stream (Last-Event-ID) and cursor pagination see it as the newest item;
+    clients drop earlier unread items of the same type/entity when it arrives.
+    The merge is one INSERT ... ON CONFLICT against uq_notifications_coalesce_key,
+    so concurrent notifies for the same row cannot fail each other's transaction.
+    """
+    window = current_app.config.get('NOTIFICATION_COALESCE_WINDOW', 600)
+    if type not in COALESCED_TYPES or entity_id is None or window <= 0:
+        db.session.add(Notification(
+            user_id=user_id, type=type, message=message, link=link,
+            entity_type=entity_type, entity_id=entity_id, count=1
+        ))
+        return
+
+    now = datetime.now(timezone.utc)
+    coalesce_key = f"{type}:{entity_type}:{entity_id}"
+    try:
+        # Savepoint: if merging fails, the caller's own changes still commit
+        with db.session.begin_nested():
+            # A row past the window stops coalescing; the next event starts a new one
+            db.session.execute(
+                db.update(Notification).where(
+                    Notification.user_id == user_id,
+                    Notification.coalesce_key == coalesce_key,
+                    Notification.created_at < now - timedelta(seconds=window)
+                ).values(coalesce_key=None).execution_options(synchronize_session=False)
+            )
+            db.session.execute(_coalescing_insert(dict(
+                user_id=user_id, type=type, message=message, link=link, entity_type=entity_type,
+                entity_id=entity_id, count=1, coalesce_key=coalesce_key, is_read=False, created_at=now
+            )))
+        mark_notified(db.session, {user_id})
+    except SQLAlchemyError as e:
+        logger.error(f"Could not coalesce {type} notification for user {user_id}, adding it separately: {str(e)}")
+        db.session.add(Notification(
+            user_id=user_id, type=type, message=message, link=link,
+            entity_type=entity_type, entity_id=entity_id, count=1
+        ))
+
+def _coalescing_insert(values):
+    """INSERT the row, or fold it into the open row with the same coalesce_key"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        next_id = db.text("nextval(pg_get_serial_sequence('notifications', 'id'))")
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        next_id = db.select(func.max(Notification.id) + 1).scalar_subquery()
+    statement = insert(Notification).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[Notification.user_id, Notification.coalesce_key],
+        index_where=COALESCE_INDEX_WHERE,
+        set_={
+            'id': next_id,
+            'count': Notification.count + 1,
+            'message': statement.excluded.message,
+            'link': statement.excluded.link,
+            'created_at': statement.excluded.created_at,
+            'digested_at': None
+        }
+    )
+
+
+def send_digests(send_email, older_than_minutes=None):
+    """
+    Email every user one digest of their unread notifications that have not been
+    digested yet and are at least `older_than_minutes` old (so live users get a
+    chance to read them in the app first). Marks the included rows as digested.
+    `send_email(user, notifications)` delivers or queues one digest; queued
+    (outbox) emails commit together with the digested marks. A failure for one
+    user leaves their rows pending for the next run.
+    Returns (users_emailed, notifications_included).
+    """
+    if older_than_minutes is None:
+        older_than_minutes = current_app.config.get('NOTIFICATION_DIGEST_DELAY_MINUTES', 60)
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+    pending = (
+        ~Notification.is_read,
+        Notification.digested_at.is_(None),
+        Notification.created_at <= cutoff
+    )
+
+    users_emailed = included = 0
+    last_user_id = 0
+    while True:
+        user_ids = [row[0] for row in db.session.query(Notification.user_id).filter(
+            *pending, Notification.user_id > last_user_id
+        ).distinct().order_by(Notification.user_id).limit(DIGEST_USER_BATCH)]
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        by_user = defaultdict(list)
+        for notification in Notification.query.filter(*pending, Notification.user_id.in_(user_ids)).order_by(Notification.id):
+            by_user[notification.user_id].append(notification)
+        users = {u.id: u for u in User.query.filter(User.id.in_(by_user))}
+
+        digested = []
+        for user_id, notifications in by_user.items():
+            user = users.get(user_id)
+            if not user:
+                continue
+            try:
+                send_email(user, notifications)
+            except Exception as e:
+                logger.error(f"Failed to send notification digest to user {user_id}: {str(e)}")
+                continue
+            digested.extend(n.id for n in notifications)
+            users_emailed += 1
+
+        # One UPDATE per batch of users
+        if digested:
+            db.session.execute(
+                db.update(Notification).where(Notification.id.in_(digested)).values(digested_at=datetime.now(timezone.utc))
+            )
+        db.session.commit()
+        included += len(digested)
+
+    logger.info(f"Sent {users_emailed} notification digests covering {included} notifications")
+    return users_emailed, included
+
+
+def purge_notifications(read_days=None, unread_days=None, batch_size=None):
+    """
+    Delete read notifications older than `read_days` and unread ones older than
+    `unread_days`, `batch_size` rows per transaction so no statement holds its
+    locks for long. Returns {'read_deleted': n, 'unread_deleted': m}.
+    """
+    config = current_app.config
+    read_days = config.get('NOTIFICATION_RETENTION_READ_DAYS', 30) if read_days is None else read_days
+    unread_days = config.get('NOTIFICATION_RETENTION_UNREAD_DAYS', 180) if unread_days is None else unread_days
+    batch_size = batch_size or config.get('NOTIFICATION_PURGE_BATCH_SIZE', 1000)
+    now = datetime.now(timezone.utc)
+
+    def purge(*conditions):
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.session.query(Notification.id).filter(*conditions).limit(batch_size)]
+            if not ids:
+                return deleted
+            db.session.execute(db.delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+
+    return {
+        'read_deleted': purge(Notification.is_read, Notification.created_at < now - timedelta(days=read_days)),
+        'unread_deleted': purge(~Notification.is_read, Notification.created_at < now - timedelta(days=unread_days))
+    }
@@ -1,3 +1,7 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
 def paginate(query, request):
     """
     Simple pagination helper
@@ -10,4 +14,44 @@ def paginate(query, request):
         'page': pagination.page,
         'total_pages': pagination.pages,
         'total_items': pagination.total
-    }
\ No newline at end of file
+    }
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor for (created_at, id) keyset pagination"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_paginate(query, created_column, id_column, request, default_limit=20, max_limit=100):
+    """
+    Newest-first keyset pagination on (created_at, id).
+    Unlike paginate() it never counts or OFFSETs, so every page costs one index range read.
+    Raises ValueError for a bad ?cursor= value.
+    """
+    limit = min(max(request.args.get('limit', default_limit, type=int) or default_limit, 1), max_limit)
+    cursor = request.args.get('cursor')
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id)
+        ))
+
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    return {
+        'items': items,
+        'next_cursor': next_cursor
+    }
@@ -0,0 +1,123 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_TIMEOUT"""
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords with the configured Werkzeug method
+    (PASSWORD_HASH_METHOD, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000").
+
+    PASSWORD_HASH_EXECUTOR chooses where the work runs:
+    - "inline": in the request thread (the old behaviour).
+    - "thread": a pool of PASSWORD_HASH_WORKERS threads. scrypt and pbkdf2 run
+      in OpenSSL without the GIL, so this caps how many cores one gunicorn
+      worker spends on hashing while its other threads keep serving requests.
+    - "process": a pool of PASSWORD_HASH_WORKERS processes, for when hashing
+      should be isolated from the worker entirely.
+    At most PASSWORD_HASH_MAX_PENDING hashes wait or run per worker; a caller
+    that cannot get a slot within PASSWORD_HASH_TIMEOUT gets PasswordHasherBusy.
+    """
+
+    def __init__(self):
+        self.method = 'scrypt'
+        self.salt_length = 16
+        self.executor = 'inline'
+        self.workers = 2
+        self.max_pending = 16
+        self.timeout = 10.0
+        self.resolved_method = None  # e.g. "scrypt:32768:8:1", the prefix of new hashes
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def init_app(self, app):
+        config = app.config
+        self.configure(
+            method=config.get('PASSWORD_HASH_METHOD', self.method),
+            salt_length=config.get('PASSWORD_SALT_LENGTH', self.salt_length),
+            executor=config.get('PASSWORD_HASH_EXECUTOR', self.executor),
+            workers=config.get('PASSWORD_HASH_WORKERS', self.workers),
+            max_pending=config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        )
+        app.extensions['password_hasher'] = self
+
+    def configure(self, method=None, salt_length=None, executor=None, workers=None, max_pending=None, timeout=None):
+        if executor is not None and executor not in ('inline', 'thread', 'process'):
+            raise ValueError(f"Unknown PASSWORD_HASH_EXECUTOR '{executor}'")
+        self.method = method or self.method
+        self.salt_length = salt_length or self.salt_length
+        self.executor = executor or self.executor
+        self.workers = workers or self.workers
+        self.max_pending = max(max_pending or self.max_pending, self.workers)
+        self.timeout = timeout or self.timeout
+        # Werkzeug fills in defaults ("scrypt" -> "scrypt:32768:8:1"); compare against what it writes
+        self.resolved_method = _hash('', self.method, 1).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.shutdown()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with other parameters than the configured ones"""
+        if self.resolved_method is None:
+            return False
+        return password_hash.split('$', 1)[0] != self.resolved_method
+
+    def _run(self, fn, *args):
+        if self.executor == 'inline':
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy(f"No password hashing slot free after {self.timeout}s")
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_pool(self):
+        # Pools don't survive a fork, so each gunicorn worker builds its own
+        if self._pool is not None and self._pool_pid == os.getpid():
+            return self._pool
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                if self.executor == 'process':
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._pool_pid = os.getpid()
+                logger.info(f"Started {self.executor} pool of {self.workers} for password hashing")
+        return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, pid = self._pool, self._pool_pid
+            self._pool = self._pool_pid = None
+        if pool is not None and pid == os.getpid():
+            pool.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,128 @@
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import db, User
+from app.utils.cache import TTLCache
+
+# Columns copied into the cached principal; anything else is read from the ORM User
+PRINCIPAL_FIELDS = ('id', 'name', 'email', 'role', 'cohort_id', 'class_id', 'two_factor_enabled')
+
+
+class Principal:
+    """
+    The authenticated user as passed to routes by token_required.
+
+    Holds a snapshot of the common columns, so most requests never load the
+    User row. Any other attribute (relationships, check_password, ...) and every
+    assignment goes to the full ORM User, which is loaded on first use; routes
+    that need the model itself can use `current_user.user`.
+    """
+
+    def __init__(self, fields):
+        self.__dict__['_fields'] = dict(fields)
+        self.__dict__['_user'] = None
+
+    @property
+    def user(self):
+        if self.__dict__['_user'] is None:
+            user = db.session.get(User, self._fields['id'])
+            if user is None:
+                raise LookupError(f"User {self._fields['id']} no longer exists")
+            self.__dict__['_user'] = user
+        return self.__dict__['_user']
+
+    def __getattr__(self, name):
+        fields = self.__dict__['_fields']
+        if name in fields:
+            return fields[name]
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+        if name in self._fields:
+            self._fields[name] = value
+
+    def __eq__(self, other):
+        other_id = getattr(other, 'id', None)
+        return isinstance(other, (Principal, User)) and other_id == self._fields['id']
+
+    def __hash__(self):
+        return hash(('user', self._fields['id']))
+
+    def __repr__(self):
+        return f"<Principal {self._fields['id']} {self._fields['role']}>"
+
+
+class PrincipalCache:
+    """
+    Per-process LRU of principal snapshots with a short TTL, keyed by user id and
+    a per-user version stamp. Committing a change to a User bumps its version in
+    this process, so a snapshot loaded before the change (even one stored after
+    it by a concurrent request) is never served again. Other workers pick the
+    change up when their entry expires (PRINCIPAL_CACHE_TTL).
+    """
+
+    def __init__(self, ttl=30, max_entries=2048):
+        self.cache = TTLCache(default_ttl=ttl, max_entries=max_entries)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.cache.default_ttl = app.config.get('PRINCIPAL_CACHE_TTL', self.cache.default_ttl)
+        self.cache.max_entries = app.config.get('PRINCIPAL_CACHE_SIZE', self.cache.max_entries)
+        self.cache.clear()
+        app.extensions['principal_cache'] = self
+
+    def _key(self, user_id):
+        return f"{user_id}:{self._versions.get(user_id, 0)}"
+
+    def load(self, user_id):
+        """Return a Principal for user_id, or None if the user does not exist"""
+        key = self._key(user_id)
+        if self.cache.default_ttl > 0:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return Principal(cached[0])
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        fields = {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+        if self.cache.default_ttl > 0:
+            self.cache.set(key, fields)
+        principal = Principal(fields)
+        principal.__dict__['_user'] = user
+        return principal
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self.cache.invalidate(f"{user_id}:")
+
+    def clear(self):
+        self.cache.clear()
+
+
+principal_cache = PrincipalCache()
+
+def invalidate_principal(user_id):
+    principal_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    changed = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+        and (obj in session.deleted or session.is_modified(obj, include_collections=False))
+    }
+    if changed:
+        session.info.setdefault('changed_users', set()).update(changed)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_users', ()):
+        principal_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('changed_users', None)
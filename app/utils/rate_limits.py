@@ -0,0 +1,98 @@
+import logging
+import time
+from flask import current_app, request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from app.utils.auth import jwt_user_id
+from app.utils.error_handlers import send_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+
+def config_limit(key):
+    """A limit read from app config on each request, so it can differ per deployment"""
+    return lambda: current_app.config[key]
+
+def rate_limit_key():
+    """
+    Bucket per signed-in user, falling back to the client IP. Users behind one
+    campus NAT no longer share a bucket, and a user's limit is the same
+    whichever IP or worker their requests come from.
+    """
+    user_id = jwt_user_id()
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address()}"
+
+def account_key(prefix, field):
+    """
+    Key attempts against one account (named by a JSON body field) from one IP.
+    A stranger guessing at an account only uses up their own bucket, not the
+    owner's; requests from an IP across all accounts are capped separately.
+    """
+    def key():
+        data = request.get_json(silent=True) or {}
+        account = str(data.get(field) or '').strip().lower()
+        ip = get_remote_address()
+        return f"{prefix}:{account}:{ip}" if account else f"ip:{ip}"
+    return key
+
+login_key = account_key('login', 'email')
+verify_2fa_key = account_key('verify-2fa', 'user_id')
+
+
+def cost(weight):
+    """
+    Declare what one request to an endpoint spends from the caller's shared
+    RATELIMIT_BUDGET; endpoints without it cost 1. Put it right below the
+    route decorator. `weight` may be a callable evaluated per request.
+
+        @dashboard_routes.route('/dashboard/overview')
+        @cost(20)
+        @token_required
+        def dashboard_overview(current_user): ...
+    """
+    def decorator(f):
+        f.rate_limit_cost = weight
+        return f
+    return decorator
+
+def request_cost():
+    view = current_app.view_functions.get(request.endpoint)
+    weight = getattr(view, 'rate_limit_cost', 1)
+    return weight() if callable(weight) else weight
+
+def is_preflight():
+    return request.method == 'OPTIONS'
+
+
+# Counters live in RATELIMIT_STORAGE_URI (Redis in production so all workers and
+# nodes share them; memory:// locally and in tests). Flask-Limiter reads the
+# other RATELIMIT_* settings from app config.
+# Every request spends its cost() from one budget per user/IP across all
+# endpoints (the application limit); the per-endpoint default still applies.
+limiter = Limiter(
+    key_func=rate_limit_key,
+    default_limits=[config_limit('RATELIMIT_DEFAULT')],
+    default_limits_exempt_when=is_preflight,
+    application_limits=[config_limit('RATELIMIT_BUDGET')],
+    application_limits_cost=request_cost,
+    application_limits_exempt_when=is_preflight,
+)
+
+def limit_blueprint(blueprint, config_key):
+    """Give every route of a blueprint its own limit (instead of the default) from config"""
+    limiter.limit(config_limit(config_key))(blueprint)
+
+def init_limiter(app):
+    limiter.init_app(app)
+
+    @app.errorhandler(429)
+    def rate_limit_exceeded(e):
+        retry_after = 1
+        current = limiter.current_limit
+        if current is not None:
+            retry_after = max(1, int(current.reset_at - time.time()))
+        logger.warning(f"Rate limit {getattr(e, 'description', '')} exceeded for {rate_limit_key()} on {request.path}")
+        # Flask-Limiter adds the Retry-After / X-RateLimit-* headers
+        return send_rate_limit_error(retry_after)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical computations.
+
+    Within a worker, callers asking for the same key while a computation is in
+    flight wait for it and share its result. Across gunicorn workers on the same
+    host, the leader of each worker takes an exclusive file lock per key; the
+    first one computes and leaves the (JSON) result next to the lock, and the
+    workers that were queued behind it reuse that result instead of recomputing.
+    Nobody waits longer than SINGLE_FLIGHT_TIMEOUT for a slow leader; they
+    compute on their own instead. Results can hold private data, so the lock
+    directory is kept at 0700, and sharing between workers is switched off if
+    it belongs to another user.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            timeout = current_app.config.get('SINGLE_FLIGHT_TIMEOUT', 30)
+            if not call.done.wait(timeout):
+                logger.warning(f"Single-flight wait for '{key}' timed out, computing locally")
+                return compute()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, compute)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_shared(self, key, compute):
+        lock_dir = current_app.config.get('SINGLE_FLIGHT_LOCK_DIR')
+        if not lock_dir or fcntl is None or not _private_dir(lock_dir):
+            return compute()
+
+        path = os.path.join(lock_dir, hashlib.sha1(key.encode()).hexdigest() + '.flight')
+        requested_at = time.time()
+        deadline = time.monotonic() + current_app.config.get('SINGLE_FLIGHT_TIMEOUT', 30)
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+') as fh:
+            if not _lock(fh, deadline):
+                logger.warning(f"Single-flight lock for '{key}' still held after the timeout, computing locally")
+                return compute()
+            try:
+                fh.seek(0)
+                raw = fh.read()
+                if raw:
+                    try:
+                        slot = json.loads(raw)
+                        # Only reuse a result finished while we were queued for the lock
+                        if slot.get('finished_at', 0) >= requested_at:
+                            return slot['value']
+                    except ValueError:
+                        pass
+
+                value = compute()
+                try:
+                    fh.seek(0)
+                    fh.truncate()
+                    json.dump({'finished_at': time.time(), 'value': value}, fh)
+                    fh.flush()
+                except (TypeError, ValueError):
+                    # Not JSON serializable: other workers will simply compute their own
+                    fh.truncate(0)
+                return value
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _lock(fh, deadline, poll_interval=0.05):
+    """Take the exclusive lock on `fh`, giving up at `deadline` (time.monotonic())"""
+    while True:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+def _private_dir(path):
+    """Create `path` (or tighten it) as 0700; False if it belongs to another user"""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.stat(path)
+    except OSError as e:
+        logger.warning(f"Single-flight directory {path} unusable, coalescing per worker only: {str(e)}")
+        return False
+    if st.st_uid != os.getuid():
+        logger.warning(f"Single-flight directory {path} belongs to another user, coalescing per worker only")
+        return False
+    if st.st_mode & 0o077:
+        # e.g. created by an older release with default permissions
+        os.chmod(path, 0o700)
+    return True
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,172 @@
+import logging
+from collections import Counter
+from itertools import chain
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import db, StatCounter, Project, Task, Sprint
+
+logger = logging.getLogger(__name__)
+
+# Columns tracked per entity; every entity also keeps a 'total' counter
+TRACKED_DIMENSIONS = {
+    Project: {'project': {'status': 'status', 'cohort': 'cohort_id', 'class': 'class_id'}},
+    Task: {'task': {'status': 'status'}},
+    Sprint: {'sprint': {'status': 'status'}},
+}
+
+def committed_value(obj, attr):
+    """
+    Value of attr as it was before the pending flush. Attributes that were
+    expired before being changed (or deleted) have no history; their value is
+    read from the database by _load_committed_values before the flush.
+    """
+    state = inspect(obj)
+    history = state.attrs[attr].history
+    values = history.deleted or history.unchanged
+    if values:
+        return values[0]
+    return state.info.get('committed_values', {}).get(attr)
+
+def _unloaded_committed_attrs(obj):
+    """Tracked attributes of a persistent object whose committed value is not in memory"""
+    state = inspect(obj)
+    attrs = {attr for dimensions in TRACKED_DIMENSIONS[type(obj)].values() for attr in dimensions.values()}
+    missing = []
+    for attr in sorted(attrs):
+        history = state.attrs[attr].history
+        if not (history.deleted or history.unchanged):
+            missing.append(attr)
+    return missing
+
+@event.listens_for(Session, 'before_flush')
+def _load_committed_values(session, flush_context, instances):
+    # The rows still hold their old values here; after the flush they are gone
+    tracked = tuple(TRACKED_DIMENSIONS)
+    pending = {}
+    for obj in chain(session.dirty, session.deleted):
+        if not isinstance(obj, tracked) or not inspect(obj).persistent:
+            continue
+        if obj in session.deleted or session.is_modified(obj, include_collections=False):
+            missing = _unloaded_committed_attrs(obj)
+            if missing:
+                pending.setdefault(type(obj), {})[inspect(obj).identity[0]] = (obj, missing)
+    for model, objects in pending.items():
+        attrs = sorted({attr for _, missing in objects.values() for attr in missing})
+        rows = session.connection().execute(
+            db.select(model.id, *[getattr(model, attr) for attr in attrs]).where(model.id.in_(list(objects)))
+        )
+        for row in rows:
+            obj, missing = objects[row.id]
+            state = inspect(obj)
+            state.info['committed_values'] = {attr: getattr(row, attr) for attr in missing}
+            session.info.setdefault('committed_value_states', []).append(state)
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _forget_committed_values(session, flush_context):
+    for state in session.info.pop('committed_value_states', []):
+        state.info.pop('committed_values', None)
+
+def _counter_keys(obj, committed=False):
+    """Yield (entity, dimension, key) counters an object contributes to"""
+    for entity, dimensions in TRACKED_DIMENSIONS[type(obj)].items():
+        yield entity, 'total', ''
+        for dimension, attr in dimensions.items():
+            value = committed_value(obj, attr) if committed else getattr(obj, attr)
+            if value is not None:
+                yield entity, dimension, str(value)
+
+def collect_deltas(session):
+    """Counter deltas implied by the objects of a flush"""
+    deltas = Counter()
+    tracked = tuple(TRACKED_DIMENSIONS)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, tracked):
+            continue
+        if obj in session.new:
+            deltas.update(_counter_keys(obj))
+        elif obj in session.deleted:
+            deltas.subtract(_counter_keys(obj, committed=True))
+        elif session.is_modified(obj, include_collections=False):
+            deltas.subtract(_counter_keys(obj, committed=True))
+            deltas.update(_counter_keys(obj))
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def upsert_increment(connection, table, key_columns, increment_columns, rows):
+    """
+    Insert rows into table, or add their increment_columns onto the existing row
+    with the same key_columns. Runs on the caller's connection/transaction.
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = pg_insert if dialect == 'postgresql' else sqlite_insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns],
+            set_={name: table.c[name] + stmt.excluded[name] for name in increment_columns}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # Generic fallback: update, then insert the rows that did not exist yet
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(*[table.c[name] == row[name] for name in key_columns])
+            .values({name: table.c[name] + row[name] for name in increment_columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+def apply_deltas(connection, deltas):
+    """Atomically add deltas to the counter rows, on the caller's connection"""
+    rows = [
+        {'entity': entity, 'dimension': dimension, 'key': key, 'value': delta}
+        for (entity, dimension, key), delta in sorted(deltas.items())
+    ]
+    upsert_increment(connection, StatCounter.__table__, ('entity', 'dimension', 'key'), ('value',), rows)
+
+@event.listens_for(Session, 'after_flush')
+def _update_stat_counters(session, flush_context):
+    # Runs inside the flush, so counters commit or roll back with the change itself
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+def read_counters(entity, dimension):
+    """Return {key: value} for one counter family, skipping zero rows"""
+    rows = db.session.query(StatCounter.key, StatCounter.value).filter(
+        StatCounter.entity == entity,
+        StatCounter.dimension == dimension,
+        StatCounter.value != 0
+    ).all()
+    return {key: value for key, value in rows}
+
+def read_total(entity):
+    return read_counters(entity, 'total').get('', 0)
+
+def recompute_counters():
+    """
+    Rebuild every counter from the source tables in one transaction.
+    Used for backfills and to repair drift (e.g. rows changed outside the ORM).
+    """
+    totals = Counter()
+    for model, families in TRACKED_DIMENSIONS.items():
+        for entity, dimensions in families.items():
+            totals[(entity, 'total', '')] = db.session.query(func.count(model.id)).scalar()
+            for dimension, attr in dimensions.items():
+                column = getattr(model, attr)
+                for value, count in db.session.query(column, func.count(model.id)).filter(column.isnot(None)).group_by(column):
+                    totals[(entity, dimension, str(value))] = count
+
+    db.session.query(StatCounter).delete()
+    db.session.add_all([
+        StatCounter(entity=entity, dimension=dimension, key=key, value=value)
+        for (entity, dimension, key), value in totals.items()
+    ])
+    db.session.commit()
+    logger.info(f"Recomputed {len(totals)} stat counters")
+    return len(totals)
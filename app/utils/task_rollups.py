@@ -0,0 +1,60 @@
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.models import Project, Task, TaskDailyStat
+from app.utils.stat_counters import committed_value, upsert_increment
+
+# Task status whose transitions are counted as completions
+COMPLETED_STATUS = 'Completed'
+
+def collect_task_events(session):
+    """
+    (project_id, day) -> Counter(created=..., completed=...) for the tasks in a flush.
+    Completions are net: reopening a completed task takes one back on that day.
+    """
+    today = datetime.now(timezone.utc).date()
+    events = {}
+    for task in session.new:
+        if isinstance(task, Task) and task.project_id is not None:
+            day = task.created_at.date() if task.created_at else today
+            counts = events.setdefault((task.project_id, day), Counter())
+            counts['created'] += 1
+            if task.status == COMPLETED_STATUS:
+                events.setdefault((task.project_id, today), Counter())['completed'] += 1
+    for task in session.dirty:
+        if not isinstance(task, Task) or task.project_id is None or task in session.deleted:
+            continue
+        before, after = committed_value(task, 'status'), task.status
+        if before == after:
+            continue
+        if after == COMPLETED_STATUS:
+            events.setdefault((task.project_id, today), Counter())['completed'] += 1
+        elif before == COMPLETED_STATUS:
+            events.setdefault((task.project_id, today), Counter())['completed'] -= 1
+    return events
+
+@event.listens_for(Session, 'after_flush')
+def _update_task_rollups(session, flush_context):
+    events = collect_task_events(session)
+    if not events:
+        return
+    connection = session.connection()
+    project_ids = {project_id for project_id, _ in events}
+    scopes = {
+        row.id: row for row in connection.execute(
+            select(Project.id, Project.cohort_id, Project.class_id).where(Project.id.in_(project_ids))
+        )
+    }
+    rows = []
+    for (project_id, day), counts in sorted(events.items()):
+        scope = scopes.get(project_id)
+        rows.append({
+            'project_id': project_id,
+            'day': day,
+            'cohort_id': scope.cohort_id if scope else None,
+            'class_id': scope.class_id if scope else None,
+            'created': counts['created'],
+            'completed': counts['completed'],
+        })
+    upsert_increment(connection, TaskDailyStat.__table__, ('project_id', 'day'), ('created', 'completed'), rows)
@@ -0,0 +1,227 @@
+import abc
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from app.models import db, TwoFactorCode
+
+logger = logging.getLogger(__name__)
+
+# verify() outcomes
+VERIFIED = 'verified'
+NOT_FOUND = 'not_found'
+EXPIRED = 'expired'
+INVALID = 'invalid'
+TOO_MANY_ATTEMPTS = 'too_many_attempts'
+
+
+class CodeStore(abc.ABC):
+    """
+    Pending login 2FA codes, shared by every worker that talks to the same backend.
+
+    Only an HMAC of each code is stored. A code is single use, expires after
+    `ttl` seconds and is discarded after `max_attempts` wrong guesses, so a
+    user has to log in again to get a new one.
+    """
+
+    def __init__(self, secret, ttl=600, max_attempts=5):
+        self.secret = (secret or '').encode()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    def hash_code(self, user_id, code):
+        return hmac.new(self.secret, f"{user_id}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    @abc.abstractmethod
+    def issue(self, user_id, code):
+        """Store `code` for the user, replacing any pending one"""
+
+    @abc.abstractmethod
+    def verify(self, user_id, code):
+        """Check and consume a code; returns one of the outcome constants"""
+
+    def sweep(self, batch_size=1000):
+        """Delete expired codes; returns how many were removed"""
+        return 0
+
+
+class DatabaseCodeStore(CodeStore):
+    """
+    Codes in the two_factor_codes table. issue() joins the caller's transaction
+    (login commits it together with the queued email); verify() commits. Every
+    check is a single conditional statement, so concurrent guesses cannot
+    exceed the attempt limit or use a code twice.
+    """
+
+    @staticmethod
+    def _delete(*conditions):
+        # Plain SQL delete: the expiry check must not be evaluated against loaded rows
+        return db.session.execute(
+            db.delete(TwoFactorCode).where(*conditions).execution_options(synchronize_session=False)
+        )
+
+    def issue(self, user_id, code):
+        self._delete(TwoFactorCode.user_id == user_id)
+        db.session.execute(db.insert(TwoFactorCode).values(
+            user_id=user_id,
+            code_hash=self.hash_code(user_id, code),
+            attempts=0,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+            created_at=datetime.now(timezone.utc)
+        ))
+
+    def verify(self, user_id, code):
+        try:
+            result = self._verify(user_id, code)
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _verify(self, user_id, code):
+        now = datetime.now(timezone.utc)
+        current = TwoFactorCode.user_id == user_id
+        expired = self._delete(current, TwoFactorCode.expires_at <= now)
+        if expired.rowcount:
+            return EXPIRED
+
+        row = db.session.execute(
+            db.update(TwoFactorCode)
+            .where(current, TwoFactorCode.attempts < self.max_attempts)
+            .values(attempts=TwoFactorCode.attempts + 1)
+            .returning(TwoFactorCode.code_hash, TwoFactorCode.attempts)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            exhausted = self._delete(current)
+            return TOO_MANY_ATTEMPTS if exhausted.rowcount else NOT_FOUND
+
+        code_hash = self.hash_code(user_id, code)
+        if hmac.compare_digest(row.code_hash, code_hash):
+            # Only one of two concurrent correct guesses gets to delete it
+            used = self._delete(current, TwoFactorCode.code_hash == code_hash)
+            return VERIFIED if used.rowcount else NOT_FOUND
+
+        if row.attempts >= self.max_attempts:
+            self._delete(current)
+            return TOO_MANY_ATTEMPTS
+        return INVALID
+
+    def sweep(self, batch_size=1000):
+        now = datetime.now(timezone.utc)
+        deleted = 0
+        while True:
+            user_ids = [row[0] for row in db.session.query(TwoFactorCode.user_id).filter(
+                TwoFactorCode.expires_at <= now
+            ).limit(batch_size)]
+            if not user_ids:
+                return deleted
+            self._delete(TwoFactorCode.user_id.in_(user_ids), TwoFactorCode.expires_at <= now)
+            db.session.commit()
+            deleted += len(user_ids)
+
+
+# KEYS[1] = code key; ARGV = code hash, now (epoch seconds), max attempts
+_REDIS_VERIFY = """
+local stored = redis.call('HMGET', KEYS[1], 'code_hash', 'expires_at')
+if not stored[1] then return 'not_found' end
+if tonumber(stored[2]) <= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 'expired'
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if stored[1] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 'verified'
+end
+if attempts >= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    return 'too_many_attempts'
+end
+return 'invalid'
+"""
+
+
+class RedisCodeStore(CodeStore):
+    """
+    Codes in Redis (or any server speaking its protocol), one hash per user.
+    Verification is a Lua script so the check, the attempt counter and the
+    single-use delete are atomic. Keys outlive the code by one ttl so a late
+    attempt is reported as expired, then Redis evicts them; nothing to sweep.
+    """
+
+    key_prefix = '2fa:'
+
+    def __init__(self, url, secret, ttl=600, max_attempts=5):
+        super().__init__(secret, ttl, max_attempts)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("TWO_FACTOR_STORE=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._verify_script = self.client.register_script(_REDIS_VERIFY)
+
+    def issue(self, user_id, code):
+        key = f"{self.key_prefix}{user_id}"
+        expires_at = time.time() + self.ttl
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            'code_hash': self.hash_code(user_id, code),
+            'attempts': 0,
+            'expires_at': f"{expires_at:.3f}"
+        })
+        pipe.expire(key, self.ttl * 2)
+        pipe.execute()
+
+    def verify(self, user_id, code):
+        return self._verify_script(
+            keys=[f"{self.key_prefix}{user_id}"],
+            args=[self.hash_code(user_id, code), f"{time.time():.3f}", self.max_attempts]
+        )
+
+
+def get_code_store(config):
+    """Build the store selected by TWO_FACTOR_STORE (database or redis)"""
+    backend = (config.get('TWO_FACTOR_STORE') or 'database').lower()
+    options = {
+        'secret': config.get('SECRET_KEY'),
+        'ttl': config.get('TWO_FACTOR_CODE_TTL', 600),
+        'max_attempts': config.get('TWO_FACTOR_MAX_ATTEMPTS', 5)
+    }
+    if backend == 'database':
+        return DatabaseCodeStore(**options)
+    if backend == 'redis':
+        url = config.get('TWO_FACTOR_REDIS_URL')
+        if not url:
+            raise RuntimeError("TWO_FACTOR_STORE=redis requires TWO_FACTOR_REDIS_URL (or REDIS_URL)")
+        return RedisCodeStore(url, **options)
+    raise ValueError(f"Unknown TWO_FACTOR_STORE '{backend}'")
+
+
+class TwoFactorCodes:
+    """Process-wide access to the configured code store"""
+
+    def __init__(self):
+        self.store = None
+
+    def init_app(self, app):
+        self.store = get_code_store(app.config)
+        app.extensions['two_factor_codes'] = self
+
+    def issue(self, user_id, code):
+        self.store.issue(user_id, code)
+
+    def verify(self, user_id, code):
+        result = self.store.verify(user_id, code)
+        if result != VERIFIED:
+            logger.warning(f"2FA verification for user {user_id} failed: {result}")
+        return result
+
+    def sweep(self, batch_size=1000):
+        return self.store.sweep(batch_size)
+
+
+two_factor_codes = TwoFactorCodes()
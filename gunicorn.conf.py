@@ -0,0 +1,18 @@
+"""
+Gunicorn settings picked up automatically from the working directory.
+Command-line options in render.yaml still take precedence.
+"""
+import os
+
+# /notifications/stream holds its connection open, so serve requests from a
+# thread pool instead of tying up a whole sync worker per open stream
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+
+def worker_exit(server, worker):
+    # Don't lose buffered activity log entries when a worker is recycled or stopped
+    from app.utils.activity_log import activity_writer
+    flushed = activity_writer.flush()
+    if flushed:
+        server.log.info(f"Flushed {flushed} buffered activity log entries on worker exit")
@@ -0,0 +1,52 @@
+"""add_stat_counters
+
+Revision ID: 3a1f9c2e7b40
+Revises: 06f17cef8ede
+Create Date: 2026-10-19 09:12:41.508214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a1f9c2e7b40'
+down_revision = '06f17cef8ede'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist if the app's create_all() ran before this migration
+    if sa.inspect(op.get_bind()).has_table('stat_counters'):
+        # Its counters may be partial; rebuild them from scratch below
+        op.execute("DELETE FROM stat_counters")
+    else:
+        op.create_table('stat_counters',
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('key', sa.String(length=150), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity', 'dimension', 'key')
+        )
+
+    # Backfill from the existing rows (same result as `flask stats recompute`)
+    for entity, table in (('project', 'projects'), ('task', 'tasks'), ('sprint', 'sprints')):
+        op.execute(
+            f"INSERT INTO stat_counters (entity, dimension, key, value) "
+            f"SELECT '{entity}', 'total', '', COUNT(*) FROM {table}"
+        )
+        op.execute(
+            f"INSERT INTO stat_counters (entity, dimension, key, value) "
+            f"SELECT '{entity}', 'status', status, COUNT(*) FROM {table} WHERE status IS NOT NULL GROUP BY status"
+        )
+    for dimension, column in (('cohort', 'cohort_id'), ('class', 'class_id')):
+        op.execute(
+            f"INSERT INTO stat_counters (entity, dimension, key, value) "
+            f"SELECT 'project', '{dimension}', CAST({column} AS VARCHAR(150)), COUNT(*) FROM projects "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}"
+        )
+
+
+def downgrade():
+    op.drop_table('stat_counters')
@@ -0,0 +1,33 @@
+"""add_personal_dashboard_indexes
+
+Revision ID: 8e4b2d6f1c93
+Revises: 3a1f9c2e7b40
+Create Date: 2026-10-19 10:03:17.224901
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2d6f1c93'
+down_revision = '3a1f9c2e7b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_assignee_id_status', ['assignee_id', 'status'], unique=False)
+        batch_op.create_index('ix_tasks_assignee_id_due_date', ['assignee_id', 'due_date'], unique=False)
+
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.create_index('ix_project_members_user_id_status', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('project_members', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_members_user_id_status')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_assignee_id_due_date')
+        batch_op.drop_index('ix_tasks_assignee_id_status')
@@ -0,0 +1,34 @@
+"""add_notification_coalescing_columns
+
+Revision ID: a4c9e2f7b315
+Revises: f3b8d2e6a174
+Create Date: 2026-10-19 14:20:53.106842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2f7b315'
+down_revision = 'f3b8d2e6a174'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('entity_type', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('entity_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('count', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('digested_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_notifications_group', ['user_id', 'type', 'entity_type', 'entity_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_group')
+        batch_op.drop_column('digested_at')
+        batch_op.drop_column('count')
+        batch_op.drop_column('entity_id')
+        batch_op.drop_column('entity_type')
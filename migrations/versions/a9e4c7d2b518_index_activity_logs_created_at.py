@@ -0,0 +1,37 @@
+"""index_activity_logs_created_at
+
+Revision ID: a9e4c7d2b518
+Revises: f8d1c3b7a625
+Create Date: 2026-10-19 20:03:41.227915
+
+The partitioning migration created ix_activity_logs_created_at on Postgres
+only; add it on the other databases so they match the model.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e4c7d2b518'
+down_revision = 'f8d1c3b7a625'
+branch_labels = None
+depends_on = None
+
+
+def _has_index():
+    indexes = sa.inspect(op.get_bind()).get_indexes('activity_logs')
+    return any(index['name'] == 'ix_activity_logs_created_at' for index in indexes)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql' or _has_index():
+        return
+    with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_logs_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_logs_created_at')
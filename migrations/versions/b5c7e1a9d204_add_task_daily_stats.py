@@ -0,0 +1,54 @@
+"""add_task_daily_stats
+
+Revision ID: b5c7e1a9d204
+Revises: 8e4b2d6f1c93
+Create Date: 2026-10-19 10:48:52.617330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5c7e1a9d204'
+down_revision = '8e4b2d6f1c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist if the app's create_all() ran before this migration;
+    # it is then already being filled by the rollup hooks and must not be backfilled
+    if sa.inspect(op.get_bind()).has_table('task_daily_stats'):
+        return
+
+    op.create_table('task_daily_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('cohort_id', sa.Integer(), nullable=True),
+    sa.Column('class_id', sa.Integer(), nullable=True),
+    sa.Column('created', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('project_id', 'day')
+    )
+    with op.batch_alter_table('task_daily_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_task_daily_stats_cohort_id_day', ['cohort_id', 'day'], unique=False)
+        batch_op.create_index('ix_task_daily_stats_class_id_day', ['class_id', 'day'], unique=False)
+
+    # Backfill creations from existing tasks. Completion times were never recorded,
+    # so completed counts start accumulating from this migration onwards.
+    op.execute(
+        "INSERT INTO task_daily_stats (project_id, day, cohort_id, class_id, created, completed) "
+        "SELECT t.project_id, CAST(t.created_at AS DATE), p.cohort_id, p.class_id, COUNT(*), 0 "
+        "FROM tasks t JOIN projects p ON p.id = t.project_id "
+        "WHERE t.created_at IS NOT NULL "
+        "GROUP BY t.project_id, CAST(t.created_at AS DATE), p.cohort_id, p.class_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('task_daily_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_daily_stats_class_id_day')
+        batch_op.drop_index('ix_task_daily_stats_cohort_id_day')
+
+    op.drop_table('task_daily_stats')
@@ -0,0 +1,46 @@
+"""add_job_runs_and_notification_purge_index
+
+Revision ID: b8e3f1a6c420
+Revises: a4c9e2f7b315
+Create Date: 2026-10-19 14:52:09.731254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f1a6c420'
+down_revision = 'a4c9e2f7b315'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist if the app's create_all() ran before this migration
+    if not sa.inspect(op.get_bind()).has_table('job_runs'):
+        op.create_table('job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('stats', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('job_runs', schema=None) as batch_op:
+            batch_op.create_index('ix_job_runs_job_started_at', ['job', 'started_at'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_created_at')
+
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_runs_job_started_at')
+
+    op.drop_table('job_runs')
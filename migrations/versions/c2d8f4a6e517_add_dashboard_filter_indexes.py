@@ -0,0 +1,39 @@
+"""add_dashboard_filter_indexes
+
+Revision ID: c2d8f4a6e517
+Revises: b5c7e1a9d204
+Create Date: 2026-10-19 11:37:05.981442
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d8f4a6e517'
+down_revision = 'b5c7e1a9d204'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_cohort_id_status', ['cohort_id', 'status'], unique=False)
+        batch_op.create_index('ix_projects_class_id_status', ['class_id', 'status'], unique=False)
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_project_id_status', ['project_id', 'status'], unique=False)
+
+    with op.batch_alter_table('sprints', schema=None) as batch_op:
+        batch_op.create_index('ix_sprints_project_id_status', ['project_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sprints', schema=None) as batch_op:
+        batch_op.drop_index('ix_sprints_project_id_status')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_project_id_status')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_class_id_status')
+        batch_op.drop_index('ix_projects_cohort_id_status')
@@ -0,0 +1,30 @@
+"""add_email_outbox_batch_key
+
+Revision ID: d2f7a9c5e831
+Revises: c6a1d8e4f592
+Create Date: 2026-10-19 16:12:37.594410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a9c5e831'
+down_revision = 'c6a1d8e4f592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Already there if the app's create_all() made email_outbox from the current model
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('email_outbox')}
+    if 'batch_key' in columns:
+        return
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_key', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_column('batch_key')
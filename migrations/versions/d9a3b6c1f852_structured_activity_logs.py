@@ -0,0 +1,34 @@
+"""structured_activity_logs
+
+Revision ID: d9a3b6c1f852
+Revises: c2d8f4a6e517
+Create Date: 2026-10-19 12:21:46.310578
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a3b6c1f852'
+down_revision = 'c2d8f4a6e517'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('entity_type', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('entity_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('verb', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('metadata', sa.JSON(), nullable=True))
+        batch_op.create_index('ix_activity_logs_entity', ['entity_type', 'entity_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_logs_entity')
+        batch_op.drop_column('metadata')
+        batch_op.drop_column('verb')
+        batch_op.drop_column('entity_id')
+        batch_op.drop_column('entity_type')
@@ -0,0 +1,109 @@
+"""partition_activity_logs_by_month
+
+Revision ID: e1f5a7c3b968
+Revises: d9a3b6c1f852
+Create Date: 2026-10-19 13:05:12.874139
+
+Postgres only: rebuilds activity_logs as a table RANGE partitioned by month on
+created_at (one activity_logs_YYYY_MM partition per month plus a DEFAULT
+partition). Other databases keep the plain table.
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f5a7c3b968'
+down_revision = 'd9a3b6c1f852'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month
+MONTHS_AHEAD = 2
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False,
+                                  server_default=sa.func.now())
+        return
+
+    op.execute("UPDATE activity_logs SET created_at = now() WHERE created_at IS NULL")
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_unpartitioned")
+    op.execute("ALTER INDEX IF EXISTS ix_activity_logs_entity RENAME TO ix_activity_logs_unpartitioned_entity")
+    op.execute("""
+        CREATE TABLE activity_logs (
+            id INTEGER NOT NULL DEFAULT nextval('activity_logs_id_seq'),
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR(255) NOT NULL,
+            entity_type VARCHAR(50),
+            entity_id INTEGER,
+            verb VARCHAR(50),
+            metadata JSON,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+    op.execute("CREATE INDEX ix_activity_logs_created_at ON activity_logs (created_at)")
+    op.execute("CREATE INDEX ix_activity_logs_entity ON activity_logs (entity_type, entity_id, created_at)")
+    op.execute("CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM activity_logs_unpartitioned")).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        upper = _next_month(month)
+        op.execute(
+            f"CREATE TABLE activity_logs_{month:%Y_%m} PARTITION OF activity_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute("""
+        INSERT INTO activity_logs (id, user_id, action, entity_type, entity_id, verb, metadata, created_at)
+        SELECT id, user_id, action, entity_type, entity_id, verb, metadata, created_at
+        FROM activity_logs_unpartitioned
+    """)
+    op.execute("DROP TABLE activity_logs_unpartitioned")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('activity_logs', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=True,
+                                  server_default=None)
+        return
+
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_partitioned")
+    op.execute("ALTER INDEX ix_activity_logs_entity RENAME TO ix_activity_logs_partitioned_entity")
+    op.execute("""
+        CREATE TABLE activity_logs (
+            id INTEGER NOT NULL DEFAULT nextval('activity_logs_id_seq') PRIMARY KEY,
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR(255) NOT NULL,
+            entity_type VARCHAR(50),
+            entity_id INTEGER,
+            verb VARCHAR(50),
+            metadata JSON,
+            created_at TIMESTAMP WITH TIME ZONE
+        )
+    """)
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+    op.execute("CREATE INDEX ix_activity_logs_entity ON activity_logs (entity_type, entity_id, created_at)")
+    op.execute("""
+        INSERT INTO activity_logs (id, user_id, action, entity_type, entity_id, verb, metadata, created_at)
+        SELECT id, user_id, action, entity_type, entity_id, verb, metadata, created_at
+        FROM activity_logs_partitioned
+    """)
+    op.execute("DROP TABLE activity_logs_partitioned CASCADE")
@@ -0,0 +1,39 @@
+"""add_two_factor_codes
+
+Revision ID: e7c4b2a9d316
+Revises: d2f7a9c5e831
+Create Date: 2026-10-19 17:48:05.731264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c4b2a9d316'
+down_revision = 'd2f7a9c5e831'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist if the app's create_all() ran before this migration
+    if not sa.inspect(op.get_bind()).has_table('two_factor_codes'):
+        op.create_table('two_factor_codes',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('code_hash', sa.String(length=64), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+        with op.batch_alter_table('two_factor_codes', schema=None) as batch_op:
+            batch_op.create_index('ix_two_factor_codes_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('two_factor_codes', schema=None) as batch_op:
+        batch_op.drop_index('ix_two_factor_codes_expires_at')
+
+    op.drop_table('two_factor_codes')
@@ -0,0 +1,29 @@
+"""add_notification_read_state_indexes
+
+Revision ID: f3b8d2e6a174
+Revises: e1f5a7c3b968
+Create Date: 2026-10-19 13:48:27.519306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d2e6a174'
+down_revision = 'e1f5a7c3b968'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_id_created_at', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_notifications_user_id_unread', ['user_id'], unique=False,
+                              postgresql_where=sa.text('NOT is_read'), sqlite_where=sa.text('NOT is_read'))
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_unread')
+        batch_op.drop_index('ix_notifications_user_id_created_at')
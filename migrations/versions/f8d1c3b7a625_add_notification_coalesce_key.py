@@ -0,0 +1,31 @@
+"""add_notification_coalesce_key
+
+Revision ID: f8d1c3b7a625
+Revises: e7c4b2a9d316
+Create Date: 2026-10-19 19:12:37.514208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8d1c3b7a625'
+down_revision = 'e7c4b2a9d316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows keep a NULL key: they simply stop coalescing, so nothing can collide
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('coalesce_key', sa.String(length=150), nullable=True))
+        batch_op.create_index('uq_notifications_coalesce_key', ['user_id', 'coalesce_key'], unique=True,
+                              postgresql_where=sa.text('coalesce_key IS NOT NULL AND NOT is_read'),
+                              sqlite_where=sa.text('coalesce_key IS NOT NULL AND NOT is_read'))
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('uq_notifications_coalesce_key')
+        batch_op.drop_column('coalesce_key')
@@ -1,12 +1,19 @@
 import os
+import sys
 from flask import Flask, request
 from flask_migrate import Migrate
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flasgger import Swagger
 from app.config import Config
 from app.models import db
+from app.commands import register_commands
+from app.utils.activity_log import activity_writer
+from app.utils.mail_service import mail_service
+from app.utils.circuit_breaker import configure_breakers
+from app.utils.principals import principal_cache
+from app.utils.two_factor import two_factor_codes
+from app.utils.passwords import password_hasher
+from app.utils.rate_limits import init_limiter, limiter
 
 # Import blueprints
 from app.routes.auth_routes import auth_routes
@@ -23,19 +30,20 @@ from app.routes.sprint_routes import sprint_routes
 from app.routes.time_routes import time_routes
 from app.routes.notification_routes import notification_routes
 from app.routes.dashboard_routes import dashboard_routes
+from app.routes.metrics_routes import metrics_routes
+
+
+def is_migrate_command():
+    """True when the app is being loaded by the Flask-Migrate CLI (`flask db upgrade`, ...)"""
+    return os.path.basename(sys.argv[0]) in ('flask', 'flask.exe') and len(sys.argv) > 1 and sys.argv[1] == 'db'
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Rate limiting setup
-    limiter = Limiter(
-        get_remote_address,
-        app=app,
-        default_limits=["100 per minute"],
-        storage_uri="memory://",
-    )
+    # Rate limiting setup (storage and limits come from RATELIMIT_* config)
+    init_limiter(app)
 
     # Swagger setup
     Swagger(app)
@@ -82,10 +90,20 @@ def create_app():
     # Initialize DB + migrations
     db.init_app(app)
     Migrate(app, db)
-
-    with app.app_context():
-        db.create_all()
-        print("✅ Database tables verified/created.")
+    register_commands(app)
+    activity_writer.init_app(app)
+    mail_service.init_app(app)
+    configure_breakers(app)
+    principal_cache.init_app(app)
+    two_factor_codes.init_app(app)
+    password_hasher.init_app(app)
+
+    # Under `flask db ...` Alembic owns the schema: tables created here first
+    # would make the migrations that add them fail
+    if not is_migrate_command():
+        with app.app_context():
+            db.create_all()
+            print("✅ Database tables verified/created.")
 
     # Register blueprints
     app.register_blueprint(auth_routes)
@@ -102,9 +120,11 @@ def create_app():
     app.register_blueprint(time_routes)
     app.register_blueprint(notification_routes)
     app.register_blueprint(dashboard_routes)
+    app.register_blueprint(metrics_routes)
 
     # Health check endpoint
     @app.route("/health")
+    @limiter.exempt
     def health():
         return {"status": "ok"}
 
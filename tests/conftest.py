@@ -29,19 +29,27 @@ def client(app):
     return app.test_client()
 
 # -----------------------------
-# Mock email sending for 2FA
+# Capture outbox emails
 # -----------------------------
 @pytest.fixture(autouse=True)
-def mock_email_sending(app):
+def sent_emails(app):
     """
-    Mock email sending functions to avoid external calls during tests.
+    Route the email outbox to an in-memory transport so tests never call the
+    provider; yields the list of (to_email, subject, html) sent.
     """
-    from app.utils import email_utils
+    from app.utils.email_transports import Transport
 
-    # Mock 2FA email sending
-    with patch("app.utils.email_utils.send_2fa_code_email") as mock_send:
-        mock_send.return_value = True
-        yield mock_send
+    class RecordingTransport(Transport):
+        def __init__(self):
+            self.sent = []
+
+        def send(self, to_email, subject, html):
+            self.sent.append((to_email, subject, html))
+            return "memory"
+
+    transport = RecordingTransport()
+    with patch("app.utils.email_outbox.get_transport", return_value=transport):
+        yield transport.sent
 
 # -----------------------------
 # Ensure admin exists
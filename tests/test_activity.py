@@ -75,4 +75,197 @@ def test_list_activities_non_manager_denied(client, app):
 
     res = client.get('/activities/activities')
     assert res.status_code == 403
-    assert res.json['message'] == 'You are not authorized to access this resource.'
\ No newline at end of file
+    assert res.json['message'] == 'You are not authorized to access this resource.'
+# -----------------------------
+# Test: Activity entries join the route's transaction
+# -----------------------------
+def test_activity_logged_with_route_commit(client, app):
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+
+    res = client.post('/cohorts/', json={'name': 'Logged Cohort'})
+    assert res.status_code == 201
+    assert ActivityLog.query.filter_by(action='Created cohort: Logged Cohort').count() == 1
+
+# -----------------------------
+# Test: Buffered mode bulk inserts on flush
+# -----------------------------
+def test_buffered_activity_writer(app):
+    from app.utils.activity_log import activity_writer, log_activity
+    manager_user = db.session.execute(
+        db.select(User).filter_by(email='manager@test.com')
+    ).scalar_one()
+
+    activity_writer.mode = 'buffered'
+    activity_writer.flush_interval = 60
+    try:
+        log_activity(manager_user.id, "Buffered 1")
+        log_activity(manager_user.id, "Buffered 2")
+        assert ActivityLog.query.filter(ActivityLog.action.like('Buffered%')).count() == 0
+
+        assert activity_writer.flush() == 2
+        assert ActivityLog.query.filter(ActivityLog.action.like('Buffered%')).count() == 2
+    finally:
+        activity_writer.mode = 'transaction'
+
+# -----------------------------
+# Test: Buffered mode drops only the rows the database rejects
+# -----------------------------
+def test_buffered_activity_writer_drops_rejected_rows(app):
+    from app.utils.activity_log import activity_writer, log_activity
+    manager_id = db.session.execute(
+        db.select(User.id).filter_by(email='manager@test.com')
+    ).scalar_one()
+
+    activity_writer.mode = 'buffered'
+    activity_writer.flush_interval = 60
+    activity_writer.max_queue = 3
+    try:
+        log_activity(manager_id, "Kept 1")
+        log_activity(manager_id, None)  # action is NOT NULL
+        log_activity(manager_id, "Kept 2")
+        log_activity(manager_id, "Over the limit")
+        assert len(activity_writer._queue) == 3
+
+        # The batch is rejected, so the good rows go in one by one
+        assert activity_writer.flush() == 2
+        assert len(activity_writer._queue) == 0
+        assert ActivityLog.query.filter(ActivityLog.action.like('Kept%')).count() == 2
+        assert ActivityLog.query.filter_by(action='Over the limit').count() == 0
+    finally:
+        activity_writer.mode = 'transaction'
+        activity_writer.max_queue = app.config['ACTIVITY_LOG_MAX_QUEUE']
+
+# -----------------------------
+# Test: Buffered mode keeps entries through a database outage
+# -----------------------------
+def test_buffered_activity_writer_survives_outage(app, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from app.utils.activity_log import activity_writer, log_activity
+    manager_id = db.session.execute(
+        db.select(User.id).filter_by(email='manager@test.com')
+    ).scalar_one()
+
+    attempts = []
+    def database_down(*args, **kwargs):
+        attempts.append(1)
+        raise OperationalError('INSERT', {}, Exception('server closed the connection'))
+
+    activity_writer.mode = 'buffered'
+    activity_writer.flush_interval = 60
+    try:
+        for i in range(3):
+            log_activity(manager_id, f"Outage {i}")
+        with monkeypatch.context() as patch:
+            patch.setattr(db.session, 'execute', database_down)
+            assert activity_writer.flush() == 0
+            # Backing off: the next regular flush doesn't even try
+            assert activity_writer.flush() == 0
+            assert len(attempts) == 1
+        assert len(activity_writer._queue) == 3
+
+        # Back up: nothing was lost
+        assert activity_writer.flush(force=True) == 3
+        assert ActivityLog.query.filter(ActivityLog.action.like('Outage%')).count() == 3
+    finally:
+        activity_writer.mode = 'transaction'
+        activity_writer._retry_at = 0.0
+
+# -----------------------------
+# Test: Project activity timeline with keyset pagination
+# -----------------------------
+def test_project_activity_timeline(client, app):
+    from app.models import Project, ProjectMember
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    manager_user = db.session.execute(
+        db.select(User).filter_by(email='manager@test.com')
+    ).scalar_one()
+
+    project = Project(name='Timeline', owner_id=manager_user.id)
+    db.session.add(project)
+    db.session.commit()
+    project_id = project.id
+    employee_id = User.query.filter_by(email='employee1@company.com').one().id
+    for status in ['Under Review', 'Completed', 'In Progress']:
+        res = client.patch(f'/projects/{project_id}/status', json={'status': status})
+        assert res.status_code == 200
+
+    res = client.get(f'/projects/{project_id}/activity?limit=2')
+    assert res.status_code == 200
+    first = res.json
+    assert [i['metadata']['to'] for i in first['items']] == ['In Progress', 'Completed']
+    assert first['items'][0]['verb'] == 'status_changed'
+    assert first['next_cursor']
+
+    res = client.get(f'/projects/{project_id}/activity?limit=2&cursor={first["next_cursor"]}')
+    second = res.json
+    assert [i['metadata'] for i in second['items']] == [{'from': 'In Progress', 'to': 'Under Review'}]
+    assert second['next_cursor'] is None
+
+    res = client.get(f'/projects/{project_id}/activity?cursor=garbage')
+    assert res.status_code == 400
+
+    # Someone outside the project can't read its timeline
+    client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert client.get(f'/projects/{project_id}/activity').status_code == 403
+    db.session.add(ProjectMember(project_id=project_id, user_id=employee_id, status='accepted'))
+    db.session.commit()
+    assert client.get(f'/projects/{project_id}/activity').status_code == 200
+
+# -----------------------------
+# Test: Retention on the plain (unpartitioned) table
+# -----------------------------
+def test_activity_retention_command(app):
+    manager_user = db.session.execute(
+        db.select(User).filter_by(email='manager@test.com')
+    ).scalar_one()
+    now = datetime.now(timezone.utc)
+    db.session.add_all([
+        ActivityLog(user_id=manager_user.id, action='Ancient', created_at=now - timedelta(days=800)),
+        ActivityLog(user_id=manager_user.id, action='Recent', created_at=now - timedelta(days=3)),
+    ])
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['activity', 'retention', '--months', '12'])
+    assert result.exit_code == 0
+    assert [log.action for log in ActivityLog.query.all()] == ['Recent']
+
+    # Nothing to partition or archive on SQLite
+    assert runner.invoke(args=['activity', 'ensure-partitions']).exit_code == 0
+    assert runner.invoke(args=['activity', 'retention', '--archive']).exit_code != 0
+
+# -----------------------------
+# Test: Streaming export
+# -----------------------------
+def test_export_activities(client, app):
+    import csv
+    import io
+    import json
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    manager_user = db.session.execute(
+        db.select(User).filter_by(email='manager@test.com')
+    ).scalar_one()
+    db.session.add_all([
+        ActivityLog(user_id=manager_user.id, action='Old', created_at=datetime(2026, 1, 5, tzinfo=timezone.utc)),
+        ActivityLog(user_id=manager_user.id, action='New', verb='created', meta={'name': 'X'},
+                    created_at=datetime(2026, 3, 5, tzinfo=timezone.utc)),
+    ])
+    db.session.commit()
+
+    res = client.get('/activities/export?from=2026-01-01&to=2026-03-31')
+    assert res.status_code == 200
+    assert res.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert [line['action'] for line in lines] == ['Old', 'New']
+    assert lines[1]['metadata'] == {'name': 'X'}
+
+    res = client.get('/activities/export?format=csv&from=2026-02-01')
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert [row['action'] for row in rows] == ['New']
+    assert json.loads(rows[0]['metadata']) == {'name': 'X'}
+
+    assert client.get('/activities/export?format=xml').status_code == 400
+    assert client.get('/activities/export?from=yesterday').status_code == 400
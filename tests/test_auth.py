@@ -57,3 +57,129 @@ def test_register_new_user(client):
     data = res.get_json()
     assert 'user' in data
     assert data['user']['email'] == email
+
+def test_token_required_serves_cached_principal(client, monkeypatch):
+    from app.utils import principals
+    res = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert res.status_code == 200
+    manager_id = User.query.filter_by(email='manager@test.com').first().id
+    assert client.get('/metrics').status_code == 200
+
+    # A write that bypasses the ORM is only seen once the entry is invalidated
+    db.session.execute(db.update(User).where(User.id == manager_id).values(role='Employee'))
+    db.session.commit()
+    db.session.expire_all()
+    loads = []
+    original_get = principals.db.session.get
+    monkeypatch.setattr(principals.db.session, 'get', lambda *a, **kw: loads.append(a) or original_get(*a, **kw))
+    assert client.get('/metrics').status_code == 200
+    assert loads == []
+
+    principals.invalidate_principal(manager_id)
+    assert client.get('/metrics').status_code == 403
+    assert len(loads) == 1
+
+def test_user_changes_invalidate_cached_principal(client):
+    res = client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert res.status_code == 200
+    employee_id = User.query.filter_by(email='employee1@company.com').first().id
+    assert client.get(f'/users/{employee_id}').get_json()['name'] != 'Renamed'
+
+    res = client.put(f'/users/{employee_id}', json={'name': 'Renamed'})
+    assert res.status_code == 200
+    from app.utils.principals import principal_cache
+    assert principal_cache.load(employee_id).name == 'Renamed'
+
+    assert client.delete(f'/users/{employee_id}').status_code == 200
+    assert client.get(f'/users/{employee_id}').status_code == 401
+
+def test_principal_loads_orm_user_lazily(app):
+    from app.utils.principals import principal_cache, Principal
+    manager = User.query.filter_by(email='manager@test.com').first()
+    principal_cache.load(manager.id)
+    principal = principal_cache.load(manager.id)
+    assert isinstance(principal, Principal)
+    assert principal.__dict__['_user'] is None
+    assert principal.role == 'Manager'
+    assert principal.check_password('adminpass')
+    assert principal.user is manager and principal == manager
+
+def login_with_2fa(client, email='employee1@company.com', password='employeepass'):
+    from app.models import EmailOutbox
+    from app.utils.email_outbox import process_outbox
+    user = User.query.filter_by(email=email).first()
+    user.two_factor_enabled = True
+    db.session.commit()
+    res = client.post('/auth/login', json={'email': email, 'password': password})
+    assert res.get_json()['two_factor_enabled'] is True
+    queued = EmailOutbox.query.filter_by(kind='2fa_code', to_email=email).order_by(EmailOutbox.id.desc()).first()
+    code = queued.payload['code']
+    assert process_outbox()['sent'] == 1
+    return res.get_json()['user_id'], code
+
+def test_2fa_code_is_shared_and_single_use(client, sent_emails):
+    from app.models import TwoFactorCode
+    user_id, code = login_with_2fa(client)
+    assert sent_emails[-1][0] == 'employee1@company.com' and code in sent_emails[-1][2]
+    stored = db.session.get(TwoFactorCode, user_id)
+    assert stored is not None and code not in stored.code_hash
+
+    wrong = '000000' if code != '000000' else '111111'
+    res = client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': wrong})
+    assert res.status_code == 401
+    res = client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': code})
+    assert res.status_code == 200
+    assert 'jwt' in res.headers.get('Set-Cookie', '')
+
+    res = client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': code})
+    assert res.status_code == 400
+    assert res.get_json()['error_code'] == '2FA_CODE_NOT_FOUND'
+
+def test_2fa_code_attempt_limit_and_expiry(client, app):
+    from datetime import datetime, timedelta, timezone
+    from app.models import TwoFactorCode
+    from app.utils.two_factor import two_factor_codes
+    app.config['TWO_FACTOR_MAX_ATTEMPTS'] = 2
+    two_factor_codes.init_app(app)
+
+    user_id, code = login_with_2fa(client)
+    wrong = '000000' if code != '000000' else '111111'
+    assert client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': wrong}).status_code == 401
+    res = client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': wrong})
+    assert res.status_code == 429
+    # The code is gone; even the right one needs a new login
+    assert client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': code}).status_code == 400
+
+    user_id, code = login_with_2fa(client)
+    db.session.execute(db.update(TwoFactorCode).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    db.session.commit()
+    res = client.post('/auth/verify-2fa', json={'user_id': user_id, 'code': code})
+    assert res.get_json()['error_code'] == '2FA_CODE_EXPIRED'
+
+    login_with_2fa(client)
+    login_with_2fa(client, 'manager@test.com', 'adminpass')
+    db.session.execute(db.update(TwoFactorCode).where(TwoFactorCode.user_id == user_id)
+                       .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    db.session.commit()
+    assert two_factor_codes.sweep(batch_size=1) == 1
+    assert TwoFactorCode.query.count() == 1
+
+def test_login_rehashes_password_when_parameters_change(client, app):
+    from app.utils.passwords import password_hasher
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    app.config['PASSWORD_HASH_EXECUTOR'] = 'thread'
+    password_hasher.init_app(app)
+    old_hash = User.query.filter_by(email='manager@test.com').first().password_hash
+    assert old_hash.startswith('scrypt:')
+
+    res = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert res.status_code == 200
+    db.session.expire_all()
+    new_hash = User.query.filter_by(email='manager@test.com').first().password_hash
+    assert new_hash.startswith('pbkdf2:sha256:1000$')
+
+    # Already current: logging in again leaves it alone
+    assert client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'}).status_code == 200
+    db.session.expire_all()
+    assert User.query.filter_by(email='manager@test.com').first().password_hash == new_hash
+    assert client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'wrong'}).status_code == 401
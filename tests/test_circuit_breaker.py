@@ -0,0 +1,77 @@
+import io
+import time
+import pytest
+import cloudinary.exceptions
+import cloudinary.uploader
+from app.models import db, Project, User
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN, HALF_OPEN, CLOSED
+from app.utils.cloudinary_utils import cloudinary_breaker
+
+@pytest.fixture(autouse=True)
+def reset_cloudinary_breaker():
+    cloudinary_breaker.reset()
+    yield
+    cloudinary_breaker.reset()
+
+def failing():
+    raise ConnectionError('down')
+
+def test_breaker_opens_and_recovers_half_open():
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    assert breaker.snapshot()['state'] == OPEN
+
+    # Fails fast without calling the provider
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'never called')
+
+    time.sleep(0.06)
+    assert breaker.snapshot()['state'] == HALF_OPEN
+    # A failed trial re-opens it, a successful one closes it
+    with pytest.raises(ConnectionError):
+        breaker.call(failing)
+    assert breaker.snapshot()['state'] == OPEN
+    time.sleep(0.06)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    stats = breaker.snapshot()
+    assert stats['state'] == CLOSED
+    assert stats['opened'] == 2 and stats['rejected'] == 1
+
+def test_client_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, is_failure=lambda e: not isinstance(e, ValueError))
+    with pytest.raises(ValueError):
+        breaker.call(lambda: (_ for _ in ()).throw(ValueError('bad request')))
+    assert breaker.snapshot()['state'] == CLOSED
+
+def test_upload_fails_fast_when_cloudinary_is_down(client, app, monkeypatch):
+    cloudinary_breaker.configure(failure_threshold=2, reset_timeout=30)
+    calls = []
+
+    def upload(file, **options):
+        calls.append(options['timeout'])
+        raise cloudinary.exceptions.GeneralError('Unexpected error - timeout')
+
+    monkeypatch.setattr(cloudinary.uploader, 'upload', upload)
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    manager = User.query.filter_by(email='manager@test.com').first()
+    project = Project(name='Uploads', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+    url = f'/projects/{project.id}/attachments'
+
+    for _ in range(2):
+        res = client.post(url, data={'file': (io.BytesIO(b'x'), 'a.txt')}, content_type='multipart/form-data')
+        assert res.status_code == 500
+    assert calls[0].connect_timeout == app.config['CLOUDINARY_CONNECT_TIMEOUT']
+
+    res = client.post(url, data={'file': (io.BytesIO(b'x'), 'a.txt')}, content_type='multipart/form-data')
+    assert res.status_code == 503
+    assert res.json['retry_after'] >= 1
+    assert len(calls) == 2
+
+    metrics = client.get('/metrics').json['circuit_breakers']
+    assert metrics['cloudinary']['state'] == OPEN
+    assert metrics['cloudinary']['rejected'] == 1
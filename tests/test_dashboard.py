@@ -0,0 +1,328 @@
+import pytest
+from app.models import db, Project, Task, User
+from app.routes.dashboard_routes import dashboard_cache
+
+@pytest.fixture(autouse=True)
+def clear_dashboard_cache():
+    dashboard_cache.clear()
+    yield
+    dashboard_cache.clear()
+
+def login_as_manager(client):
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+
+def test_manager_summary_is_cached_and_invalidated(client, app):
+    login_as_manager(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+
+    res = client.get('/dashboard/manager-summary')
+    assert res.status_code == 200
+    assert res.json['totalProjects'] == 0
+    assert res.json['cacheAge'] == 0
+
+    # Second read is served from the cache
+    res = client.get('/dashboard/manager-summary')
+    assert res.json['totalProjects'] == 0
+    assert res.json['cacheAge'] >= 0
+    assert 'manager-summary' in dashboard_cache._entries
+
+    # Committing a Project invalidates the cached aggregates
+    project = Project(name='Cached', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+    assert 'manager-summary' not in dashboard_cache._entries
+
+    res = client.get('/dashboard/manager-summary')
+    assert res.json['totalProjects'] == 1
+
+def test_dashboard_cache_is_bounded(client, app):
+    assert dashboard_cache.max_entries == app.config['DASHBOARD_CACHE_SIZE']
+    dashboard_cache.max_entries = 1
+    try:
+        login_as_manager(client)
+        client.get('/dashboard/manager-summary')
+        client.get('/dashboard/me')
+        assert len(dashboard_cache._entries) == 1
+        assert 'manager-summary' not in dashboard_cache._entries
+    finally:
+        dashboard_cache.max_entries = app.config['DASHBOARD_CACHE_SIZE']
+
+def test_dashboard_requires_manager(client):
+    login = client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert login.status_code == 200
+
+    res = client.get('/dashboard/task-productivity')
+    assert res.status_code == 403
+
+def test_dashboard_overview(client, app):
+    from app.models import Cohort, Notification, Sprint
+    login_as_manager(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+
+    cohort = Cohort(name='Team A')
+    db.session.add(cohort)
+    db.session.commit()
+
+    db.session.add_all([
+        Project(name='P1', owner_id=manager.id, cohort_id=cohort.id, status='In Progress'),
+        Project(name='P2', owner_id=manager.id, cohort_id=cohort.id, status='Completed'),
+        Project(name='P3', owner_id=manager.id, status='In Progress'),
+    ])
+    db.session.commit()
+    project = Project.query.filter_by(name='P1').first()
+    db.session.add_all([
+        Task(title='T1', project_id=project.id, status='To Do'),
+        Task(title='T2', project_id=project.id, status='Completed'),
+        Sprint(name='S1', project_id=project.id, status='Active'),
+        Notification(user_id=manager.id, type='test', message='hello'),
+    ])
+    db.session.commit()
+
+    res = client.get('/dashboard/overview')
+    assert res.status_code == 200
+    data = res.json
+    assert data['summary'] == {'totalProjects': 3, 'totalTasks': 2, 'activeSprints': 1}
+    assert {'name': 'In Progress', 'value': 2} in data['projectsByStatus']
+    assert {'name': 'Completed', 'value': 1} in data['projectsByStatus']
+    assert data['projectsByTeam'] == [{'name': 'Team A', 'value': 2}]
+    assert {'name': 'Completed', 'value': 1} in data['taskProductivity']
+    assert data['unreadNotifications'] == 1
+
+def test_overview_groups_unknown_statuses_the_same_way(client, app):
+    login_as_manager(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+    db.session.add_all([
+        Project(name='Live', owner_id=manager.id, status='Completed'),
+        Project(name='Legacy', owner_id=manager.id, status='Archived'),
+        Project(name='Legacy 2', owner_id=manager.id, status='On Hold'),
+    ])
+    db.session.commit()
+
+    expected = [{'name': 'Completed', 'value': 1}, {'name': 'Other', 'value': 2}]
+    # Unfiltered reads stat_counters, a date filter scans the projects table
+    from_counters = client.get('/dashboard/overview').json['projectsByStatus']
+    from_scans = client.get('/dashboard/overview?from=2000-01-01').json['projectsByStatus']
+    assert from_counters == from_scans == expected
+    assert client.get('/dashboard/projects-by-status').json['data'] == expected
+    assert client.get('/dashboard/projects-by-status?from=2000-01-01').json['data'] == expected
+
+def test_stat_counters_follow_writes(client, app):
+    from app.models import Sprint
+    from app.utils.stat_counters import read_counters, read_total
+    manager = User.query.filter_by(email='manager@test.com').first()
+
+    project = Project(name='Counted', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+    assert read_counters('project', 'status') == {'In Progress': 1}
+
+    res = client.post('/tasks/', json={'title': 'A', 'project_id': project.id})
+    task_id = res.json['task_id']
+    client.post('/tasks/', json={'title': 'B', 'project_id': project.id, 'status': 'Completed'})
+    assert read_total('task') == 2
+    assert read_counters('task', 'status') == {'To Do': 1, 'Completed': 1}
+
+    client.put(f'/tasks/{task_id}', json={'status': 'Completed'})
+    assert read_counters('task', 'status') == {'Completed': 2}
+
+    db.session.add(Sprint(name='S', project_id=project.id, status='Active'))
+    db.session.commit()
+    assert read_counters('sprint', 'status') == {'Active': 1}
+
+    # Deleting the project cascades to its tasks and sprints
+    db.session.delete(project)
+    db.session.commit()
+    assert read_total('project') == 0
+    assert read_total('task') == 0
+    assert read_total('sprint') == 0
+
+def test_stat_counters_survive_expired_attributes(app):
+    from app.utils.stat_counters import read_counters
+    manager = User.query.filter_by(email='manager@test.com').first()
+    project = Project(name='Expired', owner_id=manager.id)
+    other = Project(name='Gone', owner_id=manager.id, status='Under Review')
+    db.session.add_all([project, other])
+    db.session.commit()
+
+    # Committing expires every attribute, so neither change has a loaded old value
+    project.status = 'Completed'
+    db.session.delete(other)
+    db.session.commit()
+    assert read_counters('project', 'status') == {'Completed': 1}
+
+def test_recompute_stats_command(app):
+    from app.models import StatCounter
+    from app.utils.stat_counters import read_counters
+    manager = User.query.filter_by(email='manager@test.com').first()
+    db.session.add(Project(name='Drifted', owner_id=manager.id, status='Completed'))
+    db.session.commit()
+
+    # Simulate drift, then repair it from the CLI
+    db.session.query(StatCounter).delete()
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['stats', 'recompute'])
+    assert result.exit_code == 0
+    assert read_counters('project', 'status') == {'Completed': 1}
+
+def test_personal_dashboard(client, app):
+    from datetime import datetime, timedelta, timezone
+    from app.models import ProjectMember
+    employee = User.query.filter_by(email='employee1@company.com').first()
+    manager = User.query.filter_by(email='manager@test.com').first()
+
+    mine = Project(name='Mine', owner_id=employee.id)
+    invited = Project(name='Invited', owner_id=manager.id)
+    db.session.add_all([mine, invited])
+    db.session.commit()
+    soon = datetime.now(timezone.utc).replace(hour=23, minute=0)
+    db.session.add_all([
+        ProjectMember(project_id=mine.id, user_id=employee.id, role='owner', status='accepted'),
+        ProjectMember(project_id=invited.id, user_id=employee.id, status='pending'),
+        Task(title='Due', project_id=mine.id, assignee_id=employee.id, status='To Do', due_date=soon),
+        Task(title='Later', project_id=mine.id, assignee_id=employee.id, status='In Progress',
+             due_date=soon + timedelta(days=30)),
+        Task(title='Done', project_id=mine.id, assignee_id=employee.id, status='Completed'),
+    ])
+    db.session.commit()
+
+    login = client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert login.status_code == 200
+
+    res = client.get('/dashboard/me')
+    assert res.status_code == 200
+    data = res.json
+    assert sorted((s['name'], s['value']) for s in data['openTasksByStatus']) == [('In Progress', 1), ('To Do', 1)]
+    assert [t['title'] for t in data['dueThisWeek']] == ['Due']
+    assert data['projects'] == [{
+        'id': mine.id, 'name': 'Mine', 'status': 'In Progress',
+        'totalTasks': 3, 'completedTasks': 1, 'progress': 33
+    }]
+    assert [i['project_name'] for i in data['pendingInvitations']] == ['Invited']
+    assert data['unreadNotifications'] == 0
+    assert f'me:{employee.id}' in dashboard_cache._entries
+
+def test_task_throughput(client, app):
+    from datetime import datetime, timezone
+    from app.models import TaskDailyStat
+    today = datetime.now(timezone.utc).date()
+    login_as_manager(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+    project = Project(name='Busy', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+
+    for title in ('A', 'B', 'C'):
+        client.post('/tasks/', json={'title': title, 'project_id': project.id})
+    task = Task.query.filter_by(title='A').first()
+    client.put(f'/tasks/{task.id}', json={'status': 'Completed'})
+
+    stat = db.session.get(TaskDailyStat, (project.id, today))
+    assert (stat.created, stat.completed) == (3, 1)
+
+    res = client.get(f'/dashboard/throughput?weeks=2&project_id={project.id}')
+    assert res.status_code == 200
+    data = res.json['data']
+    assert len(data) == 14
+    assert data[-1] == {'date': today.isoformat(), 'created': 3, 'completed': 1}
+    assert all(d['created'] == 0 for d in data[:-1])
+
+    res = client.get('/dashboard/throughput?weeks=0')
+    assert res.status_code == 400
+
+def test_dashboard_filters(client, app):
+    from app.models import Cohort, Class
+    login_as_manager(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+    alpha, beta = Cohort(name='Alpha'), Cohort(name='Beta')
+    web = Class(name='Web')
+    db.session.add_all([alpha, beta, web])
+    db.session.commit()
+
+    p1 = Project(name='A1', owner_id=manager.id, cohort_id=alpha.id, class_id=web.id)
+    p2 = Project(name='B1', owner_id=manager.id, cohort_id=beta.id, status='Completed')
+    db.session.add_all([p1, p2])
+    db.session.commit()
+    db.session.add_all([
+        Task(title='a', project_id=p1.id, status='To Do'),
+        Task(title='b', project_id=p2.id, status='Completed'),
+        Task(title='c', project_id=p2.id, status='Completed'),
+    ])
+    db.session.commit()
+
+    res = client.get(f'/dashboard/manager-summary?cohort_id={beta.id}')
+    assert res.json['totalProjects'] == 1
+    assert res.json['totalTasks'] == 2
+
+    res = client.get(f'/dashboard/task-productivity?class_id={web.id}')
+    assert res.json['data'] == [{'name': 'To Do', 'value': 1}]
+
+    res = client.get(f'/dashboard/overview?cohort_id={alpha.id}')
+    assert res.json['summary']['totalProjects'] == 1
+    assert res.json['projectsByTeam'] == [{'name': 'Alpha', 'value': 1}]
+
+    # Date range before everything was created
+    res = client.get('/dashboard/projects-by-status?from=2000-01-01&to=2000-12-31')
+    assert res.json['data'] == []
+    res = client.get('/dashboard/projects-by-status?from=2000-01-01')
+    assert sum(d['value'] for d in res.json['data']) == 2
+
+    # Unfiltered and filtered results are cached under different keys
+    res = client.get('/dashboard/manager-summary')
+    assert res.json['totalProjects'] == 2
+    assert f'manager-summary?cohort_id={beta.id}' in dashboard_cache._entries
+
+    res = client.get('/dashboard/manager-summary?from=not-a-date')
+    assert res.status_code == 400
+
+def test_single_flight_coalesces_concurrent_calls(app, tmp_path):
+    import threading
+    import time
+    from app.utils.single_flight import single_flight
+    app.config['SINGLE_FLIGHT_LOCK_DIR'] = str(tmp_path)
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def worker():
+        with app.app_context():
+            results.append(single_flight.do('test:key', compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{'value': 42}] * 5
+
+def test_single_flight_does_not_wait_forever_for_a_stuck_leader(app, tmp_path):
+    import fcntl
+    import hashlib
+    import os
+    import stat
+    from app.utils.single_flight import single_flight
+    lock_dir = tmp_path / 'flights'
+    lock_dir.mkdir(mode=0o755)
+    app.config.update(SINGLE_FLIGHT_LOCK_DIR=str(lock_dir), SINGLE_FLIGHT_TIMEOUT=0.2)
+
+    assert single_flight.do('test:private', lambda: {'value': 1}) == {'value': 1}
+    # Results may be private: the directory is closed to other users
+    assert stat.S_IMODE(os.stat(lock_dir).st_mode) == 0o700
+
+    # Another worker holds the lock and never finishes
+    path = lock_dir / (hashlib.sha1(b'test:stuck').hexdigest() + '.flight')
+    with open(path, 'a+') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert single_flight.do('test:stuck', lambda: {'value': 2}) == {'value': 2}
+
+def test_project_list_still_served(client):
+    login_as_manager(client)
+    res = client.get('/projects')
+    assert res.status_code == 200
+    assert res.json['items'] == []
@@ -0,0 +1,238 @@
+import json
+import os
+import pytest
+from app.models import db, EmailOutbox, Project, User
+from app.utils.email_outbox import enqueue_email, process_outbox
+from app.utils.email_transports import FileTransport
+
+class FailingTransport:
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, to_email, subject, html):
+        self.calls += 1
+        raise ConnectionError('provider down')
+
+@pytest.fixture
+def project_owned_by_manager(app):
+    manager = User.query.filter_by(email='manager@test.com').first()
+    project = Project(name='Outbox Project', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+    return project.id
+
+def test_invite_queues_email_in_same_transaction(client, app, project_owned_by_manager, tmp_path):
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+
+    res = client.post(f'/members/projects/{project_owned_by_manager}/invite', json={'email': 'employee1@company.com'})
+    assert res.status_code == 201
+    assert res.json['email_queued'] is True
+
+    queued = EmailOutbox.query.all()
+    assert [(m.kind, m.to_email, m.status) for m in queued] == [('invitation', 'employee1@company.com', 'pending')]
+
+    stats = process_outbox(FileTransport(str(tmp_path)))
+    assert stats == {'sent': 1, 'retried': 0, 'failed': 0}
+    written = json.loads((tmp_path / os.listdir(tmp_path)[0]).read_text())
+    assert written['to'] == 'employee1@company.com'
+    assert 'Outbox Project' in written['subject']
+    assert db.session.get(EmailOutbox, queued[0].id).status == 'sent'
+
+def test_rolled_back_email_is_never_sent(app):
+    enqueue_email('2fa_code', 'someone@test.com', code='123456')
+    db.session.rollback()
+    assert EmailOutbox.query.count() == 0
+
+def test_failed_sends_back_off_then_give_up(app):
+    app.config.update(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_BACKOFF_BASE=0)
+    enqueue_email('2fa_code', 'someone@test.com', code='123456')
+    db.session.commit()
+    transport = FailingTransport()
+
+    assert process_outbox(transport) == {'sent': 0, 'retried': 1, 'failed': 0}
+    message = EmailOutbox.query.one()
+    assert message.status == 'pending' and message.attempts == 1
+    assert 'provider down' in message.last_error
+
+    assert process_outbox(transport) == {'sent': 0, 'retried': 0, 'failed': 1}
+    db.session.refresh(message)
+    assert message.status == 'failed'
+    assert transport.calls == 2
+
+    # Nothing left to send
+    assert process_outbox(transport) == {'sent': 0, 'retried': 0, 'failed': 0}
+
+def test_mail_service_renders_precompiled_templates(app):
+    from app.utils.mail_service import mail_service
+    subject, html = mail_service.render('invitation', project_name='R&D <Apollo>', inviter_name='Ada')
+    # Plain text subject, escaped HTML body
+    assert subject == 'Invitation to join project: R&D <Apollo>'
+    assert 'R&amp;D &lt;Apollo&gt;' in html and 'Ada' in html
+
+    subject, html = mail_service.render('notification_digest', user_name='Bo', notifications=[
+        {'message': 'One', 'link': '/projects/1', 'count': 3},
+        {'message': 'Two', 'link': None, 'count': 1},
+    ])
+    assert subject == 'You have 2 unread notifications'
+    assert '(3 updates)' in html and '/dashboard' in html
+
+    with pytest.raises(ValueError):
+        mail_service.render('unknown')
+
+def test_send_many_reuses_one_client(app, monkeypatch):
+    from app.utils.mail_service import mail_service
+
+    class FakeClient:
+        def __init__(self):
+            self.sent = []
+
+        def send(self, mail):
+            recipient = mail.personalizations[0].tos[0]['email']
+            if recipient == 'bad@test.com':
+                raise ConnectionError('rejected')
+            self.sent.append(recipient)
+
+    fake = FakeClient()
+    monkeypatch.setattr(mail_service, '_client', fake)
+    results = mail_service.send_many([
+        ('a@test.com', '2fa_code', {'code': '111111'}),
+        ('bad@test.com', '2fa_code', {'code': '222222'}),
+        ('c@test.com', 'verification', {'token': 'abc'}),
+    ])
+    assert fake.sent == ['a@test.com', 'c@test.com']
+    assert [email for email, error in results if error] == ['bad@test.com']
+
+class FakeSendGridClient:
+    def __init__(self):
+        self.requests = []
+
+    def send(self, mail):
+        self.requests.append(mail.get())
+
+def test_bulk_invites_are_sent_as_personalizations(client, app, project_owned_by_manager, monkeypatch):
+    from app.utils.mail_service import mail_service
+    from app.utils.email_transports import SendGridTransport
+
+    invitees = []
+    for i in range(5):
+        user = User(name=f'Invitee <{i}>', email=f'invitee{i}@test.com', role='Employee')
+        user.set_password('pass')
+        invitees.append(user)
+    db.session.add_all(invitees)
+    db.session.commit()
+
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    res = client.put(f'/projects/{project_owned_by_manager}', json={'members': [u.email for u in invitees]})
+    assert res.status_code == 200
+    queued = EmailOutbox.query.filter(EmailOutbox.batch_key.like(f'invitation:project:{project_owned_by_manager}:%')).all()
+    assert len(queued) == 5 and len({m.batch_key for m in queued}) == 1
+
+    fake = FakeSendGridClient()
+    monkeypatch.setattr(mail_service, '_client', fake)
+    monkeypatch.setattr(mail_service, 'max_personalizations', 2)
+
+    assert process_outbox(SendGridTransport()) == {'sent': 5, 'retried': 0, 'failed': 0}
+    # 5 recipients, 2 per request
+    assert len(fake.requests) == 3
+    personalizations = [p for request in fake.requests for p in request['personalizations']]
+    by_email = {p['to'][0]['email']: p for p in personalizations}
+    assert sorted(by_email) == [f'invitee{i}@test.com' for i in range(5)]
+    assert by_email['invitee0@test.com']['substitutions'] == {'-recipient_name-': 'Invitee &lt;0&gt;'}
+    assert '-recipient_name-' in fake.requests[0]['content'][0]['value']
+
+def test_invites_from_different_requests_are_not_merged(client, app, project_owned_by_manager, monkeypatch):
+    from app.utils.mail_service import mail_service
+    from app.utils.email_transports import SendGridTransport
+
+    second = User(name='Second Manager', email='manager2@test.com', role='Manager')
+    second.set_password('secondpass')
+    invitees = [User(name=f'Invitee {i}', email=f'invitee{i}@test.com', role='Employee') for i in range(4)]
+    for user in invitees:
+        user.set_password('pass')
+    db.session.add_all([second] + invitees)
+    db.session.commit()
+    emails = [u.email for u in invitees]
+
+    assert client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'}).status_code == 200
+    assert client.put(f'/projects/{project_owned_by_manager}', json={'members': emails[:2]}).status_code == 200
+    assert client.post('/auth/login', json={'email': 'manager2@test.com', 'password': 'secondpass'}).status_code == 200
+    res = client.put(f'/projects/{project_owned_by_manager}', json={'name': 'Renamed Project', 'members': emails[2:]})
+    assert res.status_code == 200
+
+    fake = FakeSendGridClient()
+    monkeypatch.setattr(mail_service, '_client', fake)
+    assert process_outbox(SendGridTransport()) == {'sent': 4, 'retried': 0, 'failed': 0}
+    assert len(fake.requests) == 2
+    sent = {
+        tuple(sorted(p['to'][0]['email'] for p in request['personalizations'])): request
+        for request in fake.requests
+    }
+    first_batch, second_batch = sent[tuple(emails[:2])], sent[tuple(emails[2:])]
+    assert '<strong>Manager</strong>' in first_batch['content'][0]['value']
+    assert 'Outbox Project' in first_batch['subject']
+    assert '<strong>Second Manager</strong>' in second_batch['content'][0]['value']
+    assert 'Renamed Project' in second_batch['subject']
+
+def test_open_breaker_does_not_use_up_retries(app):
+    from app.utils.circuit_breaker import CircuitOpenError
+
+    class OpenTransport:
+        def send(self, to_email, subject, html):
+            raise CircuitOpenError('sendgrid', 30)
+
+    enqueue_email('2fa_code', 'someone@test.com', code='123456')
+    db.session.commit()
+    assert process_outbox(OpenTransport()) == {'sent': 0, 'retried': 1, 'failed': 0}
+    message = EmailOutbox.query.one()
+    assert message.status == 'pending'
+    assert message.attempts == 0
+
+def test_sent_2fa_codes_are_wiped_and_old_rows_purged(app, tmp_path):
+    from datetime import datetime, timedelta, timezone
+    from app.utils.email_outbox import purge_outbox
+
+    code = enqueue_email('2fa_code', 'someone@test.com', code='123456')
+    digest = enqueue_email('notification_digest', 'someone@test.com', user_name='Someone', notifications=[])
+    db.session.commit()
+    code_id, digest_id = code.id, digest.id
+    assert process_outbox(FileTransport(str(tmp_path))) == {'sent': 2, 'retried': 0, 'failed': 0}
+    assert db.session.get(EmailOutbox, code_id).payload is None
+    assert db.session.get(EmailOutbox, digest_id).payload['user_name'] == 'Someone'
+
+    old = EmailOutbox(kind='invitation', to_email='old@test.com', payload={}, status='sent',
+                      sent_at=datetime.now(timezone.utc) - timedelta(days=30))
+    # Sent before payloads were wiped on send
+    legacy = EmailOutbox(kind='2fa_code', to_email='someone@test.com', payload={'code': '654321'}, status='sent',
+                         sent_at=datetime.now(timezone.utc))
+    db.session.add_all([old, legacy])
+    db.session.commit()
+    legacy_id = legacy.id
+    assert purge_outbox() == {'sent_deleted': 1, 'failed_deleted': 0, 'payloads_cleared': 1}
+    assert sorted(m.id for m in EmailOutbox.query.all()) == [code_id, digest_id, legacy_id]
+    db.session.expire_all()
+    assert db.session.get(EmailOutbox, legacy_id).payload is None
+
+def test_2fa_codes_are_not_sent_or_retried_past_their_ttl(app):
+    from datetime import datetime, timedelta, timezone
+    app.config.update(TWO_FACTOR_CODE_TTL=600, EMAIL_OUTBOX_BACKOFF_BASE=400)
+    stale = enqueue_email('2fa_code', 'stale@test.com', code='111111')
+    stale.created_at = datetime.now(timezone.utc) - timedelta(seconds=601)
+    fresh = enqueue_email('2fa_code', 'fresh@test.com', code='222222')
+    fresh.created_at = datetime.now(timezone.utc) - timedelta(seconds=300)
+    invite = enqueue_email('invitation', 'someone@test.com', project_name='P')
+    invite.created_at = datetime.now(timezone.utc) - timedelta(days=1)
+    db.session.commit()
+    stale_id, fresh_id, invite_id = stale.id, fresh.id, invite.id
+    transport = FailingTransport()
+
+    # The stale code is dropped unsent; the fresh one's retry would land after the TTL
+    assert process_outbox(transport) == {'sent': 0, 'retried': 1, 'failed': 2}
+    assert transport.calls == 2
+    db.session.expire_all()
+    stale, fresh = db.session.get(EmailOutbox, stale_id), db.session.get(EmailOutbox, fresh_id)
+    assert (stale.status, stale.attempts, stale.payload) == ('failed', 0, None)
+    assert stale.last_error == 'Expired before it could be sent'
+    assert (fresh.status, fresh.attempts, fresh.payload) == ('failed', 1, None)
+    assert db.session.get(EmailOutbox, invite_id).status == 'pending'
@@ -0,0 +1,220 @@
+import threading
+import time
+from app.models import db, Notification, User
+from app.utils.notification_broker import notification_broker
+
+def login_as_employee(client):
+    login = client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert login.status_code == 200
+    return User.query.filter_by(email='employee1@company.com').first()
+
+def read_events(response):
+    """Collect the SSE frames of a finished stream"""
+    frames = response.get_data(as_text=True).split('\n\n')
+    return [dict(line.split(': ', 1) for line in frame.splitlines() if not line.startswith(':'))
+            for frame in frames if frame and not frame.startswith(':')]
+
+def test_stream_resumes_from_last_event_id(client, app):
+    employee = login_as_employee(client)
+    first = Notification(user_id=employee.id, type='invite', message='First')
+    second = Notification(user_id=employee.id, type='invite', message='Second')
+    db.session.add_all([first, second])
+    db.session.commit()
+    first_id, second_id = first.id, second.id
+    app.config['NOTIFICATION_STREAM_MAX_SECONDS'] = 0.2
+
+    res = client.get('/notifications/stream', headers={'Last-Event-ID': str(first_id)})
+    assert res.status_code == 200
+    assert res.mimetype == 'text/event-stream'
+    events = [e for e in read_events(res) if 'id' in e]
+    assert [int(e['id']) for e in events] == [second_id]
+    assert 'Second' in events[0]['data']
+
+    # Without Last-Event-ID only notifications created from now on are sent
+    res = client.get('/notifications/stream')
+    assert [e for e in read_events(res) if 'id' in e] == []
+    assert notification_broker.subscriber_count() == 0
+
+def test_stream_wakes_on_commit(client, app):
+    employee = login_as_employee(client)
+    app.config.update(NOTIFICATION_STREAM_MAX_SECONDS=5, NOTIFICATION_STREAM_POLL_INTERVAL=60)
+    employee_id = employee.id
+
+    res = client.get('/notifications/stream', buffered=False)
+    chunks = res.response
+    assert next(chunks).startswith(b'retry:')
+
+    def notify():
+        while notification_broker.subscriber_count() == 0:
+            time.sleep(0.01)
+        with app.app_context():
+            db.session.add(Notification(user_id=employee_id, type='comment', message='Live'))
+            db.session.commit()
+
+    writer = threading.Thread(target=notify)
+    writer.start()
+    started = time.monotonic()
+    frame = next(chunks).decode()
+    writer.join()
+    assert 'Live' in frame
+    # Delivered by the commit hook, not by the 60s poll
+    assert time.monotonic() - started < 2
+    res.close()
+
+def test_stream_limit_per_worker(client, app):
+    employee = login_as_employee(client)
+    app.config.update(NOTIFICATION_STREAM_MAX_PER_WORKER=1, NOTIFICATION_STREAM_MAX_SECONDS=0.2)
+    held = notification_broker.subscribe(employee.id)
+    try:
+        res = client.get('/notifications/stream')
+        assert res.status_code == 503
+        assert res.json['error_code'] == 'STREAM_LIMIT'
+        # Flask-Limiter keeps the later of ours and its own window reset
+        assert int(res.headers['Retry-After']) >= res.json['retry_after'] == 30
+    finally:
+        notification_broker.unsubscribe(employee.id, held)
+
+    res = client.get('/notifications/stream')
+    assert res.status_code == 200
+    res.get_data()
+    assert notification_broker.subscriber_count() == 0
+
+def test_unread_count_and_bulk_read(client, app):
+    employee = login_as_employee(client)
+    manager = User.query.filter_by(email='manager@test.com').first()
+    mine = [Notification(user_id=employee.id, type='invite', message=f'N{i}') for i in range(4)]
+    theirs = Notification(user_id=manager.id, type='invite', message='Not yours')
+    db.session.add_all(mine + [theirs])
+    db.session.commit()
+    mine_ids = [n.id for n in mine]
+    theirs_id = theirs.id
+
+    assert client.get('/notifications/unread-count').json == {'unread': 4}
+
+    res = client.post('/notifications/read', json={'ids': mine_ids[:2] + [theirs_id]})
+    assert res.status_code == 200
+    assert res.json['updated'] == 2
+    assert client.get('/notifications/unread-count').json == {'unread': 2}
+    assert db.session.get(Notification, theirs_id).is_read is False
+
+    assert client.post('/notifications/read', json={'ids': []}).status_code == 400
+    assert client.post('/notifications/read', json={'ids': ['x']}).status_code == 400
+
+    res = client.post('/notifications/read-all')
+    assert res.json['updated'] == 2
+    assert client.get('/notifications/unread-count').json == {'unread': 0}
+
+def test_notifications_cursor_pagination(client, app):
+    employee = login_as_employee(client)
+    db.session.add_all([Notification(user_id=employee.id, type='invite', message=f'N{i}') for i in range(5)])
+    db.session.commit()
+
+    first = client.get('/notifications?limit=3').json
+    assert len(first['notifications']) == 3
+    second = client.get(f'/notifications?limit=3&cursor={first["next_cursor"]}').json
+    assert len(second['notifications']) == 2
+    assert second['next_cursor'] is None
+    ids = [n['id'] for n in first['notifications'] + second['notifications']]
+    assert ids == sorted(ids, reverse=True)
+
+def test_status_changes_are_coalesced(client, app):
+    from app.models import Project, ProjectMember
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    manager = User.query.filter_by(email='manager@test.com').first()
+    employee = User.query.filter_by(email='employee1@company.com').first()
+    project = Project(name='Busy', owner_id=manager.id)
+    db.session.add(project)
+    db.session.commit()
+    db.session.add(ProjectMember(project_id=project.id, user_id=employee.id, status='accepted'))
+    db.session.commit()
+    project_id, employee_id = project.id, employee.id
+
+    assert client.patch(f'/projects/{project_id}/status', json={'status': 'Under Review'}).status_code == 200
+    first_id = Notification.query.filter_by(user_id=employee_id, type='project_status_change').one().id
+    for status in ['Completed', 'In Progress']:
+        assert client.patch(f'/projects/{project_id}/status', json={'status': status}).status_code == 200
+
+    db.session.expire_all()
+    rows = Notification.query.filter_by(user_id=employee_id, type='project_status_change').all()
+    assert len(rows) == 1
+    assert rows[0].count == 3
+    # Merged rows move to the top of the feed and the SSE stream
+    assert rows[0].id > first_id
+    assert rows[0].message.endswith('In Progress.')
+
+    # Outside the window a new row is started
+    app.config['NOTIFICATION_COALESCE_WINDOW'] = 0
+    client.patch(f'/projects/{project_id}/status', json={'status': 'Completed'})
+    assert Notification.query.filter_by(user_id=employee_id, type='project_status_change').count() == 2
+
+def test_failed_coalescing_does_not_fail_the_caller(app, monkeypatch):
+    from app.models import Project
+    from app.utils import notifications
+    from app.utils.notifications import notify
+    from sqlalchemy.exc import OperationalError
+
+    def broken_insert(values):
+        raise OperationalError('INSERT', {}, Exception('database is locked'))
+
+    employee = User.query.filter_by(email='employee1@company.com').first()
+    manager = User.query.filter_by(email='manager@test.com').first()
+    project = Project(name='Still Saved', owner_id=manager.id)
+    db.session.add(project)
+    db.session.flush()
+    monkeypatch.setattr(notifications, '_coalescing_insert', broken_insert)
+    notify(employee.id, 'project_invite', 'Invited', entity_type='project', entity_id=project.id)
+    db.session.commit()
+
+    assert Project.query.filter_by(name='Still Saved').count() == 1
+    row = Notification.query.filter_by(user_id=employee.id, type='project_invite').one()
+    assert row.count == 1 and row.coalesce_key is None
+
+def test_notification_digest_command(app):
+    from app.models import EmailOutbox
+    employee = User.query.filter_by(email='employee1@company.com').first()
+    db.session.add_all([
+        Notification(user_id=employee.id, type='invite', message='A'),
+        Notification(user_id=employee.id, type='invite', message='B'),
+        Notification(user_id=employee.id, type='invite', message='Read', is_read=True),
+    ])
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['notifications', 'digest', '--older-than', '0'])
+    assert result.exit_code == 0
+    queued = EmailOutbox.query.all()
+    assert len(queued) == 1
+    assert queued[0].kind == 'notification_digest'
+    assert queued[0].to_email == 'employee1@company.com'
+    assert [n['message'] for n in queued[0].payload['notifications']] == ['A', 'B']
+
+    # Digested rows are not queued again
+    runner.invoke(args=['notifications', 'digest', '--older-than', '0'])
+    assert EmailOutbox.query.count() == 1
+
+def test_purge_command_and_metrics(client, app):
+    from datetime import datetime, timedelta, timezone
+    employee = User.query.filter_by(email='employee1@company.com').first()
+    now = datetime.now(timezone.utc)
+    db.session.add_all([
+        Notification(user_id=employee.id, type='invite', message='Old read', is_read=True, created_at=now - timedelta(days=40)),
+        Notification(user_id=employee.id, type='invite', message='Old unread', created_at=now - timedelta(days=40)),
+        Notification(user_id=employee.id, type='invite', message='Ancient unread', created_at=now - timedelta(days=400)),
+        Notification(user_id=employee.id, type='invite', message='Fresh read', is_read=True),
+    ])
+    db.session.commit()
+    app.config['NOTIFICATION_PURGE_BATCH_SIZE'] = 1
+
+    result = app.test_cli_runner().invoke(args=['notifications', 'purge'])
+    assert result.exit_code == 0
+    assert sorted(n.message for n in Notification.query.all()) == ['Fresh read', 'Old unread']
+
+    login = client.post('/auth/login', json={'email': 'manager@test.com', 'password': 'adminpass'})
+    assert login.status_code == 200
+    res = client.get('/metrics')
+    assert res.status_code == 200
+    run = res.json['jobs']['notifications.purge']
+    assert run['status'] == 'succeeded'
+    assert run['stats']['read_deleted'] == 1
+    assert run['stats']['unread_deleted'] == 1
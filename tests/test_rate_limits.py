@@ -0,0 +1,59 @@
+def login(client, email, password, ip='127.0.0.1'):
+    return client.post('/auth/login', json={'email': email, 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+def test_login_is_limited_per_email(client, app):
+    app.config['RATELIMIT_LOGIN'] = '2 per minute'
+    for _ in range(2):
+        assert login(client, 'manager@test.com', 'wrong').status_code == 401
+
+    res = login(client, 'manager@test.com', 'adminpass')
+    assert res.status_code == 429
+    data = res.get_json()
+    assert data['error_code'] == 'RATE_LIMIT_EXCEEDED'
+    assert data['retry_after'] > 0
+    assert 'Retry-After' in res.headers
+
+    # Same IP, other account: its own bucket
+    assert login(client, 'employee1@company.com', 'employeepass').status_code == 200
+    # Failed guesses from elsewhere don't lock the owner out
+    assert login(client, 'manager@test.com', 'adminpass', ip='10.0.0.2').status_code == 200
+
+def test_many_users_can_log_in_from_one_ip(client, app):
+    app.config.update(RATELIMIT_AUTH='5 per minute', RATELIMIT_LOGIN='2 per minute', RATELIMIT_LOGIN_IP='8 per minute')
+    # More logins than the blueprint-wide auth limit, each for a different account
+    for i in range(8):
+        assert login(client, f'user{i}@campus.test', 'pass', ip='10.1.1.1').status_code == 401
+    # The per-IP ceiling still applies
+    assert login(client, 'user8@campus.test', 'pass', ip='10.1.1.1').status_code == 429
+    assert login(client, 'user8@campus.test', 'pass', ip='10.1.1.2').status_code == 401
+
+def test_signed_in_requests_are_limited_per_user(app):
+    app.config['RATELIMIT_DEFAULT'] = '3 per minute'
+    manager, employee = app.test_client(), app.test_client()
+    assert login(manager, 'manager@test.com', 'adminpass').status_code == 200
+    assert login(employee, 'employee1@company.com', 'employeepass').status_code == 200
+
+    for _ in range(3):
+        assert manager.get('/notifications/unread-count').status_code == 200
+    assert manager.get('/notifications/unread-count').status_code == 429
+    # Both clients share an IP, but the employee has not used their budget
+    assert employee.get('/notifications/unread-count').status_code == 200
+    assert manager.get('/health').status_code == 200
+
+def test_expensive_endpoints_spend_more_of_the_shared_budget(app):
+    app.config['RATELIMIT_BUDGET'] = '30 per minute'
+    manager, employee = app.test_client(), app.test_client()
+    assert login(manager, 'manager@test.com', 'adminpass').status_code == 200
+    assert login(employee, 'employee1@company.com', 'employeepass').status_code == 200
+
+    assert manager.get('/dashboard/overview').status_code == 200  # costs 20
+    assert manager.get('/notifications/unread-count').status_code == 200  # costs 1
+    res = manager.get('/tasks/')  # costs 25, over the remaining budget
+    assert res.status_code == 429
+    data = res.get_json()
+    assert data['error_code'] == 'RATE_LIMIT_EXCEEDED'
+    assert data['retry_after'] > 0
+
+    # The budget is per user
+    assert employee.get('/tasks/').status_code == 200
@@ -0,0 +1,65 @@
+import pytest
+from app.models import db, Task, Project, TimeLog, User
+
+@pytest.fixture
+def seeded_tasks(app):
+    """Seed a project with two tasks for timesheet tests."""
+    with app.app_context():
+        employee = User.query.filter_by(email="employee1@company.com").first()
+        project = Project(name="Timesheet Project", owner_id=employee.id)
+        db.session.add(project)
+        db.session.commit()
+
+        tasks = [Task(title=f"Task {i}", project_id=project.id) for i in range(2)]
+        db.session.add_all(tasks)
+        db.session.commit()
+
+        return {
+            "employee_id": employee.id,
+            "task_ids": [t.id for t in tasks]
+        }
+
+def test_bulk_time_entry(client, seeded_tasks):
+    login = client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    assert login.status_code == 200
+
+    task_a, task_b = seeded_tasks["task_ids"]
+    payload = {'entries': [
+        {'task_id': task_a, 'hours_spent': 2, 'date_logged': '2026-03-02', 'description': 'Mon'},
+        {'task_id': task_b, 'hours_spent': 3.5, 'date_logged': '2026-03-03'},
+        {'task_id': 99999, 'hours_spent': 1, 'date_logged': '2026-03-04'},
+        {'task_id': task_a, 'hours_spent': 1, 'date_logged': 'not-a-date'},
+        {'task_id': task_b},
+    ]}
+    res = client.post('/time/bulk', json=payload)
+    assert res.status_code == 201
+    data = res.get_json()
+    assert data['created'] == 2
+    assert data['total_hours'] == 5.5
+    assert [e['index'] for e in data['errors']] == [2, 3, 4]
+
+    logs = TimeLog.query.filter_by(user_id=seeded_tasks["employee_id"]).all()
+    assert len(logs) == 2
+    assert all(log.created_at is not None for log in logs)
+
+def test_bulk_time_entry_all_invalid(client, seeded_tasks):
+    client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+
+    res = client.post('/time/bulk', json={'entries': [{'task_id': 99999, 'hours_spent': 1}]})
+    assert res.status_code == 400
+    assert res.get_json()['created'] == 0
+
+    res = client.post('/time/bulk', json={'entries': []})
+    assert res.status_code == 400
+
+def test_bulk_time_entry_rejects_non_finite_hours(client, seeded_tasks):
+    client.post('/auth/login', json={'email': 'employee1@company.com', 'password': 'employeepass'})
+    task_id = seeded_tasks["task_ids"][0]
+
+    # A bare NaN in the JSON body as well as numeric strings
+    entries = [{'task_id': task_id, 'hours_spent': value} for value in (float('nan'), 'NaN', 'inf', '-inf')]
+    res = client.post('/time/bulk', json={'entries': entries})
+    assert res.status_code == 400
+    assert res.get_json()['created'] == 0
+    assert {e['message'] for e in res.get_json()['errors']} == {'hours_spent must be between 0 and 24'}
+    assert TimeLog.query.count() == 0